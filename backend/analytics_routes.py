@@ -249,3 +249,21 @@ async def get_feedback_metrics(club_id: str):
     except Exception as e:
         print(f"Error in analytics/feedback: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/sms-segments")
+async def get_sms_segment_report():
+    """
+    Get SMS segment usage:
+    - Static: every template's encoding and segments, as written and as GSM-7
+    - Live: per-template segments sent by this process since it started
+    """
+    from sms_segments import build_template_report, segment_stats
+    try:
+        return {
+            "templates": build_template_report(),
+            "sent": segment_stats.report()
+        }
+    except Exception as e:
+        print(f"Error in analytics/sms-segments: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -30,6 +30,7 @@ class RecommendationRequest(BaseModel):
     target_level: float
     gender_preference: Optional[str] = None
     exclude_player_ids: List[str] = []
+    scheduled_time: Optional[str] = None
 
 class OutreachRequest(BaseModel):
     club_id: str
@@ -662,27 +663,40 @@ async def get_player_feedback_summary(player_id: str):
 
 
 @router.get("/clubs/{club_id}/rankings")
-async def get_club_rankings(club_id: str, user: UserContext = Depends(get_current_user)):
+async def get_club_rankings(
+    club_id: str,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    player_id: Optional[str] = None,
+    user: UserContext = Depends(get_current_user)
+):
+    """
+    Club members ranked by Elo, from the incrementally maintained leaderboard.
+    offset/limit page the ranks (all members by default); player_id adds that
+    player's own rank.
+    """
     require_club_access(club_id, user)
-
+    from club_leaderboard import get_club_rankings as leaderboard_rankings
 
     try:
-        # 1. Fetch player IDs for this club
-        members_res = supabase.table("club_members").select("player_id").eq("club_id", club_id).execute()
-        member_ids = [m["player_id"] for m in (members_res.data or [])]
-        
-        if not member_ids:
-            return {"rankings": []}
-
-        # 2. Fetch data for these players
-        result = supabase.table("players").select(
-            "player_id, name, elo_rating, elo_confidence, adjusted_skill_level, gender"
-        ).in_("player_id", member_ids).eq("active_status", True).order("elo_rating", desc=True).execute()
-        return {"rankings": result.data or []}
+        return leaderboard_rankings(club_id, offset=offset, limit=limit, player_id=player_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/players/{player_id}/rankings/refresh")
+async def refresh_player_rankings(player_id: str, user: UserContext = Depends(get_current_user)):
+    """
+    Re-sync a player on the club leaderboards after the dashboard wrote to
+    Supabase directly (profile edit, deactivation, club join or removal).
+    Only mirrors what is already stored, so it is safe to call for any player.
+    """
+    from club_leaderboard import on_player_changed
+
+    on_player_changed(player_id)
+    return {"status": "ok"}
+
+
 @router.post("/recommendations")
 async def get_recommendations(request: RecommendationRequest, user: UserContext = Depends(get_current_user)):
     require_club_access(request.club_id, user)
@@ -691,7 +705,8 @@ async def get_recommendations(request: RecommendationRequest, user: UserContext
             club_id=request.club_id,
             target_level=request.target_level,
             gender_preference=request.gender_preference,
-            exclude_player_ids=request.exclude_player_ids
+            exclude_player_ids=request.exclude_player_ids,
+            scheduled_time=request.scheduled_time
         )
         return {"players": players}
     except Exception as e:
@@ -1129,13 +1144,32 @@ async def remove_player(match_id: str, player_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Lease TTL per cron job: one schedule interval, so a crashed run blocks at most one tick
+CRON_LEASE_TTL_SECONDS = {
+    "feedback": 10 * 60,
+    "result-nudges": 30 * 60,
+    "invite-timeout": 5 * 60,
+    "invite-expiry": 60,
+    "recalculate-scores": 60 * 60,
+    "recompute-scores": 10 * 60,
+}
+
+
+def _skipped_cron_response(job_name: str) -> dict:
+    return {"message": f"Skipped: previous {job_name} run still in progress", "skipped": True}
+
+
 @router.api_route("/cron/feedback", methods=["GET", "POST"])
 async def trigger_feedback_collection():
     """Cron endpoint to send feedback requests for recent matches."""
     from feedback_scheduler import run_feedback_scheduler
+    from cron_lease import cron_lease
     try:
-        result = run_feedback_scheduler()
-        return result
+        with cron_lease("feedback", CRON_LEASE_TTL_SECONDS["feedback"]) as lease:
+            if lease is None:
+                return _skipped_cron_response("feedback")
+            result = run_feedback_scheduler()
+            return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1143,9 +1177,13 @@ async def trigger_feedback_collection():
 @router.api_route("/cron/result-nudges", methods=["GET", "POST"])
 async def trigger_result_nudges():
     """Cron endpoint to send result nudges to match originators."""
+    from cron_lease import cron_lease
     try:
-        result = run_result_nudge_scheduler()
-        return result
+        with cron_lease("result-nudges", CRON_LEASE_TTL_SECONDS["result-nudges"]) as lease:
+            if lease is None:
+                return _skipped_cron_response("result-nudges")
+            result = run_result_nudge_scheduler()
+            return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1154,45 +1192,154 @@ async def trigger_result_nudges():
 async def process_invite_timeouts():
     """Cron endpoint to process batch refills and send replacements."""
     from matchmaker import process_batch_refills, process_pending_matches, process_last_call_flash
+    from cron_lease import cron_lease
+    from cron_executor import CronDeadline
+    from invite_expiry_queue import process_due_invite_expiries, needs_reconciliation_scan
     try:
-        # 1. Process batch refills (next batch logic)
-        new_invites = process_batch_refills()
-        
-        # 2. Process pending matches with no active invites (catch-up logic)
-        catch_up_invites = process_pending_matches()
-        
-        # 3. Process Last Call flashes (urgency logic)
-        flash_count = process_last_call_flash()
-        
-        return {
-            "message": f"Processed invites: {new_invites} batch refills, {catch_up_invites} catch-up, {flash_count} last call flashes."
-        }
+        with cron_lease("invite-timeout", CRON_LEASE_TTL_SECONDS["invite-timeout"]) as lease:
+            if lease is None:
+                return _skipped_cron_response("invite-timeout")
+
+            # One time budget for all three steps
+            deadline = CronDeadline()
+
+            # 1. Process batch refills (next batch logic): due deadlines from the expiry
+            # queue; the full stale-invite scan only runs as periodic reconciliation
+            new_invites = process_due_invite_expiries(deadline=deadline)
+            if needs_reconciliation_scan(get_now_utc()):
+                new_invites += process_batch_refills(deadline=deadline)
+            
+            # 2. Process pending matches with no active invites (catch-up logic)
+            # Stop early if this run overran its lease and a newer run took over
+            catch_up_invites = process_pending_matches(deadline=deadline) if lease.is_current() else 0
+            
+            # 3. Process Last Call flashes (urgency logic)
+            flash_count = process_last_call_flash(deadline=deadline) if lease.is_current() else 0
+            
+            return {
+                "message": f"Processed invites: {new_invites} batch refills, {catch_up_invites} catch-up, {flash_count} last call flashes."
+            }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.api_route("/cron/invite-expiry", methods=["GET", "POST"])
+async def process_invite_expiries():
+    """Cron endpoint (every minute) to refill matches whose invite deadlines just passed."""
+    from invite_expiry_queue import process_due_invite_expiries
+    from cron_lease import cron_lease
+    from cron_executor import CronDeadline
+    try:
+        with cron_lease("invite-expiry", CRON_LEASE_TTL_SECONDS["invite-expiry"]) as lease:
+            if lease is None:
+                return _skipped_cron_response("invite-expiry")
+            # Matches not reached in time stay claimed in the queue and are retried
+            new_invites = process_due_invite_expiries(deadline=CronDeadline())
+            return {"message": f"Processed due invite expiries: {new_invites} batch refills."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.api_route("/cron/recalculate-scores", methods=["GET", "POST"])
 async def trigger_score_recalculation():
-    """Cron endpoint to recalculate scores for all players."""
+    """Cron endpoint to reconcile player scores (kept current incrementally by DB triggers)."""
     import traceback
+    from cron_lease import cron_lease
     try:
         print("DEBUG: Attempting to import score_calculator")
-        from score_calculator import recalculate_player_scores
+        from score_calculator import reconcile_player_scores
     except ImportError as e:
         print(f"DEBUG: Import Error: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Failed to import score calculator: {str(e)}")
         
     try:
-        print("DEBUG: calling recalculate_player_scores")
-        count = recalculate_player_scores()
-        return {"message": f"Scores recalculated successfully for {count} players"}
+        with cron_lease("recalculate-scores", CRON_LEASE_TTL_SECONDS["recalculate-scores"]) as lease:
+            if lease is None:
+                return _skipped_cron_response("recalculate-scores")
+            print("DEBUG: calling reconcile_player_scores")
+            count = reconcile_player_scores()
+            return {"message": f"Scores reconciled successfully: {count} players corrected"}
     except Exception as e:
         print(f"DEBUG: Execution Error: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.api_route("/cron/recompute-scores", methods=["GET", "POST"])
+async def continue_score_recompute():
+    """Cron endpoint: continue a full score recompute (started by an admin) within this run's time budget."""
+    from cron_lease import cron_lease
+    from cron_executor import CronDeadline
+    from score_calculator import get_score_recompute_progress, recalculate_player_scores
+    try:
+        with cron_lease("recompute-scores", CRON_LEASE_TTL_SECONDS["recompute-scores"]) as lease:
+            if lease is None:
+                return _skipped_cron_response("recompute-scores")
+            if not get_score_recompute_progress():
+                return {"message": "No score recompute in progress"}
+            progress = recalculate_player_scores(deadline=CronDeadline())
+            return {"message": f"Score recompute: {progress['processed']} players processed", "progress": progress}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/admin/score-recompute")
+async def get_score_recompute(user: UserContext = Depends(require_superuser)):
+    """Progress of the full score recompute (null when none is running)."""
+    from score_calculator import get_score_recompute_progress
+    try:
+        return {"progress": get_score_recompute_progress()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/admin/score-recompute")
+async def start_score_recompute(user: UserContext = Depends(require_superuser)):
+    """Start a full score recompute (backfill); /cron/recompute-scores carries it to the end."""
+    from score_calculator import start_score_recompute as start_recompute, score_recompute_is_resumable
+    if not score_recompute_is_resumable():
+        # The cron run would land on another instance and never see the cursor
+        raise HTTPException(
+            status_code=409,
+            detail="Score recompute needs a shared state store (REDIS_URL); run python score_calculator.py instead"
+        )
+    try:
+        return {"progress": start_recompute()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/admin/elo-replay")
+async def replay_elo_ratings(apply: bool = False, user: UserContext = Depends(require_superuser)):
+    """
+    Re-rate every player by replaying all scored pairings from their seeds.
+    Dry run unless apply=true; returns the counts and the 100 largest rating changes.
+    An applied replay is written in one transaction: if the request times out
+    first, nothing changes.
+    """
+    from logic.elo_replay import replay_elo
+    try:
+        report = replay_elo(dry_run=not apply)
+        return {**report, "changes": report["changes"][:100]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cron/leases")
+async def get_cron_lease_stats(user: UserContext = Depends(require_superuser)):
+    """Skipped-run counts per cron job (runs that found a previous run still holding the lease)."""
+    from cron_lease import get_lease_backend
+    try:
+        backend = get_lease_backend()
+        return {
+            "skipped_runs": backend.skip_counts(),
+            "held": {name: backend.current_token(name) is not None for name in CRON_LEASE_TTL_SECONDS}
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/matches/{match_id}/feedback")
 async def trigger_match_feedback(match_id: str, force: bool = False):
     """Manually trigger feedback SMS for a specific match (for testing/admin)."""
@@ -1457,6 +1604,7 @@ class ClubSettingsUpdate(BaseModel):
     sms_whitelist: Optional[str] = None
     invite_timeout_minutes: Optional[int] = None
     initial_batch_size: Optional[int] = None
+    sms_gsm7_only: Optional[bool] = None
 
 
 @router.get("/clubs/{club_id}/settings")
@@ -1478,7 +1626,8 @@ async def get_club_settings(club_id: str, user: UserContext = Depends(get_curren
             "sms_test_mode": settings.get("sms_test_mode", False),
             "sms_whitelist": settings.get("sms_whitelist", ""),
             "invite_timeout_minutes": settings.get("invite_timeout_minutes", 15),
-            "initial_batch_size": settings.get("initial_batch_size", 6)
+            "initial_batch_size": settings.get("initial_batch_size", 6),
+            "sms_gsm7_only": settings.get("sms_gsm7_only", False)
         }
     except HTTPException:
         raise
@@ -1516,6 +1665,8 @@ async def update_club_settings(club_id: str, updates: ClubSettingsUpdate, user:
             current_settings["invite_timeout_minutes"] = updates.invite_timeout_minutes
         if updates.initial_batch_size is not None:
             current_settings["initial_batch_size"] = updates.initial_batch_size
+        if updates.sms_gsm7_only is not None:
+            current_settings["sms_gsm7_only"] = updates.sms_gsm7_only
         
         # Save
         supabase.table("clubs").update({
@@ -1944,10 +2095,10 @@ class InboxMessage(BaseModel):
     body: str
     to_number: Optional[str] = None
 
-@router.get("/sms-outbox")
-@router.get("/sms-outbox/")
-async def get_sms_outbox(phone_number: Optional[str] = None, history: bool = Query(False), user: UserContext = Depends(get_current_user)):
-    """Get outbound SMS messages (test mode only)."""
+OUTBOX_LONG_POLL_MAX_SECONDS = 25
+
+
+def _query_sms_outbox(phone_number: Optional[str], history: bool) -> list:
     if history:
         query = supabase.table("sms_outbox").select("*").order("created_at", desc=True).limit(20)
     else:
@@ -1961,9 +2112,36 @@ async def get_sms_outbox(phone_number: Optional[str] = None, history: bool = Que
     
     if history:
         data.reverse() # UI expects chronological
-        
+    return data
+
+
+@router.get("/sms-outbox")
+@router.get("/sms-outbox/")
+async def get_sms_outbox(
+    phone_number: Optional[str] = None,
+    history: bool = Query(False),
+    wait: float = Query(0),
+    user: UserContext = Depends(get_current_user)
+):
+    """
+    Get outbound SMS messages (test mode only).
+    With wait > 0 (unread mode), holds the request open until a new message is
+    stored or `wait` seconds pass (long-poll), instead of returning an empty list.
+    sms_outbox is queried in a worker thread, off the event loop.
+    """
+    import asyncio
+    from outbox_events import outbox_broker
+    if history or wait <= 0:
+        return {"messages": await asyncio.to_thread(_query_sms_outbox, phone_number, history)}
+
+    data = await outbox_broker.long_poll(
+        lambda: _query_sms_outbox(phone_number, history),
+        min(wait, OUTBOX_LONG_POLL_MAX_SECONDS),
+        phone_number
+    )
     return {"messages": data}
 
+
 @router.post("/sms-outbox/{message_id}/read")
 @router.post("/sms-outbox/{message_id}/read/")
 async def mark_message_read(message_id: str, user: UserContext = Depends(get_current_user)):
@@ -0,0 +1,440 @@
+"""
+Club Leaderboard - Per-club Elo rankings maintained incrementally.
+
+GET /clubs/{club_id}/rankings used to fetch every member id and then every
+member row ordered by Elo on each dashboard view. A club's board is now built
+once from Supabase (one query) and kept current by the write paths:
+- elo_service refreshes the players it just rated
+- onboarding and club joins add the member
+- dashboard edits, deactivations and club removals call
+  POST /players/{player_id}/rankings/refresh (on_player_changed)
+- the Elo replay drops every board (rebuilt on next read)
+Pages of ranks and a player's own rank are then served from the board alone.
+
+Backends:
+- RedisLeaderboard: ZSET "leaderboard:<club_id>" (player id scored by Elo),
+  "leaderboard_player:<player_id>" (display columns, JSON), SET
+  "leaderboard_clubs:<player_id>" (the boards a player is on) and a marker
+  "leaderboard_built:<club_id>". Ranks and ranges are ZREVRANK / ZREVRANGE.
+- InMemoryLeaderboard: process-local stand-in with the same ordering; a board is
+  a sorted list of (elo, player_id) searched with bisect.
+
+Only a shared (Redis) board is served across requests: an in-memory board only
+sees the hooks fired in its own process, so without Redis every read rebuilds
+it from Supabase. Boards are a cache: writes that skip the hooks show up once
+the board is rebuilt, at most LEADERBOARD_REBUILD_SECONDS after it was built,
+and hooks never raise.
+"""
+
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from typing import Callable, Iterable, List, Optional
+
+from database import supabase
+from state_store import SharedBackend
+
+LEADERBOARD_COLUMNS = "player_id, name, elo_rating, elo_confidence, adjusted_skill_level, gender"
+_LEADERBOARD_FIELDS = [c.strip() for c in LEADERBOARD_COLUMNS.split(",")]
+LEADERBOARD_REBUILD_SECONDS = 3600
+# Keys outlive the build marker, so a board is never read with its players expired
+LEADERBOARD_KEY_TTL_SECONDS = 2 * LEADERBOARD_REBUILD_SECONDS
+DEFAULT_ELO = 1500
+
+
+def _score(player: dict) -> int:
+    elo = player.get("elo_rating")
+    return int(elo) if elo is not None else DEFAULT_ELO
+
+
+def _entry(player: dict) -> dict:
+    return {k: player.get(k) for k in _LEADERBOARD_FIELDS}
+
+
+class Leaderboard(ABC):
+    """
+    Interface. Boards rank by Elo, highest first; equal ratings order by player
+    id, descending (Redis ZREVRANGE order). Ranks are 1-based.
+    """
+
+    # True when every process sees the same boards
+    is_shared = False
+
+    @abstractmethod
+    def is_built(self, club_id: str) -> bool:
+        """Whether the club's board is built and not due for a rebuild."""
+
+    @abstractmethod
+    def build(self, club_id: str, players: List[dict]):
+        """Replace a club's board with these (active) members."""
+
+    @abstractmethod
+    def update_players(self, players: List[dict]):
+        """New ratings / display columns for players, on every built board they are on."""
+
+    @abstractmethod
+    def add_member(self, club_id: str, player: dict):
+        """Add (or refresh) a member on the club's board if it is built."""
+
+    @abstractmethod
+    def remove_member(self, club_id: str, player_id: str):
+        """Take a member off the club's board."""
+
+    @abstractmethod
+    def clubs_of(self, player_ids: Iterable[str]) -> set:
+        """Clubs whose built board has any of these players."""
+
+    @abstractmethod
+    def page(self, club_id: str, offset: int = 0, limit: Optional[int] = None) -> List[dict]:
+        """Members ranked offset + 1 .. offset + limit (all when limit is None), with their rank."""
+
+    @abstractmethod
+    def rank(self, club_id: str, player_id: str) -> Optional[int]:
+        """1-based rank of a member (None if not on the board)."""
+
+    @abstractmethod
+    def size(self, club_id: str) -> int:
+        """Members on the board."""
+
+    @abstractmethod
+    def invalidate(self, club_id: str = None):
+        """Mark one board (or all) for rebuild on next read."""
+
+
+class RedisLeaderboard(Leaderboard):
+    is_shared = True
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _board(club_id):
+        return f"leaderboard:{club_id}"
+
+    @staticmethod
+    def _built(club_id):
+        return f"leaderboard_built:{club_id}"
+
+    @staticmethod
+    def _player(player_id):
+        return f"leaderboard_player:{player_id}"
+
+    @staticmethod
+    def _clubs(player_id):
+        return f"leaderboard_clubs:{player_id}"
+
+    def is_built(self, club_id: str) -> bool:
+        return bool(self.client.exists(self._built(club_id)))
+
+    def build(self, club_id: str, players: List[dict]):
+        board = self._board(club_id)
+        pipe = self.client.pipeline()
+        pipe.delete(board)
+        if players:
+            pipe.zadd(board, {p["player_id"]: _score(p) for p in players})
+            pipe.expire(board, LEADERBOARD_KEY_TTL_SECONDS)
+        for p in players:
+            pipe.set(self._player(p["player_id"]), json.dumps(_entry(p)), ex=LEADERBOARD_KEY_TTL_SECONDS)
+            pipe.sadd(self._clubs(p["player_id"]), club_id)
+            pipe.expire(self._clubs(p["player_id"]), LEADERBOARD_KEY_TTL_SECONDS)
+        pipe.set(self._built(club_id), 1, ex=LEADERBOARD_REBUILD_SECONDS)
+        pipe.execute()
+
+    def update_players(self, players: List[dict]):
+        pipe = self.client.pipeline()
+        for p in players:
+            pipe.smembers(self._clubs(p["player_id"]))
+        clubs_per_player = pipe.execute()
+
+        pipe = self.client.pipeline()
+        for p, clubs in zip(players, clubs_per_player):
+            for club_id in clubs:
+                # xx: only players still on the board
+                pipe.zadd(self._board(club_id), {p["player_id"]: _score(p)}, xx=True)
+            if clubs:
+                pipe.set(self._player(p["player_id"]), json.dumps(_entry(p)), ex=LEADERBOARD_KEY_TTL_SECONDS)
+        pipe.execute()
+
+    def add_member(self, club_id: str, player: dict):
+        if not self.is_built(club_id):
+            return
+        pipe = self.client.pipeline()
+        pipe.zadd(self._board(club_id), {player["player_id"]: _score(player)})
+        pipe.set(self._player(player["player_id"]), json.dumps(_entry(player)), ex=LEADERBOARD_KEY_TTL_SECONDS)
+        pipe.sadd(self._clubs(player["player_id"]), club_id)
+        pipe.expire(self._clubs(player["player_id"]), LEADERBOARD_KEY_TTL_SECONDS)
+        pipe.execute()
+
+    def remove_member(self, club_id: str, player_id: str):
+        pipe = self.client.pipeline()
+        pipe.zrem(self._board(club_id), player_id)
+        pipe.srem(self._clubs(player_id), club_id)
+        pipe.execute()
+
+    def clubs_of(self, player_ids: Iterable[str]) -> set:
+        pipe = self.client.pipeline()
+        for player_id in player_ids:
+            pipe.smembers(self._clubs(player_id))
+        return set().union(*pipe.execute())
+
+    def page(self, club_id: str, offset: int = 0, limit: Optional[int] = None) -> List[dict]:
+        end = -1 if limit is None else offset + limit - 1
+        members = self.client.zrevrange(self._board(club_id), offset, end, withscores=True)
+        if not members:
+            return []
+        entries = self.client.mget([self._player(player_id) for player_id, _ in members])
+        results = []
+        for i, ((player_id, score), raw) in enumerate(zip(members, entries)):
+            entry = json.loads(raw) if raw else {"player_id": player_id}
+            results.append({**entry, "elo_rating": int(score), "rank": offset + i + 1})
+        return results
+
+    def rank(self, club_id: str, player_id: str) -> Optional[int]:
+        rank = self.client.zrevrank(self._board(club_id), player_id)
+        return None if rank is None else rank + 1
+
+    def size(self, club_id: str) -> int:
+        return self.client.zcard(self._board(club_id))
+
+    def invalidate(self, club_id: str = None):
+        if club_id:
+            self.client.delete(self._built(club_id))
+            return
+        keys = list(self.client.scan_iter(match=self._built("*")))
+        if keys:
+            self.client.delete(*keys)
+
+
+class _Board:
+    """One club's ranking: (elo, player_id) ascending, so rank 1 is the last entry."""
+
+    def __init__(self, built_at: float):
+        self.built_at = built_at
+        self.keys = []
+        self.scores = {}
+
+    def set(self, player_id: str, elo: int):
+        old = self.scores.get(player_id)
+        if old is not None:
+            del self.keys[bisect_left(self.keys, (old, player_id))]
+        insort(self.keys, (elo, player_id))
+        self.scores[player_id] = elo
+
+    def remove(self, player_id: str):
+        old = self.scores.pop(player_id, None)
+        if old is not None:
+            del self.keys[bisect_left(self.keys, (old, player_id))]
+
+    def rank(self, player_id: str) -> Optional[int]:
+        elo = self.scores.get(player_id)
+        if elo is None:
+            return None
+        return len(self.keys) - bisect_left(self.keys, (elo, player_id))
+
+    def page(self, offset: int, limit: Optional[int]) -> list:
+        end = len(self.keys) - offset
+        start = 0 if limit is None else max(0, end - limit)
+        return [(len(self.keys) - i, self.keys[i]) for i in range(end - 1, start - 1, -1)]
+
+
+class InMemoryLeaderboard(Leaderboard):
+    """Process-local boards with the same ordering and rebuild interval."""
+
+    def __init__(self, rebuild_seconds: int = LEADERBOARD_REBUILD_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self._rebuild_seconds = rebuild_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._boards = {}        # club_id -> _Board
+        self._players = {}       # player_id -> display entry
+        self._player_clubs = {}  # player_id -> set of club ids
+
+    def _live_board(self, club_id: str) -> Optional[_Board]:
+        board = self._boards.get(club_id)
+        if board is not None and self._clock() - board.built_at >= self._rebuild_seconds:
+            return None
+        return board
+
+    def is_built(self, club_id: str) -> bool:
+        with self._lock:
+            return self._live_board(club_id) is not None
+
+    def build(self, club_id: str, players: List[dict]):
+        with self._lock:
+            old = self._boards.get(club_id)
+            for player_id in (old.scores if old else ()):
+                self._player_clubs.get(player_id, set()).discard(club_id)
+            board = self._boards[club_id] = _Board(self._clock())
+            for p in players:
+                board.set(p["player_id"], _score(p))
+                self._players[p["player_id"]] = _entry(p)
+                self._player_clubs.setdefault(p["player_id"], set()).add(club_id)
+
+    def update_players(self, players: List[dict]):
+        with self._lock:
+            for p in players:
+                clubs = self._player_clubs.get(p["player_id"])
+                if not clubs:
+                    continue
+                for club_id in clubs:
+                    self._boards[club_id].set(p["player_id"], _score(p))
+                self._players[p["player_id"]] = _entry(p)
+
+    def add_member(self, club_id: str, player: dict):
+        with self._lock:
+            board = self._live_board(club_id)
+            if board is None:
+                return
+            board.set(player["player_id"], _score(player))
+            self._players[player["player_id"]] = _entry(player)
+            self._player_clubs.setdefault(player["player_id"], set()).add(club_id)
+
+    def remove_member(self, club_id: str, player_id: str):
+        with self._lock:
+            board = self._boards.get(club_id)
+            if board is not None:
+                board.remove(player_id)
+            self._player_clubs.get(player_id, set()).discard(club_id)
+
+    def clubs_of(self, player_ids: Iterable[str]) -> set:
+        with self._lock:
+            return set().union(*(self._player_clubs.get(player_id, set()) for player_id in player_ids))
+
+    def page(self, club_id: str, offset: int = 0, limit: Optional[int] = None) -> List[dict]:
+        with self._lock:
+            board = self._boards.get(club_id)
+            if board is None:
+                return []
+            return [{**self._players.get(player_id, {"player_id": player_id}), "elo_rating": elo, "rank": rank}
+                    for rank, (elo, player_id) in board.page(offset, limit)]
+
+    def rank(self, club_id: str, player_id: str) -> Optional[int]:
+        with self._lock:
+            board = self._boards.get(club_id)
+            return board.rank(player_id) if board else None
+
+    def size(self, club_id: str) -> int:
+        with self._lock:
+            board = self._boards.get(club_id)
+            return len(board.keys) if board else 0
+
+    def invalidate(self, club_id: str = None):
+        with self._lock:
+            for board_id in ([club_id] if club_id else list(self._boards)):
+                board = self._boards.get(board_id)
+                if board is not None:
+                    board.built_at = float("-inf")
+
+
+_leaderboard = SharedBackend("club leaderboards", RedisLeaderboard, InMemoryLeaderboard)
+
+
+def get_leaderboard() -> Leaderboard:
+    """Redis-backed when conversation state uses Redis, otherwise in-memory."""
+    return _leaderboard.get()
+
+
+def set_leaderboard(leaderboard: Leaderboard):
+    """Replace the leaderboard backend (tests, offline benchmarks)."""
+    _leaderboard.set(leaderboard)
+
+
+def load_club_players(club_id: str) -> List[dict]:
+    """Active members with their leaderboard columns (one query)."""
+    res = supabase.table("club_members").select(f"player_id, players({LEADERBOARD_COLUMNS}, active_status)")\
+        .eq("club_id", club_id).execute()
+    return [row["players"] for row in (res.data or [])
+            if row.get("players") and row["players"].get("active_status") is True]
+
+
+def get_club_rankings(club_id: str, offset: int = 0, limit: Optional[int] = None, player_id: str = None) -> dict:
+    """
+    A page of the club's rankings (everyone when limit is None), the member
+    count and, if player_id is given, that player's rank (None if not ranked).
+    Supabase is only queried when the board has to be (re)built, or on every
+    call when the board is process-local.
+    """
+    leaderboard = get_leaderboard()
+    if not leaderboard.is_shared or not leaderboard.is_built(club_id):
+        leaderboard.build(club_id, load_club_players(club_id))
+
+    result = {
+        "rankings": leaderboard.page(club_id, offset, limit),
+        "total": leaderboard.size(club_id),
+        "offset": offset,
+    }
+    if player_id:
+        result["player_rank"] = leaderboard.rank(club_id, player_id)
+    return result
+
+
+# --- Incremental updates from write paths ---
+
+def on_ratings_changed(player_ids: Iterable[str]):
+    """Players were re-rated: refresh them on the boards they are on (one query, only if any)."""
+    player_ids = list(player_ids)
+    try:
+        leaderboard = get_leaderboard()
+        if not player_ids or not leaderboard.clubs_of(player_ids):
+            return
+        res = supabase.table("players").select(LEADERBOARD_COLUMNS).in_("player_id", player_ids).execute()
+        leaderboard.update_players(res.data or [])
+    except Exception as e:
+        print(f"[LEADERBOARD] Failed to refresh ratings for {player_ids}: {e}")
+
+
+def on_member_added(club_id: str, player: dict):
+    """A player joined a club (or updated their profile there)."""
+    try:
+        if any(k not in player for k in _LEADERBOARD_FIELDS):
+            res = supabase.table("players").select(f"{LEADERBOARD_COLUMNS}, active_status")\
+                .eq("player_id", player["player_id"]).execute()
+            if not res.data:
+                return
+            player = res.data[0]
+        leaderboard = get_leaderboard()
+        if player.get("active_status", True) is False:
+            leaderboard.remove_member(club_id, player["player_id"])
+            return
+        leaderboard.add_member(club_id, player)
+    except Exception as e:
+        print(f"[LEADERBOARD] Failed to add member to club {club_id}: {e}")
+
+
+def on_member_removed(club_id: str, player_id: str):
+    try:
+        get_leaderboard().remove_member(club_id, player_id)
+    except Exception as e:
+        print(f"[LEADERBOARD] Failed to remove member from club {club_id}: {e}")
+
+
+def on_player_changed(player_id: str):
+    """
+    A player was edited, (de)activated, or joined / left a club outside the
+    backend (dashboard server actions): re-read them and their memberships, then
+    refresh, add or remove them on every affected board.
+    """
+    try:
+        res = supabase.table("players").select(f"{LEADERBOARD_COLUMNS}, active_status")\
+            .eq("player_id", player_id).execute()
+        player = res.data[0] if res.data else None
+        club_ids = set()
+        if player:
+            members = supabase.table("club_members").select("club_id").eq("player_id", player_id).execute()
+            club_ids = {m["club_id"] for m in (members.data or [])}
+
+        for club_id in club_ids:
+            on_member_added(club_id, player)
+        for club_id in get_leaderboard().clubs_of([player_id]) - club_ids:
+            on_member_removed(club_id, player_id)
+    except Exception as e:
+        print(f"[LEADERBOARD] Failed to refresh player {player_id}: {e}")
+
+
+def invalidate(club_id: str = None):
+    """Rebuild one board (or all) on next read, e.g. after bulk rating changes."""
+    try:
+        get_leaderboard().invalidate(club_id)
+    except Exception as e:
+        print(f"[LEADERBOARD] Failed to invalidate leaderboards: {e}")
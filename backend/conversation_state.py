@@ -0,0 +1,92 @@
+"""
+Conversation State - Typed, versioned schema for per-user SMS conversation state.
+
+A user's state is one compact msgpack value: [schema_version, {field_id: value}].
+Known fields are stored under small integer IDs and coerced to their declared
+type on write, so reads need no per-field guessing (no JSON-in-strings).
+
+Rules for changing the schema:
+- Never renumber or reuse a field ID; append new fields with the next free ID
+- Changing a field's type or meaning requires bumping STATE_SCHEMA_VERSION;
+  values written under another version are discarded on read (the user simply
+  starts the flow again), which is acceptable for state that lives ~1 hour
+- Store IDs, not whole objects (e.g. group_ids, not the group rows)
+"""
+
+import msgpack
+
+STATE_SCHEMA_VERSION = 1
+
+# field name -> (field id, type). None is allowed for every field.
+STATE_FIELDS = {
+    "state": (0, str),
+    "match_id": (1, str),
+    "club_id": (2, str),
+    "club_name": (3, str),
+    "name": (4, str),
+    "level": (5, float),
+    "gender": (6, str),
+    "gender_preference": (7, str),
+    "level_min": (8, float),
+    "level_max": (9, float),
+    "players_to_rate": (10, list),
+    "scheduled_time_iso": (11, str),
+    "scheduled_time_human": (12, str),
+    "group_ids": (13, list),
+    "group_options": (14, dict),
+    "member_group_ids": (15, list),
+    "selected_group_ids": (16, list),
+    "bridge_time_iso": (17, str),
+}
+
+_FIELDS_BY_ID = {field_id: name for name, (field_id, _) in STATE_FIELDS.items()}
+
+
+class StateSchemaError(ValueError):
+    """Raised when a state value does not match its declared field type."""
+
+
+def _coerce(name: str, value, field_type):
+    if value is None or isinstance(value, field_type):
+        return value
+    try:
+        if field_type is float and not isinstance(value, bool):
+            return float(value)
+        if field_type is str and isinstance(value, (int, float)):
+            return str(value)
+        if field_type is list and isinstance(value, (tuple, set)):
+            return list(value)
+    except (TypeError, ValueError):
+        pass
+    raise StateSchemaError(f"State field '{name}' expects {field_type.__name__}, got {type(value).__name__}")
+
+
+def encode_state(state: str, data: dict = None) -> bytes:
+    """Validate a state + data dict against the schema and pack it into one binary value."""
+    fields = {STATE_FIELDS["state"][0]: state}
+    for name, value in (data or {}).items():
+        if name not in STATE_FIELDS:
+            # Kept by name so an unlisted field is not silently lost; add it to STATE_FIELDS
+            print(f"[STATE] Warning: field '{name}' is not in the state schema")
+            fields[name] = value
+            continue
+        field_id, field_type = STATE_FIELDS[name]
+        fields[field_id] = _coerce(name, value, field_type)
+    return msgpack.packb([STATE_SCHEMA_VERSION, fields], use_bin_type=True)
+
+
+def decode_state(blob: bytes) -> dict:
+    """Unpack a stored state value into a {field name: value} dict ({} if empty or from another version)."""
+    if not blob:
+        return {}
+    try:
+        version, fields = msgpack.unpackb(blob, raw=False, strict_map_key=False)
+    except (ValueError, TypeError, msgpack.UnpackException) as e:
+        print(f"[STATE] Discarding undecodable state: {e}")
+        return {}
+
+    if version != STATE_SCHEMA_VERSION:
+        print(f"[STATE] Discarding state written with schema v{version} (current v{STATE_SCHEMA_VERSION})")
+        return {}
+
+    return {_FIELDS_BY_ID.get(key, key): value for key, value in fields.items()}
@@ -0,0 +1,130 @@
+"""
+Cron Executor - Bounded, club-fair fan-out for per-match cron work.
+
+The cron jobs handle many independent matches, and each one spends most of its
+time waiting on Supabase/Twilio round trips. fan_out() runs a job's items on a
+small thread pool:
+- Concurrency per job (JOB_CONCURRENCY, overridable with CRON_CONCURRENCY_<JOB>)
+- Per-club fairness: clubs take turns, and at most MAX_IN_FLIGHT_PER_CLUB items
+  of one club run at once, so one busy club cannot starve the others
+- A shared deadline: once it passes no new item is started (running items
+  finish), so the run ends inside the serverless time limit. Items not started
+  are simply picked up again by the next tick.
+"""
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Iterable, List, Optional
+
+# Vercel stops the function at its maxDuration; leave headroom for the response
+CRON_DEADLINE_SECONDS = float(os.getenv("CRON_DEADLINE_SECONDS", 50))
+
+DEFAULT_CONCURRENCY = 4
+JOB_CONCURRENCY = {
+    "batch-refills": 4,
+    "pending-matches": 4,
+    "last-call": 4,
+    "feedback": 4,
+    "feedback-reminders": 4,
+    "result-nudges": 4,
+}
+MAX_IN_FLIGHT_PER_CLUB = 2
+
+
+class CronDeadline:
+    """Wall-clock budget shared by every step of one cron run."""
+
+    def __init__(self, seconds: float = None, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.expires_at = clock() + (CRON_DEADLINE_SECONDS if seconds is None else seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class FanOutResult:
+    """Per-item results in input order (None for failed or not started items)."""
+
+    def __init__(self, results: List[Any], failed: int, not_started: int):
+        self.results = results
+        self.failed = failed
+        self.not_started = not_started
+
+    def values(self) -> List[Any]:
+        """Results of the items that completed."""
+        return [r for r in self.results if r is not None]
+
+
+def get_job_concurrency(job_name: str) -> int:
+    env_name = "CRON_CONCURRENCY_" + job_name.upper().replace("-", "_")
+    try:
+        return max(1, int(os.getenv(env_name, JOB_CONCURRENCY.get(job_name, DEFAULT_CONCURRENCY))))
+    except ValueError:
+        return JOB_CONCURRENCY.get(job_name, DEFAULT_CONCURRENCY)
+
+
+def fan_out(job_name: str, items: Iterable, worker: Callable[[Any], Any],
+            club_of: Callable[[Any], Optional[str]] = lambda item: None,
+            deadline: CronDeadline = None, max_workers: int = None) -> FanOutResult:
+    """
+    Run worker(item) for every item with bounded concurrency.
+    club_of(item) gives the fairness key (items with the same club share turns).
+    A worker exception is logged and counts as failed; it never stops the run.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    if not items:
+        return FanOutResult(results, 0, 0)
+
+    deadline = deadline or CronDeadline()
+    max_workers = max_workers or get_job_concurrency(job_name)
+
+    # Round-robin queues per club, clubs in order of first appearance
+    queues = {}
+    for index, item in enumerate(items):
+        queues.setdefault(club_of(item), deque()).append(index)
+    turn = deque(queues.keys())
+    in_flight_by_club = {club: 0 for club in queues}
+
+    def _next_index():
+        for _ in range(len(turn)):
+            club = turn[0]
+            turn.rotate(-1)
+            if queues[club] and in_flight_by_club[club] < MAX_IN_FLIGHT_PER_CLUB:
+                in_flight_by_club[club] += 1
+                return club, queues[club].popleft()
+        return None
+
+    failed = 0
+    running = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        while True:
+            while len(running) < max_workers and not deadline.expired():
+                picked = _next_index()
+                if picked is None:
+                    break
+                club, index = picked
+                running[pool.submit(worker, items[index])] = (club, index)
+
+            if not running:
+                break
+
+            done, _ = wait(running, timeout=deadline.remaining() or None, return_when=FIRST_COMPLETED)
+            for future in done:
+                club, index = running.pop(future)
+                in_flight_by_club[club] -= 1
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"[CRON] {job_name}: item {index} failed: {e}")
+
+    not_started = sum(len(q) for q in queues.values())
+    if not_started:
+        print(f"[CRON] {job_name}: deadline reached, {not_started} items left for the next run")
+    return FanOutResult(results, failed, not_started)
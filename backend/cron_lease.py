@@ -0,0 +1,199 @@
+"""
+Cron Lease - Distributed lease that keeps scheduled jobs from overlapping.
+
+Vercel fires each cron endpoint on a fixed schedule whether or not the previous
+run has finished. Each job takes a named lease before it starts:
+- Acquired: the run proceeds and releases the lease when done
+- Held by another run: the run is skipped and counted in the skipped-run metric
+
+Every acquisition gets a fencing token (a per-lease counter that only grows).
+A long run whose lease expired and was taken over can detect it with
+`lease.is_current()` and stop before doing more writes.
+
+Backends:
+- RedisLeaseBackend: SET NX PX on "lease:<name>", INCR for tokens, compare-and-delete release
+- InMemoryLeaseBackend: same semantics within one process (local runs, tests)
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from state_store import SharedBackend
+
+LEASE_KEY_PREFIX = "lease:"
+
+# Compare-and-delete: only the holder of the current token may release
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class Lease:
+    """A held lease. `token` is the fencing token of this acquisition."""
+
+    def __init__(self, backend, name: str, token: int):
+        self.backend = backend
+        self.name = name
+        self.token = token
+
+    def is_current(self) -> bool:
+        """True while no later run has taken over this lease."""
+        return self.backend.current_token(self.name) == self.token
+
+    def release(self):
+        self.backend.release(self.name, self.token)
+
+
+class LeaseBackend(ABC):
+    """Interface for lease storage."""
+
+    @abstractmethod
+    def acquire(self, name: str, ttl_ms: int) -> Optional[int]:
+        """Take the lease if free. Returns the fencing token, or None if held."""
+
+    @abstractmethod
+    def current_token(self, name: str) -> Optional[int]:
+        """Token of the current holder (None if free or expired)."""
+
+    @abstractmethod
+    def release(self, name: str, token: int):
+        """Release the lease if `token` still holds it."""
+
+    @abstractmethod
+    def record_skip(self, name: str):
+        """Count a run skipped because the lease was held."""
+
+    @abstractmethod
+    def skip_counts(self) -> dict:
+        """Skipped runs per lease name."""
+
+
+class RedisLeaseBackend(LeaseBackend):
+    """Leases shared by every process using the same Redis."""
+
+    SKIPS_KEY = "lease_skips"
+
+    def __init__(self, client):
+        self.client = client
+
+    def acquire(self, name: str, ttl_ms: int) -> Optional[int]:
+        key = f"{LEASE_KEY_PREFIX}{name}"
+        token = self.client.incr(f"{key}:fence")
+        if self.client.set(key, str(token), nx=True, px=ttl_ms):
+            return token
+        return None
+
+    def current_token(self, name: str) -> Optional[int]:
+        value = self.client.get(f"{LEASE_KEY_PREFIX}{name}")
+        return int(value) if value is not None else None
+
+    def release(self, name: str, token: int):
+        self.client.eval(_RELEASE_SCRIPT, 1, f"{LEASE_KEY_PREFIX}{name}", str(token))
+
+    def record_skip(self, name: str):
+        self.client.hincrby(self.SKIPS_KEY, name, 1)
+
+    def skip_counts(self) -> dict:
+        return {k: int(v) for k, v in (self.client.hgetall(self.SKIPS_KEY) or {}).items()}
+
+
+class InMemoryLeaseBackend(LeaseBackend):
+    """Process-local leases with the same expiry and fencing semantics."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._leases = {}  # name -> (token, expires_at)
+        self._fences = {}  # name -> last issued token
+        self._skips = {}
+
+    def _live_token(self, name: str) -> Optional[int]:
+        entry = self._leases.get(name)
+        if entry is None:
+            return None
+        token, expires_at = entry
+        if expires_at <= self._clock():
+            del self._leases[name]
+            return None
+        return token
+
+    def acquire(self, name: str, ttl_ms: int) -> Optional[int]:
+        with self._lock:
+            token = self._fences.get(name, 0) + 1
+            self._fences[name] = token
+            if self._live_token(name) is not None:
+                return None
+            self._leases[name] = (token, self._clock() + ttl_ms / 1000)
+            return token
+
+    def current_token(self, name: str) -> Optional[int]:
+        with self._lock:
+            return self._live_token(name)
+
+    def release(self, name: str, token: int):
+        with self._lock:
+            if self._live_token(name) == token:
+                del self._leases[name]
+
+    def record_skip(self, name: str):
+        with self._lock:
+            self._skips[name] = self._skips.get(name, 0) + 1
+
+    def skip_counts(self) -> dict:
+        with self._lock:
+            return dict(self._skips)
+
+
+_lease_backend = SharedBackend("cron leases", RedisLeaseBackend, InMemoryLeaseBackend)
+
+
+def get_lease_backend() -> LeaseBackend:
+    """Redis-backed when conversation state uses Redis, otherwise in-memory."""
+    return _lease_backend.get()
+
+
+def set_lease_backend(backend: LeaseBackend):
+    """Replace the lease backend (tests, offline benchmarks)."""
+    _lease_backend.set(backend)
+
+
+@contextmanager
+def cron_lease(name: str, ttl_seconds: int):
+    """
+    Hold the named lease for the duration of the block.
+    Yields the Lease, or None when another run holds it (the skip is recorded).
+    If the lease backend is unreachable the job runs unguarded rather than not at all.
+    """
+    backend = get_lease_backend()
+    ttl_ms = int(ttl_seconds * 1000)
+    try:
+        token = backend.acquire(name, ttl_ms)
+    except Exception as e:
+        print(f"[LEASE] Could not acquire lease '{name}', running without it: {e}")
+        fallback = InMemoryLeaseBackend()
+        yield Lease(fallback, name, fallback.acquire(name, ttl_ms))
+        return
+
+    if token is None:
+        print(f"[LEASE] Skipping '{name}': a previous run still holds the lease")
+        try:
+            backend.record_skip(name)
+        except Exception as e:
+            print(f"[LEASE] Could not record skip for '{name}': {e}")
+        yield None
+        return
+
+    lease = Lease(backend, name, token)
+    try:
+        yield lease
+    finally:
+        try:
+            lease.release()
+        except Exception as e:
+            print(f"[LEASE] Could not release lease '{name}' (expires on its own): {e}")
@@ -0,0 +1,152 @@
+"""
+Deferred SMS Scheduler - Releases match invites held back during club quiet hours.
+
+Invites created during quiet hours are stored with status 'pending_sms' and a
+`send_after` timestamp: the UTC time the club's quiet-hours window ends (computed
+once, at creation, from the club's settings and timezone).
+
+Called by the invite-timeout cron job:
+1. Selects exactly the queued invites whose send_after has passed (indexed range scan)
+2. Loads requesters for all affected matches in bulk and sends the invite SMS
+3. Marks the dispatched invites as 'sent' with one update per club timeout setting
+   and registers their expiry in the invite expiry queue
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from database import supabase
+from logic_utils import get_now_utc, get_quiet_hours_release
+from redis_client import clear_user_state
+from twilio_client import send_sms
+from matchmaker import _build_invite_sms, INVITE_TIMEOUT_MINUTES
+from invite_expiry_queue import schedule_invite_expiry
+
+
+def schedule_unscheduled_invites(now=None) -> int:
+    """
+    Assign a send_after to queued invites that do not have one yet
+    (rows created before deferred scheduling existed).
+    Quiet hours are evaluated once per club, not once per invite.
+    """
+    now = now or get_now_utc()
+    res = supabase.table("match_invites").select("invite_id, matches(club_id, clubs(settings, timezone))")\
+        .eq("status", "pending_sms")\
+        .is_("send_after", "null")\
+        .not_.is_("match_id", "null")\
+        .execute()
+
+    if not res.data:
+        return 0
+
+    invites_by_club = defaultdict(list)
+    clubs = {}
+    for inv in res.data:
+        match = inv.get("matches") or {}
+        club_id = match.get("club_id")
+        invites_by_club[club_id].append(inv["invite_id"])
+        clubs[club_id] = match.get("clubs") or {}
+
+    for club_id, invite_ids in invites_by_club.items():
+        club = clubs[club_id]
+        release_at = get_quiet_hours_release(club.get("settings"), club.get("timezone"), now=now) or now
+        supabase.table("match_invites").update({"send_after": release_at.isoformat()})\
+            .in_("invite_id", invite_ids).execute()
+
+    print(f"[DEFERRED SMS] Scheduled {len(res.data)} legacy queued invites across {len(invites_by_club)} clubs")
+    return len(res.data)
+
+
+def get_due_invites(now=None) -> list:
+    """Fetch queued invites whose quiet-hours release time has passed, with match and player details."""
+    now = now or get_now_utc()
+    res = supabase.table("match_invites")\
+        .select("invite_id, match_id, player_id, players(phone_number, name), matches(*, clubs(name, settings))")\
+        .eq("status", "pending_sms")\
+        .not_.is_("match_id", "null")\
+        .lte("send_after", now.isoformat())\
+        .order("send_after")\
+        .execute()
+    return res.data or []
+
+
+def _get_requesters(matches: dict) -> dict:
+    """Resolve the requester (team 1 lead, else originator) for many matches in two queries."""
+    match_ids = list(matches.keys())
+    requester_ids = {}
+
+    parts_res = supabase.table("match_participations").select("match_id, player_id")\
+        .in_("match_id", match_ids).eq("team_index", 1).execute()
+    for row in (parts_res.data or []):
+        requester_ids.setdefault(row["match_id"], row["player_id"])
+
+    for match_id, match in matches.items():
+        if match_id not in requester_ids and match.get("originator_id"):
+            requester_ids[match_id] = match["originator_id"]
+
+    if not requester_ids:
+        return {}
+
+    players_res = supabase.table("players").select("*").in_("player_id", list(set(requester_ids.values()))).execute()
+    players = {p["player_id"]: p for p in (players_res.data or [])}
+    return {match_id: players.get(pid) for match_id, pid in requester_ids.items()}
+
+
+def release_due_invites() -> int:
+    """
+    Send every queued invite that is due and mark it as sent.
+    Invites whose SMS fails stay queued and are retried on the next pass.
+
+    Returns:
+        Number of invites dispatched
+    """
+    now = get_now_utc()
+    schedule_unscheduled_invites(now)
+
+    due_invites = get_due_invites(now)
+    if not due_invites:
+        return 0
+
+    print(f"[DEFERRED SMS] Releasing {len(due_invites)} queued invites")
+
+    matches = {}
+    for inv in due_invites:
+        if inv.get("matches"):
+            matches[inv["match_id"]] = inv["matches"]
+    requesters = _get_requesters(matches) if matches else {}
+
+    # Build each match's SMS once; group successful sends by expiry window
+    sms_cache = {}
+    sent_by_timeout = defaultdict(list)
+    matches_by_timeout = defaultdict(set)
+
+    for inv in due_invites:
+        match = matches.get(inv["match_id"])
+        p_data = inv.get("players")
+        if not match or not p_data:
+            continue
+
+        club = match.get("clubs") or {}
+        if inv["match_id"] not in sms_cache:
+            sms_cache[inv["match_id"]] = _build_invite_sms(
+                match, requesters.get(inv["match_id"]), club.get("name") or "the club"
+            )
+
+        if send_sms(p_data["phone_number"], sms_cache[inv["match_id"]], club_id=match.get("club_id")):
+            invite_timeout = (club.get("settings") or {}).get("invite_timeout_minutes", INVITE_TIMEOUT_MINUTES)
+            sent_by_timeout[invite_timeout].append(inv["invite_id"])
+            matches_by_timeout[invite_timeout].add(inv["match_id"])
+            clear_user_state(p_data["phone_number"])
+
+    total_dispatched = 0
+    for invite_timeout, invite_ids in sent_by_timeout.items():
+        expires_at = now + timedelta(minutes=invite_timeout)
+        supabase.table("match_invites").update({
+            "status": "sent",
+            "sent_at": now.isoformat(),
+            "expires_at": expires_at.isoformat()
+        }).in_("invite_id", invite_ids).execute()
+        total_dispatched += len(invite_ids)
+        for match_id in matches_by_timeout[invite_timeout]:
+            schedule_invite_expiry(match_id, expires_at)
+
+    return total_dispatched
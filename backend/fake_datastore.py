@@ -0,0 +1,531 @@
+"""
+Fake Datastore - Offline stand-in for the Supabase client, with call accounting.
+
+Used by the matchmaking benchmarks (scripts/benchmark_matchmaking.py) to run
+real code paths against a synthetic club without a database. It supports the
+subset of the PostgREST query builder the hot paths use (select with embedded
+resources, insert/update/upsert/delete, eq/neq/in_/is_/lt/lte/gt/gte/filter,
+or_ (comparisons and and() groups), not_, order, limit, single/maybe_single) and Python ports of the matchmaking
+RPCs in migrations/.
+
+Every table query and RPC counts as one round trip. Bytes are the JSON size of
+the request payload plus the response data, as PostgREST would send them.
+"""
+
+import json
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+PRIMARY_KEYS = {
+    "matches": "match_id",
+    "match_invites": "invite_id",
+    "players": "player_id",
+    "clubs": "club_id",
+    "player_groups": "group_id",
+}
+
+# Embedded resource -> foreign key column on the parent row (PostgREST many-to-one)
+EMBED_KEYS = {
+    "matches": "match_id",
+    "players": "player_id",
+    "clubs": "club_id",
+    "player_groups": "group_id",
+}
+
+
+def _json_size(value) -> int:
+    return len(json.dumps(value, default=str))
+
+
+def _as_comparable(value):
+    """ISO timestamp strings compare as datetimes (mixed 'Z' / '+00:00' formats)."""
+    if isinstance(value, str) and len(value) >= 19 and value[4] == "-" and value[10] in "T ":
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _split_columns(columns: str):
+    """Split a select string on top-level commas."""
+    parts, depth, current = [], 0, ""
+    for ch in columns:
+        if ch == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+            continue
+        depth += ch == "("
+        depth -= ch == ")"
+        current += ch
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+_COMPARISONS = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+}
+
+
+def _logic_predicate(expression: str, combine):
+    """Row predicate for a PostgREST logic filter body: 'col.op.value' terms and nested and()/or()."""
+    terms = []
+    for part in _split_columns(expression):
+        if part.startswith(("and(", "or(")):
+            name = part[:part.index("(")]
+            terms.append(_logic_predicate(part[len(name) + 1:-1], all if name == "and" else any))
+            continue
+        column, op, value = part.split(".", 2)
+        value = value.strip('"')
+        compare = _COMPARISONS[op]
+        terms.append(lambda row, column=column, compare=compare, value=value:
+                     row.get(column) is not None and compare(_as_comparable(str(row.get(column))), _as_comparable(value)))
+    return lambda row: combine(term(row) for term in terms)
+
+
+class DatastoreStats:
+    """Round trips, bytes and SMS counted since creation (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.bytes = 0
+        self.sms = 0
+        self.by_target = Counter()
+
+    def record(self, target: str, request, response):
+        size = _json_size(request) + _json_size(response)
+        with self._lock:
+            self.calls += 1
+            self.bytes += size
+            self.by_target[target] += 1
+
+    def record_sms(self, count: int = 1):
+        with self._lock:
+            self.sms += count
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "bytes": self.bytes, "sms": self.sms, "by_target": Counter(self.by_target)}
+
+
+class FakeQuery:
+    def __init__(self, store, table: str):
+        self.store = store
+        self.table = table
+        self.op = "select"
+        self.columns = "*"
+        self.payload = None
+        self.filters = []
+        self.orders = []
+        self.row_limit = None
+        self.single_mode = None
+        self._negate_next = False
+
+    # --- operations ---
+    def select(self, columns: str = "*", count=None):
+        self.op, self.columns = "select", columns
+        return self
+
+    def insert(self, rows):
+        self.op, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict: str = None):
+        self.op, self.payload = "upsert", rows
+        self.on_conflict = on_conflict
+        return self
+
+    def update(self, values: dict):
+        self.op, self.payload = "update", values
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    # --- filters ---
+    @property
+    def not_(self):
+        self._negate_next = True
+        return self
+
+    def _add(self, column, predicate):
+        negate, self._negate_next = self._negate_next, False
+        self.filters.append((column, (lambda v: not predicate(v)) if negate else predicate))
+        return self
+
+    def eq(self, column, value):
+        return self._add(column, lambda v: v is not None and _as_comparable(v) == _as_comparable(value))
+
+    def neq(self, column, value):
+        return self._add(column, lambda v: v is not None and _as_comparable(v) != _as_comparable(value))
+
+    def in_(self, column, values):
+        values = set(values)
+        return self._add(column, lambda v: v in values)
+
+    def is_(self, column, value):
+        if value in ("null", None):
+            return self._add(column, lambda v: v is None)
+        return self._add(column, lambda v: v is (value in ("true", True)))
+
+    def lt(self, column, value):
+        return self._add(column, lambda v: v is not None and _as_comparable(v) < _as_comparable(value))
+
+    def lte(self, column, value):
+        return self._add(column, lambda v: v is not None and _as_comparable(v) <= _as_comparable(value))
+
+    def gt(self, column, value):
+        return self._add(column, lambda v: v is not None and _as_comparable(v) > _as_comparable(value))
+
+    def gte(self, column, value):
+        return self._add(column, lambda v: v is not None and _as_comparable(v) >= _as_comparable(value))
+
+    def or_(self, filters: str):
+        # Row-level filter (column None)
+        self.filters.append((None, _logic_predicate(filters, any)))
+        return self
+
+    def filter(self, column, operator, value):
+        return getattr(self, {"eq": "eq", "neq": "neq", "lt": "lt", "lte": "lte", "gt": "gt", "gte": "gte"}[operator])(column, value)
+
+    # --- modifiers ---
+    def order(self, column, desc: bool = False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count: int):
+        self.row_limit = count
+        return self
+
+    def single(self):
+        self.single_mode = "single"
+        return self
+
+    def maybe_single(self):
+        self.single_mode = "maybe"
+        return self
+
+    def execute(self):
+        data = self.store._execute(self)
+        request = {"table": self.table, "op": self.op, "payload": self.payload, "filters": len(self.filters)}
+        self.store.stats.record(f"{self.table}.{self.op}", request, data)
+        return SimpleNamespace(data=data, count=len(data) if isinstance(data, list) else None)
+
+
+class FakeRpc:
+    def __init__(self, store, name: str, params: dict):
+        self.store = store
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        handler = getattr(self.store, f"_rpc_{self.name}", None)
+        if handler is None:
+            raise NotImplementedError(f"Fake datastore has no RPC '{self.name}'")
+        with self.store.lock:
+            data = handler(**self.params)
+        self.store.stats.record(f"rpc.{self.name}", self.params, data)
+        return SimpleNamespace(data=data)
+
+
+class FakeSupabase:
+    """In-memory tables behind a Supabase-shaped client."""
+
+    def __init__(self):
+        self.tables = {}
+        self.indexes = {}  # table -> {primary key: row}
+        self.stats = DatastoreStats()
+        self.lock = threading.RLock()
+
+    # --- client surface ---
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: dict = None) -> FakeRpc:
+        return FakeRpc(self, name, params or {})
+
+    # --- direct access for seeding (not counted) ---
+    def rows(self, table: str) -> list:
+        return self.tables.setdefault(table, [])
+
+    def add(self, table: str, row: dict) -> dict:
+        pk = PRIMARY_KEYS.get(table, "id")
+        row.setdefault(pk, str(uuid.uuid4()))
+        self.rows(table).append(row)
+        self.indexes.setdefault(table, {})[row[pk]] = row
+        return row
+
+    def get(self, table: str, pk_value):
+        return self.indexes.get(table, {}).get(pk_value)
+
+    # --- query execution ---
+    def _matching(self, query: FakeQuery):
+        return [r for r in self.rows(query.table)
+                if all(pred(r) if col is None else pred(r.get(col)) for col, pred in query.filters if col is None or "." not in col)]
+
+    def _project(self, row: dict, columns: str) -> dict:
+        result = {}
+        for part in _split_columns(columns):
+            if "(" in part:
+                name = part[:part.index("(")].split("!")[0].strip()
+                inner = part[part.index("(") + 1:part.rindex(")")]
+                target = self.get(name, row.get(EMBED_KEYS.get(name, f"{name}_id")))
+                result[name] = self._project(target, inner) if target else None
+            elif part == "*":
+                result.update(row)
+            else:
+                result[part] = row.get(part)
+        return result
+
+    def _execute(self, query: FakeQuery):
+        with self.lock:
+            if query.op == "insert":
+                rows = query.payload if isinstance(query.payload, list) else [query.payload]
+                return [dict(self.add(query.table, dict(r))) for r in rows]
+
+            if query.op == "upsert":
+                rows = query.payload if isinstance(query.payload, list) else [query.payload]
+                keys = [k.strip() for k in (query.on_conflict or PRIMARY_KEYS.get(query.table, "id")).split(",")]
+                result = []
+                for r in rows:
+                    existing = next((e for e in self.rows(query.table) if all(e.get(k) == r.get(k) for k in keys)), None)
+                    if existing:
+                        existing.update(r)
+                    else:
+                        existing = self.add(query.table, dict(r))
+                    result.append(dict(existing))
+                return result
+
+            matched = self._matching(query)
+
+            if query.op == "update":
+                for r in matched:
+                    r.update(query.payload)
+                return [dict(r) for r in matched]
+
+            if query.op == "delete":
+                pk = PRIMARY_KEYS.get(query.table, "id")
+                for r in matched:
+                    self.indexes.get(query.table, {}).pop(r.get(pk), None)
+                self.tables[query.table] = [r for r in self.rows(query.table) if r not in matched]
+                return [dict(r) for r in matched]
+
+            for column, desc in reversed(query.orders):
+                matched.sort(key=lambda r: (r.get(column) is None, _as_comparable(r.get(column)) if r.get(column) is not None else 0), reverse=desc)
+            if query.row_limit is not None:
+                matched = matched[:query.row_limit]
+            data = [self._project(r, query.columns) for r in matched]
+
+            if query.single_mode:
+                return data[0] if data else None
+            return data
+
+    # --- RPC ports (see migrations/) ---
+    def _participants(self, match_id):
+        return [p for p in self.rows("match_participations") if p["match_id"] == match_id]
+
+    def _invites(self, match_id):
+        return [i for i in self.rows("match_invites") if i["match_id"] == match_id]
+
+    def _rpc_get_match_invite_context(self, p_match_id, p_skip_filters=False, p_target_player_ids=None):
+        match = self.get("matches", p_match_id)
+        if not match:
+            return None
+        parts = self._participants(p_match_id)
+        team1 = sorted((p for p in parts if p.get("team_index") == 1), key=lambda p: p.get("created_at") or "")
+        requester_id = team1[0]["player_id"] if team1 else match.get("originator_id")
+        requester = self.get("players", requester_id)
+        club = self.get("clubs", match.get("club_id"))
+
+        group_id = match.get("target_group_id")
+        group_members = {g["player_id"] for g in self.rows("group_memberships") if g["group_id"] == group_id} if group_id else None
+        group_found = not group_id or bool(group_members)
+
+        candidates = []
+        if match["status"] in ("pending", "voting") and group_found:
+            level_min, level_max = match.get("level_range_min"), match.get("level_range_max")
+            if not p_skip_filters and (level_min is None or level_max is None):
+                target = (requester or {}).get("adjusted_skill_level") or (requester or {}).get("declared_skill_level") or 3.5
+                level_min, level_max = target - 0.25, target + 0.25
+            gender = (match.get("gender_preference") or "mixed").lower()
+            involved = {p["player_id"] for p in parts} | {i["player_id"] for i in self._invites(p_match_id)}
+            now = datetime.now(timezone.utc)
+            # Insertion order (not a set) keeps runs reproducible
+            if p_target_player_ids:
+                pool = list(dict.fromkeys(p_target_player_ids))
+            else:
+                pool = list(dict.fromkeys(m["player_id"] for m in self.rows("club_members") if m["club_id"] == match.get("club_id")))
+            for pid in pool:
+                p = self.get("players", pid)
+                if not p or pid in involved:
+                    continue
+                if not p_target_player_ids and not p.get("active_status"):
+                    continue
+                if group_members is not None and pid not in group_members:
+                    continue
+                if p.get("muted_until") and _as_comparable(p["muted_until"]) > now:
+                    continue
+                if not p_skip_filters:
+                    level = p.get("adjusted_skill_level") or p.get("declared_skill_level") or 3.5
+                    if not (level_min <= level <= level_max):
+                        continue
+                    if gender in ("male", "female") and (p.get("gender") or "").lower() != gender:
+                        continue
+                candidates.append({k: p.get(k) for k in (
+                    "player_id", "name", "phone_number", "gender", "declared_skill_level",
+                    "adjusted_skill_level", "responsiveness_score", "reputation_score", "availability_mask")})
+
+        return {
+            "match": dict(match),
+            "requester": {k: requester.get(k) for k in ("player_id", "name", "phone_number", "declared_skill_level", "adjusted_skill_level")} if requester else None,
+            "club": {"name": club["name"], "settings": club.get("settings"), "timezone": club.get("timezone")} if club else None,
+            "group_found": group_found,
+            "candidates": candidates,
+        }
+
+    def _rpc_attempt_insert_invites(self, p_match_id, p_player_ids, p_status, p_batch_number, p_sent_at,
+                                    p_expires_at, p_invite_scores=None, p_score_breakdowns=None, p_send_after=None):
+        if not self.get("matches", p_match_id):
+            return [{"player_id": pid, "status": "MATCH_NOT_FOUND"} for pid in p_player_ids]
+        parts = {p["player_id"] for p in self._participants(p_match_id)}
+        if len(parts) >= 4:
+            return [{"player_id": pid, "status": "MATCH_FULL"} for pid in p_player_ids]
+        invited = {i["player_id"] for i in self._invites(p_match_id)}
+        results = []
+        for idx, pid in enumerate(p_player_ids):
+            if pid in invited:
+                status = "ALREADY_INVITED"
+            elif pid in parts:
+                status = "ALREADY_IN_MATCH"
+            else:
+                status = "SUCCESS"
+                invited.add(pid)
+                self.add("match_invites", {
+                    "match_id": p_match_id, "player_id": pid, "status": p_status,
+                    "batch_number": p_batch_number, "sent_at": p_sent_at, "expires_at": p_expires_at,
+                    "invite_score": (p_invite_scores or [None] * len(p_player_ids))[idx],
+                    "score_breakdown": (p_score_breakdowns or [None] * len(p_player_ids))[idx],
+                    "send_after": p_send_after, "refilled_at": None, "suggested_time": None,
+                })
+            results.append({"player_id": pid, "status": status})
+        return results
+
+    def _rpc_update_player_scores(self, p_rows):
+        return self._update_existing_players(p_rows)
+
+    def _rpc_apply_elo_replay(self, p_match_ids, p_history_player_ids, p_history_match_ids, p_history_old,
+                              p_history_new, p_history_times, p_players):
+        from logic.elo_service import elo_to_sync_rating
+        replayed = set(p_match_ids)
+        history = [h for h in self.rows("player_rating_history")
+                   if not (h.get("change_type") == "match_result" and h.get("match_id") in replayed)]
+        self.tables["player_rating_history"] = history
+        self.indexes["player_rating_history"] = {h[PRIMARY_KEYS.get("player_rating_history", "id")]: h for h in history}
+        for player_id, match_id, old_elo, new_elo, created_at in zip(
+                p_history_player_ids, p_history_match_ids, p_history_old, p_history_new, p_history_times):
+            if self.get("players", player_id) is None or self.get("matches", match_id) is None:
+                continue
+            self.add("player_rating_history", {
+                "player_id": player_id, "old_elo_rating": old_elo, "new_elo_rating": new_elo,
+                "old_sync_rating": elo_to_sync_rating(old_elo), "new_sync_rating": elo_to_sync_rating(new_elo),
+                "change_type": "match_result", "match_id": match_id, "created_at": created_at,
+            })
+        return self._update_existing_players(p_players)
+
+    def _update_existing_players(self, rows):
+        """UPDATE ... FROM jsonb_to_recordset: rows of players that no longer exist are ignored."""
+        updated = []
+        for row in rows:
+            player = self.get("players", row["player_id"])
+            if player is not None:
+                player.update(row)
+                updated.append({"player_id": row["player_id"]})
+        return updated
+
+    def _rpc_get_stale_invite_refills(self, p_now=None, p_match_ids=None):
+        now = _as_comparable(p_now) if p_now else datetime.now(timezone.utc)
+        wanted = set(p_match_ids) if p_match_ids is not None else None
+        stale = {}
+        for inv in self.rows("match_invites"):
+            if inv.get("status") != "sent" or not inv.get("match_id") or inv.get("refilled_at") is not None:
+                continue
+            if not inv.get("expires_at") or _as_comparable(inv["expires_at"]) >= now:
+                continue
+            if wanted is not None and inv["match_id"] not in wanted:
+                continue
+            stale.setdefault(inv["match_id"], []).append(inv["invite_id"])
+        rows = []
+        for match_id, invite_ids in stale.items():
+            match = self.get("matches", match_id) or {}
+            club = self.get("clubs", match.get("club_id")) or {}
+            batches = [i.get("batch_number") or 0 for i in self._invites(match_id)]
+            rows.append({
+                "match_id": match_id, "match_status": match.get("status"), "club_id": match.get("club_id"),
+                "club_settings": club.get("settings"), "club_timezone": club.get("timezone"),
+                "invite_ids": sorted(invite_ids), "max_batch_number": max(batches) if batches else None,
+            })
+        return rows
+
+    def _rpc_get_uninvited_open_matches(self):
+        invited = {i["match_id"] for i in self.rows("match_invites")}
+        return [{"match_id": m["match_id"], "club_id": m.get("club_id")} for m in self.rows("matches")
+                if m["status"] in ("pending", "voting") and m.get("scheduled_time") and m["match_id"] not in invited]
+
+    def _rpc_sample_last_call_candidates(self, p_match_id, p_limit=10):
+        import random
+        match = self.get("matches", p_match_id)
+        parts = {p["player_id"] for p in self._participants(p_match_id)}
+        if not match or len(parts) != 3:
+            return []
+        invited = {i["player_id"] for i in self._invites(p_match_id)}
+        pool = []
+        for m in self.rows("club_members"):
+            if m["club_id"] != match.get("club_id") or m["player_id"] in parts or m["player_id"] in invited:
+                continue
+            p = self.get("players", m["player_id"])
+            if p and p.get("active_status"):
+                pool.append({"player_id": p["player_id"], "phone_number": p["phone_number"], "name": p["name"]})
+        return random.sample(pool, min(p_limit, len(pool)))
+
+    def _rpc_get_match_deadpool_snapshot(self, p_match_id):
+        match = self.get("matches", p_match_id)
+        if not match:
+            return None
+        parts = {p["player_id"] for p in self._participants(p_match_id)}
+        invites = self._invites(p_match_id)
+        group_id = match.get("target_group_id")
+        remaining = 0
+        if group_id:
+            involved = parts | {i["player_id"] for i in invites}
+            remaining = sum(1 for g in self.rows("group_memberships") if g["group_id"] == group_id and g["player_id"] not in involved)
+        suggestions = Counter(i["suggested_time"] for i in invites if i.get("suggested_time"))
+        top = suggestions.most_common(1)
+        originator = self.get("players", match.get("originator_id"))
+        club = self.get("clubs", match.get("club_id")) or {}
+        group = self.get("player_groups", group_id) if group_id else None
+        return {
+            "match_id": p_match_id, "status": match["status"], "club_id": match.get("club_id"),
+            "target_group_id": group_id, "scheduled_time": match.get("scheduled_time"),
+            "bridge_offer_sent": bool(match.get("bridge_offer_sent")),
+            "needed": 4 - len(parts) - sum(1 for i in invites if i.get("status") == "sent"),
+            "remaining_pool": remaining,
+            "top_suggested_time": top[0][0] if top else None,
+            "top_suggested_count": top[0][1] if top else 0,
+            "originator": {k: originator.get(k) for k in ("player_id", "phone_number", "name")} if originator else None,
+            "club_name": club.get("name"), "club_timezone": club.get("timezone"),
+            "group_name": group.get("name") if group else None,
+        }
@@ -18,8 +18,7 @@ from logic_utils import (
     parse_iso_datetime, get_now_utc, format_sms_datetime
 )
 import sms_constants as msg
-from redis_client import get_redis_client
-import json
+from redis_client import set_user_state
 import pytz
 from twilio_client import send_sms
 
@@ -27,6 +26,7 @@ from twilio_client import send_sms
 DEFAULT_FEEDBACK_DELAY_HOURS = 3.0
 DEFAULT_REMINDER_DELAY_HOURS = 4.0
 ASSUMED_MATCH_DURATION_HOURS = 1.5 # Padel matches are typically 90 mins
+FEEDBACK_STATE_TTL_SECONDS = 86400 # Players may reply to a feedback request up to a day later
 
 
 def get_matches_needing_feedback():
@@ -177,7 +177,6 @@ def send_feedback_requests_for_match(match: dict, is_manual_trigger: bool = Fals
                 print(f"[WARNING] Player {pid} not found for feedback")
 
     sent_count = 0
-    r = get_redis_client()
     
     for player_id in all_players:
         # SKIP if player already responded
@@ -237,16 +236,10 @@ def send_feedback_requests_for_match(match: dict, is_manual_trigger: bool = Fals
             player3_name=other_players[2]["name"]
         )
         
-        if r:
-            key = f"user:{player['phone_number']}"
-            state_data = {
-                "state": msg.STATE_WAITING_FEEDBACK,
-                "match_id": match_id,
-                "players_to_rate": json.dumps([p["player_id"] for p in other_players])
-            }
-            for k, v in state_data.items():
-                r.hset(key, k, v)
-            r.expire(key, 86400)
+        set_user_state(player["phone_number"], msg.STATE_WAITING_FEEDBACK, {
+            "match_id": match_id,
+            "players_to_rate": [p["player_id"] for p in other_players]
+        }, ttl=FEEDBACK_STATE_TTL_SECONDS)
         
         if send_sms(player["phone_number"], message, club_id=club_id):
             sent_count += 1
@@ -319,17 +312,10 @@ On a scale of 1-10, how likely are you to play again with:
 
 Reply with 3 numbers (e.g., "8 7 9") or SKIP"""
     
-    r = get_redis_client()
-    if r:
-        key = f"user:{player['phone_number']}"
-        state_data = {
-            "state": msg.STATE_WAITING_FEEDBACK,
-            "match_id": match_id,
-            "players_to_rate": json.dumps([p["player_id"] for p in other_players])
-        }
-        for k, v in state_data.items():
-            r.hset(key, k, v)
-        r.expire(key, 86400)
+    set_user_state(player["phone_number"], msg.STATE_WAITING_FEEDBACK, {
+        "match_id": match_id,
+        "players_to_rate": [p["player_id"] for p in other_players]
+    }, ttl=FEEDBACK_STATE_TTL_SECONDS)
     
     if send_sms(player["phone_number"], message, club_id=match.get("club_id")):
         return True
@@ -339,18 +325,20 @@ Reply with 3 numbers (e.g., "8 7 9") or SKIP"""
         return False
 
 
-def run_feedback_scheduler():
-    """Main entry point for cron job."""
+def run_feedback_scheduler(deadline=None):
+    """Main entry point for cron job. Matches and reminders fan out on the cron executor."""
+    from cron_executor import fan_out, CronDeadline
+    deadline = deadline or CronDeadline()
+    
     matches = get_matches_needing_feedback()
-    initial_sent = 0
-    for match in matches:
-        initial_sent += send_feedback_requests_for_match(match)
+    run = fan_out("feedback", matches, send_feedback_requests_for_match,
+                  club_of=lambda m: m.get("club_id"), deadline=deadline)
+    initial_sent = sum(run.values())
     
     requests = get_requests_needing_reminder()
-    reminders_sent = 0
-    for request in requests:
-        if send_reminder_for_request(request):
-            reminders_sent += 1
+    run = fan_out("feedback-reminders", requests, send_reminder_for_request,
+                  club_of=lambda r: (r.get("matches") or {}).get("club_id"), deadline=deadline)
+    reminders_sent = sum(1 for sent in run.values() if sent)
         
     return {
         "matches_processed": len(matches),
@@ -6,7 +6,6 @@ from twilio_client import send_sms
 import sms_constants as msg
 from redis_client import clear_user_state
 import re
-import json
 from logic_utils import get_now_utc
 
 
@@ -31,18 +30,8 @@ def handle_feedback_response(from_number: str, body: str, player: dict, state_da
         send_sms(from_number, msg.MSG_FEEDBACK_INVALID, club_id=cid or player.get("club_id"))
         return
     
-    # Get players to rate from state (stored as JSON string or list)
-    players_to_rate_data = state_data.get("players_to_rate", [])
-    
-    if isinstance(players_to_rate_data, str):
-        try:
-            players_to_rate = json.loads(players_to_rate_data)
-        except json.JSONDecodeError:
-            players_to_rate = []
-    elif isinstance(players_to_rate_data, list):
-        players_to_rate = players_to_rate_data
-    else:
-        players_to_rate = []
+    # Get players to rate from state (typed as a list of player IDs)
+    players_to_rate = state_data.get("players_to_rate") or []
     
     match_id = state_data.get("match_id")
     
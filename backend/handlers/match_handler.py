@@ -989,20 +989,21 @@ def send_match_confirmation_notifications(match_id: str, player_id: str = None):
             # Build the message content based on role
             if pid == initiator_id:
                 # Booking instructions for the initiator
-                role_text = (
-                    f"As the organizer, please book the court here: {booking_url}\n\n"
-                    f"Alternatively, call {club_name} at {club_phone} to book directly."
+                role_text = msg.MSG_CONFIRMED_ROLE_ORGANIZER.format(
+                    booking_url=booking_url,
+                    club_name=club_name,
+                    club_phone=club_phone
                 )
             else:
                 # Standard sign-off for others
-                role_text = "See you on the court! 🏸"
+                role_text = msg.MSG_CONFIRMED_ROLE_PLAYER
             
             # Construct final message (clean and professional)
-            confirmation_msg = (
-                f"🎾 {club_name}: MATCH CONFIRMED!\n\n"
-                f"📅 {friendly_time}\n\n"
-                f"👥 Players:\n{players_text}\n\n"
-                f"{role_text}"
+            confirmation_msg = msg.MSG_MATCH_CONFIRMED_DETAILS.format(
+                club_name=club_name,
+                time=friendly_time,
+                players=players_text,
+                role_text=role_text
             )
             
             send_sms(phone, confirmation_msg, club_id=club_id)
@@ -2,6 +2,7 @@ from database import supabase
 from twilio_client import send_sms, get_club_name
 from redis_client import set_user_state, clear_user_state
 import sms_constants as msg
+from logic_utils import availability_mask
 
 def handle_onboarding(from_number: str, body: str, current_state: str, state_data: dict, club_id: str = None):
     """
@@ -70,7 +71,7 @@ def handle_onboarding(from_number: str, body: str, current_state: str, state_dat
                     "level": state_data.get("level"),
                     "gender": gender,
                     "club_id": club_id,
-                    "available_groups": public_groups
+                    "group_ids": [g["group_id"] for g in public_groups]
                 })
                 groups_text = "\n".join([f"{i+1}. {g['name']}" for i, g in enumerate(public_groups)])
                 send_sms(from_number, msg.MSG_ASK_GROUPS_ONBOARDING.format(groups_list=groups_text), club_id=club_id)
@@ -90,12 +91,12 @@ def handle_onboarding(from_number: str, body: str, current_state: str, state_dat
             
             if choice != "SKIP":
                 nums = re.findall(r'\d+', choice)
-                available = state_data.get("available_groups", [])
+                available = state_data.get("group_ids", [])
                 for n in nums:
                     try:
                         idx = int(n) - 1
                         if 0 <= idx < len(available):
-                            selected_ids.append(available[idx]["group_id"])
+                            selected_ids.append(available[idx])
                     except:
                         continue
             
@@ -129,6 +130,7 @@ def handle_onboarding(from_number: str, body: str, current_state: str, state_dat
                 }
                 for letter, key in mapping.items():
                     if letter in body_upper: avail_updates[key] = True
+            avail_updates["availability_mask"] = availability_mask(avail_updates)
             
             try:
                 # Universal Player already added to club in dispatcher, but here we update profile
@@ -142,7 +144,7 @@ def handle_onboarding(from_number: str, body: str, current_state: str, state_dat
                 
                 if existing_res.data:
                     player_id = existing_res.data[0]["player_id"]
-                    supabase.table("players").update({
+                    update_res = supabase.table("players").update({
                         "name": name, "gender": gender, "declared_skill_level": level, "adjusted_skill_level": level, **avail_updates
                     }).eq("player_id", player_id).execute()
                     
@@ -160,6 +162,10 @@ def handle_onboarding(from_number: str, body: str, current_state: str, state_dat
                         if new_memberships:
                             supabase.table("group_memberships").insert(new_memberships).execute()
                     
+                    import club_leaderboard
+                    if update_res.data:
+                        club_leaderboard.on_member_added(club_id, update_res.data[0])
+                    
                     clear_user_state(from_number)
                     from twilio_client import get_club_name
                     send_sms(from_number, msg.MSG_PROFILE_UPDATE_DONE.format(club_name=get_club_name()), club_id=club_id)
@@ -186,6 +192,9 @@ def handle_onboarding(from_number: str, body: str, current_state: str, state_dat
                     if selected_group_ids:
                         memberships = [{"group_id": gid, "player_id": new_player_id} for gid in selected_group_ids]
                         supabase.table("group_memberships").insert(memberships).execute()
+
+                    import club_leaderboard
+                    club_leaderboard.on_member_added(club_id, player_res.data[0])
                 
                 clear_user_state(from_number)
                 from twilio_client import get_club_name
@@ -11,7 +11,8 @@ from logic_utils import (
     get_club_timezone, 
     parse_iso_datetime, 
     format_sms_datetime,
-    get_now_utc
+    get_now_utc,
+    availability_mask
 )
 from handlers.match_handler import handle_match_request
 from handlers.result_handler import handle_result_report
@@ -221,7 +222,7 @@ def handle_groups_command(from_number: str, player: Dict, club_id: str, club_nam
         
         send_sms(from_number, response, club_id=club_id)
         set_user_state(from_number, msg.STATE_BROWSING_GROUPS, {
-            "available_groups": all_groups_ordered, 
+            "group_ids": [g["group_id"] for g in all_groups_ordered],
             "member_group_ids": list(member_group_ids),
             "club_id": str(club_id)
         })
@@ -406,7 +407,8 @@ def handle_availability_update(from_number: str, body: str, player: Dict, club_i
                 avail_updates[key] = True
     
     try:
-        supabase.table("players").update(avail_updates).eq("player_id", player["player_id"]).execute()
+        mask = availability_mask(avail_updates)
+        supabase.table("players").update({**avail_updates, "availability_mask": mask}).eq("player_id", player["player_id"]).execute()
         
         # Construct confirmation message
         active = [k for k, v in avail_updates.items() if v]
@@ -460,26 +462,22 @@ def handle_group_browsing_response(from_number: str, body: str, player: Dict, st
         send_sms(from_number, "No changes made. Text GROUPS anytime to browse again.", club_id=club_id)
         return
     
-    all_groups = state_data.get("available_groups", [])
+    all_group_ids = state_data.get("group_ids", [])
     member_group_ids = set(state_data.get("member_group_ids", []))
     player_id = player["player_id"]
     
     to_join = []
     to_leave = []
-    join_names = []
-    leave_names = []
     
     for n in nums:
         try:
             idx = int(n) - 1
-            if 0 <= idx < len(all_groups):
-                group = all_groups[idx]
-                if group["group_id"] in member_group_ids:
-                    to_leave.append(group["group_id"])
-                    leave_names.append(group["name"])
+            if 0 <= idx < len(all_group_ids):
+                group_id = all_group_ids[idx]
+                if group_id in member_group_ids:
+                    to_leave.append(group_id)
                 else:
-                    to_join.append(group["group_id"])
-                    join_names.append(group["name"])
+                    to_join.append(group_id)
         except ValueError:
             continue
     
@@ -487,6 +485,12 @@ def handle_group_browsing_response(from_number: str, body: str, player: Dict, st
         try:
             responses = []
             
+            # State only keeps group IDs; resolve the names for the confirmation
+            names_res = supabase.table("player_groups").select("group_id, name").in_("group_id", to_join + to_leave).execute()
+            group_names = {g["group_id"]: g["name"] for g in (names_res.data or [])}
+            join_names = [group_names.get(gid, "Unknown group") for gid in to_join]
+            leave_names = [group_names.get(gid, "Unknown group") for gid in to_leave]
+            
             if to_join:
                 memberships = [{"group_id": gid, "player_id": player_id} for gid in to_join]
                 supabase.table("group_memberships").insert(memberships).execute()
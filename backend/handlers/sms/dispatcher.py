@@ -233,6 +233,8 @@ class IntentDispatcher:
                             "club_id": cid,
                             "player_id": player["player_id"]
                         }).execute()
+                        import club_leaderboard
+                        club_leaderboard.on_member_added(cid, player)
                         
                         welcome_back = msg.MSG_PROFILE_UPDATE_DONE.format(club_name=cname)
                         send_sms(from_number, welcome_back, club_id=cid)
@@ -0,0 +1,223 @@
+"""
+Invite Allocator - Spreads one batch round's invites across overlapping matches.
+
+find_and_invite_players ranks candidates for one match at a time, so when a
+club has several open matches around the same time, every match invites the
+same top-scored players: they can play only one of them, the others get no
+invite at all, and the matches fill slower for more SMS.
+
+allocate_invite_round() runs before a cron round invites (pending-match
+catch-up, batch refills):
+1. The invite contexts of all matches in the round are fetched (in parallel)
+2. Matches of the same club starting within SLOT_OVERLAP_MINUTES of each other
+   conflict; connected conflicts form a group that is allocated together
+3. Per group, a player x match score matrix (scoring engine scores, minus
+   UNAVAILABLE_PENALTY outside the player's availability) is assigned greedily
+   by descending score under the match capacities, giving each player at most
+   one of the conflicting matches (counting invites they still hold)
+4. Capacity the spread could not fill goes to the best remaining candidates
+   even if they conflict, so no match gets fewer invites than on its own
+
+Each match then goes through find_and_invite_players with its assigned
+candidates as the pre-fetched context. Matches without conflicts keep their
+context unchanged.
+"""
+
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from database import supabase
+from logic_utils import parse_iso_datetime, availability_bucket_bit, is_available_for
+
+ALLOCATOR_ENABLED = os.getenv("INVITE_ALLOCATOR", "on").lower() != "off"
+SLOT_OVERLAP_MINUTES = 120
+# Subtracted from scores outside a player's availability (scores are 0-100)
+UNAVAILABLE_PENALTY = 1000
+OPEN_INVITE_STATUSES = ["sent", "pending_sms"]
+
+
+def _start_time(context: dict):
+    try:
+        return parse_iso_datetime(context["match"].get("scheduled_time"))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def conflict_graph(contexts: Dict[str, dict]) -> Dict[str, set]:
+    """Match id -> the matches of the same club starting within SLOT_OVERLAP_MINUTES of it."""
+    conflicts = {match_id: set() for match_id in contexts}
+    by_club = {}
+    for match_id, context in contexts.items():
+        start = _start_time(context)
+        if start is not None:
+            by_club.setdefault(context["match"].get("club_id"), []).append((start, match_id))
+
+    # Sorted by start time, each match only needs comparing with the ones after it
+    # until the gap reaches the window
+    for slots in by_club.values():
+        slots.sort(key=lambda slot: slot[0])
+        for i, (start, match_id) in enumerate(slots):
+            for other_start, other_id in slots[i + 1:]:
+                if (other_start - start).total_seconds() >= SLOT_OVERLAP_MINUTES * 60:
+                    break
+                conflicts[match_id].add(other_id)
+                conflicts[other_id].add(match_id)
+    return conflicts
+
+
+def conflict_groups(conflicts: Dict[str, set]) -> List[List[str]]:
+    """Connected components of the conflict graph."""
+    groups, seen = [], set()
+    for match_id in conflicts:
+        if match_id in seen:
+            continue
+        group, stack = [], [match_id]
+        seen.add(match_id)
+        while stack:
+            current = stack.pop()
+            group.append(current)
+            for other in conflicts[current] - seen:
+                seen.add(other)
+                stack.append(other)
+        groups.append(group)
+    return groups
+
+
+def _score_matrix(contexts: Dict[str, dict], match_ids: List[str]) -> List[Tuple[float, int, str, dict]]:
+    """Edges (score, tie-break, match_id, candidate) for every eligible player of every match."""
+    from scoring_engine import rank_candidates_batch
+
+    edges = []
+    order = 0
+    for match_id in match_ids:
+        context = contexts[match_id]
+        match = context["match"]
+        details = {
+            "level_min": match.get("level_range_min"),
+            "level_max": match.get("level_range_max"),
+            "gender_preference": match.get("gender_preference")
+        }
+        bucket_bit = availability_bucket_bit(match.get("scheduled_time"), (context.get("club") or {}).get("timezone"))
+        for candidate in rank_candidates_batch(context.get("candidates") or [], details):
+            score = candidate.get("_invite_score") or 0
+            if not is_available_for(candidate.get("availability_mask"), bucket_bit):
+                score -= UNAVAILABLE_PENALTY
+            edges.append((score, order, match_id, candidate))
+            order += 1
+    # Highest score first; equal scores keep match order, then rank order
+    edges.sort(key=lambda edge: (-edge[0], edge[1]))
+    return edges
+
+
+def allocate_invites(
+    contexts: Dict[str, dict],
+    capacities: Dict[str, int],
+    conflicts: Dict[str, set],
+    held_invites: Dict[str, set] = None,
+) -> Dict[str, List[dict]]:
+    """
+    Assign candidates to matches: greedy by descending score, at most capacities[m]
+    per match, and a player never gets two matches that conflict (conflicts[m] is
+    the set of matches overlapping m; held_invites maps player -> matches they
+    already hold an open invite for). Leftover capacity is then filled ignoring
+    conflicts. Returns {match_id: assigned candidates in score order}.
+    """
+    match_ids = list(contexts.keys())
+    edges = _score_matrix(contexts, match_ids)
+    held_invites = held_invites or {}
+
+    remaining = {match_id: capacities.get(match_id, 0) for match_id in match_ids}
+    assigned = {match_id: [] for match_id in match_ids}
+    assigned_players = {match_id: set() for match_id in match_ids}
+    player_matches = {}
+    leftovers = []
+
+    for edge in edges:
+        _, _, match_id, candidate = edge
+        if remaining[match_id] <= 0:
+            continue
+        player_id = candidate["player_id"]
+        taken = player_matches.get(player_id, set()) | held_invites.get(player_id, set())
+        if taken & conflicts.get(match_id, set()):
+            leftovers.append(edge)
+            continue
+        assigned[match_id].append(candidate)
+        assigned_players[match_id].add(player_id)
+        player_matches.setdefault(player_id, set()).add(match_id)
+        remaining[match_id] -= 1
+
+    for _, _, match_id, candidate in leftovers:
+        if remaining[match_id] > 0 and candidate["player_id"] not in assigned_players[match_id]:
+            assigned[match_id].append(candidate)
+            assigned_players[match_id].add(candidate["player_id"])
+            remaining[match_id] -= 1
+
+    return assigned
+
+
+def _held_invites(match_ids: List[str]) -> Dict[str, set]:
+    """Player -> matches (of these) they hold an open invite for."""
+    res = supabase.table("match_invites").select("match_id, player_id")\
+        .in_("match_id", match_ids)\
+        .in_("status", OPEN_INVITE_STATUSES)\
+        .execute()
+    held = {}
+    for row in (res.data or []):
+        held.setdefault(row["player_id"], set()).add(row["match_id"])
+    return held
+
+
+def allocate_invite_round(
+    requests: Iterable[Tuple[str, Optional[int]]],
+    job_name: str,
+    club_of: Callable[[str], Optional[str]] = lambda match_id: None,
+    deadline=None,
+) -> Dict[str, dict]:
+    """
+    Fetch the invite contexts of a round's matches and spread overlapping matches'
+    candidates. requests are (match_id, invites wanted; None = the club's batch size).
+    Returns {match_id: context} to pass to find_and_invite_players; matches whose
+    context could not be fetched are left out (they fetch their own).
+    """
+    requests = list(requests)
+    if not ALLOCATOR_ENABLED or len(requests) < 2:
+        return {}
+
+    from cron_executor import fan_out
+    from matchmaker import get_match_invite_context, BATCH_SIZE
+
+    match_ids = [match_id for match_id, _ in requests]
+    run = fan_out(job_name, match_ids, get_match_invite_context, club_of=club_of, deadline=deadline)
+    contexts = {match_id: context for match_id, context in zip(match_ids, run.results) if context}
+
+    open_contexts = {
+        match_id: context for match_id, context in contexts.items()
+        if context["match"].get("status") in ("pending", "voting") and context.get("candidates")
+    }
+    conflicts = conflict_graph(open_contexts)
+    # Members keep the round's order, so equal scores always break the same way
+    position = {match_id: i for i, match_id in enumerate(open_contexts)}
+    groups = [sorted(group, key=position.get) for group in conflict_groups(conflicts) if len(group) > 1]
+    if not groups:
+        return contexts
+
+    wanted = dict(requests)
+    grouped_ids = [match_id for group in groups for match_id in group]
+    try:
+        held = _held_invites(grouped_ids)
+    except Exception as e:
+        print(f"[ALLOCATOR] Could not load open invites, allocating without them: {e}")
+        held = {}
+
+    for group in groups:
+        group_contexts = {match_id: open_contexts[match_id] for match_id in group}
+        capacities = {}
+        for match_id, context in group_contexts.items():
+            settings = (context.get("club") or {}).get("settings") or {}
+            capacities[match_id] = wanted.get(match_id) or settings.get("initial_batch_size", BATCH_SIZE)
+        assigned = allocate_invites(group_contexts, capacities, conflicts, held)
+        for match_id, candidates in assigned.items():
+            contexts[match_id] = {**contexts[match_id], "candidates": candidates}
+        print(f"[ALLOCATOR] Spread {sum(len(c) for c in assigned.values())} invites over {len(group)} overlapping matches")
+
+    return contexts
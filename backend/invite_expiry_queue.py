@@ -0,0 +1,224 @@
+"""
+Invite Expiry Queue - Delay queue of invite expiry deadlines.
+
+When invites are sent, their match is registered with the invite expiry time.
+A lightweight poller (/cron/invite-expiry, every minute) pops exactly the
+entries that are due and refills only those matches, instead of waiting for
+the 5-minute tick to scan match_invites for expires_at < now.
+
+Entries are "<match_id>|<expiry epoch seconds>", scored by the expiry, so
+several batches of one match keep their own deadlines.
+
+Due entries are claimed, not removed: a claim re-scores them to now +
+CLAIM_VISIBILITY_SECONDS, and only the matches the refill actually handled are
+acknowledged (removed). A run that fails or hits its deadline leaves the rest
+to reappear once the visibility timeout passes.
+
+Backends:
+- RedisExpiryQueue: ZSET "invite_expiry"; due entries are claimed atomically (Lua)
+- InMemoryExpiryQueue: heap with the same semantics within one process
+
+The queue is an accelerator, not the source of truth: the full stale-invite
+scan still runs as a periodic reconciliation (and on every tick when the queue
+is process-local), so a lost entry only delays a refill.
+"""
+
+import heapq
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List, Optional
+
+from state_store import SharedBackend
+
+EXPIRY_QUEUE_KEY = "invite_expiry"
+POP_BATCH_LIMIT = 500
+# Minutes past each hour during which the invite-timeout tick also runs the full scan
+RECONCILE_MINUTES = 5
+
+# Longer than any cron run, so a refill in progress is never claimed twice
+CLAIM_VISIBILITY_SECONDS = 5 * 60
+
+# Claim up to ARGV[2] members scored <= ARGV[1] in one atomic step: they are
+# re-scored to ARGV[3] (hidden until then) rather than removed
+_CLAIM_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, entry in ipairs(due) do
+    redis.call('ZADD', KEYS[1], ARGV[3], entry)
+end
+return due
+"""
+
+
+def _entry(match_id: str, expires_at: datetime) -> str:
+    return f"{match_id}|{int(expires_at.timestamp())}"
+
+
+def _match_id(entry: str) -> str:
+    return entry.split("|", 1)[0]
+
+
+def _match_ids(entries: List[str]) -> List[str]:
+    """Unique match ids of claimed entries, in due order."""
+    return list(dict.fromkeys(_match_id(e) for e in entries))
+
+
+class ExpiryQueue(ABC):
+    """Interface for the delay queue."""
+
+    # True when every process sees the same queue
+    is_shared = False
+
+    @abstractmethod
+    def schedule(self, match_id: str, expires_at: datetime):
+        """Register an invite batch of the match that expires at `expires_at`."""
+
+    @abstractmethod
+    def claim_due(self, now: datetime, limit: int = POP_BATCH_LIMIT,
+                  visibility_seconds: int = CLAIM_VISIBILITY_SECONDS) -> List[str]:
+        """Return the entries whose deadline has passed, hidden for visibility_seconds until acknowledged."""
+
+    @abstractmethod
+    def ack(self, entries: List[str]):
+        """Remove handled entries."""
+
+    def pop_due(self, now: datetime, limit: int = POP_BATCH_LIMIT) -> List[str]:
+        """Remove and return the match ids whose deadline has passed."""
+        entries = self.claim_due(now, limit)
+        if entries:
+            self.ack(entries)
+        return _match_ids(entries)
+
+    @abstractmethod
+    def size(self) -> int:
+        """Entries waiting, due or not."""
+
+
+class RedisExpiryQueue(ExpiryQueue):
+    is_shared = True
+
+    def __init__(self, client):
+        self.client = client
+
+    def schedule(self, match_id: str, expires_at: datetime):
+        self.client.zadd(EXPIRY_QUEUE_KEY, {_entry(match_id, expires_at): expires_at.timestamp()})
+
+    def claim_due(self, now: datetime, limit: int = POP_BATCH_LIMIT,
+                  visibility_seconds: int = CLAIM_VISIBILITY_SECONDS) -> List[str]:
+        return self.client.eval(
+            _CLAIM_DUE_SCRIPT, 1, EXPIRY_QUEUE_KEY, now.timestamp(), limit, now.timestamp() + visibility_seconds
+        ) or []
+
+    def ack(self, entries: List[str]):
+        self.client.zrem(EXPIRY_QUEUE_KEY, *entries)
+
+    def size(self) -> int:
+        return self.client.zcard(EXPIRY_QUEUE_KEY)
+
+
+class InMemoryExpiryQueue(ExpiryQueue):
+    """Process-local heap (local runs, tests)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap = []  # (score, entry); superseded scores are skipped lazily
+        self._scores = {}  # entry -> current score
+
+    def _push(self, entry: str, score: float):
+        self._scores[entry] = score
+        heapq.heappush(self._heap, (score, entry))
+
+    def schedule(self, match_id: str, expires_at: datetime):
+        entry = _entry(match_id, expires_at)
+        with self._lock:
+            if entry not in self._scores:
+                self._push(entry, expires_at.timestamp())
+
+    def claim_due(self, now: datetime, limit: int = POP_BATCH_LIMIT,
+                  visibility_seconds: int = CLAIM_VISIBILITY_SECONDS) -> List[str]:
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now.timestamp() and len(due) < limit:
+                score, entry = heapq.heappop(self._heap)
+                if self._scores.get(entry) == score:
+                    due.append(entry)
+            for entry in due:
+                self._push(entry, now.timestamp() + visibility_seconds)
+        return due
+
+    def ack(self, entries: List[str]):
+        with self._lock:
+            for entry in entries:
+                self._scores.pop(entry, None)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._scores)
+
+
+_expiry_queue = SharedBackend("invite expiry queue", RedisExpiryQueue, InMemoryExpiryQueue)
+
+
+def get_expiry_queue() -> ExpiryQueue:
+    """Redis-backed when conversation state uses Redis, otherwise in-memory."""
+    return _expiry_queue.get()
+
+
+def set_expiry_queue(queue: ExpiryQueue):
+    """Replace the expiry queue (tests, offline benchmarks)."""
+    _expiry_queue.set(queue)
+
+
+def schedule_invite_expiry(match_id: str, expires_at: Optional[datetime]):
+    """Register a match's invite deadline. Failures are logged: the reconciliation scan covers them."""
+    if not match_id or not expires_at:
+        return
+    try:
+        get_expiry_queue().schedule(match_id, expires_at)
+    except Exception as e:
+        print(f"[EXPIRY QUEUE] Could not schedule expiry for match {match_id}: {e}")
+
+
+def needs_reconciliation_scan(now: datetime) -> bool:
+    """Whether the invite-timeout tick should also run the full stale-invite scan."""
+    try:
+        shared = get_expiry_queue().is_shared
+    except Exception:
+        shared = False
+    return not shared or now.minute < RECONCILE_MINUTES
+
+
+def process_due_invite_expiries(deadline=None, now: datetime = None) -> int:
+    """
+    Refill exactly the matches whose invite deadlines are due. Returns new invites sent.
+    Matches the refill did not get to (deadline, failure) stay claimed and come back
+    after CLAIM_VISIBILITY_SECONDS.
+    """
+    from logic_utils import get_now_utc
+    from matchmaker import refill_stale_matches
+
+    now = now or get_now_utc()
+    queue = get_expiry_queue()
+    try:
+        entries = queue.claim_due(now)
+    except Exception as e:
+        print(f"[EXPIRY QUEUE] Could not claim due expiries: {e}")
+        return 0
+
+    if not entries:
+        return 0
+
+    match_ids = _match_ids(entries)
+    print(f"[EXPIRY QUEUE] {len(match_ids)} matches with due invite expiries")
+    new_invites, unfinished = refill_stale_matches(deadline=deadline, match_ids=match_ids, now=now)
+
+    unfinished = set(unfinished)
+    done = [e for e in entries if _match_id(e) not in unfinished]
+    if unfinished:
+        print(f"[EXPIRY QUEUE] {len(unfinished)} matches not refilled this run, retried after the visibility timeout")
+    try:
+        if done:
+            queue.ack(done)
+    except Exception as e:
+        print(f"[EXPIRY QUEUE] Could not acknowledge handled expiries: {e}")
+    return new_invites
@@ -0,0 +1,292 @@
+"""
+Elo Replay - Re-rates players by replaying every scored pairing in order.
+
+Changing the K-factors or the seeding in elo_service, or fixing a bad result,
+otherwise means correcting matches one at a time. replay_elo():
+1. Streams completed matches in (scheduled_time, match_id) keyset pages. Each
+   page's match_sets are grouped into pairings (one per team composition, in set
+   order, won by the team with more sets, as result_handler scores them); a
+   match without sets but with a winner_team is one pairing of its
+   participation teams (as update_match_elo scores it)
+2. Keeps the pairings as flat arrays of player indexes, and ratings and
+   confidences as int arrays indexed the same way, seeded with get_initial_elo
+3. Applies each pairing with the elo_service math (team mean, K by confidence,
+   calculate_elo_delta)
+4. Unless dry_run: regenerates the replayed matches' match_result history and
+   updates the players whose rating, confidence or sync rating changed, in one
+   transaction (apply_elo_replay, migration 053). The report lists the
+   per-player diff either way.
+
+Players restart from their seed: rating changes outside match results
+(assessments, pro verification, manual adjustments) are not replayed for
+players who have scored matches. Run it while no results are being reported;
+a report landing between the read and the write is overwritten.
+"""
+
+import time
+from array import array
+from typing import Dict, List
+
+from database import supabase
+from logic_utils import keyset_pages
+from logic.elo_service import calculate_elo_delta, get_player_k_factor, get_initial_elo, elo_to_sync_rating
+import club_leaderboard
+
+MATCH_PAGE_SIZE = 500
+ROW_PAGE_SIZE = 1000
+
+
+class PairingLog:
+    """
+    Scored pairings in replay order as flat arrays: pairing i is players
+    [4i, 4i+1] (team 1) vs [4i+2, 4i+3] (team 2), winners[i] (1, 2 or 0 = draw)
+    and matches[i] (index into match_ids / match_times).
+    """
+
+    def __init__(self):
+        self.player_index: Dict[str, int] = {}
+        self.player_ids: List[str] = []
+        self.match_ids: List[str] = []
+        self.match_times: List[str] = []
+        self.players = array("i")
+        self.winners = array("b")
+        self.matches = array("i")
+
+    def __len__(self):
+        return len(self.winners)
+
+    def _index(self, player_id: str) -> int:
+        index = self.player_index.get(player_id)
+        if index is None:
+            index = self.player_index[player_id] = len(self.player_ids)
+            self.player_ids.append(player_id)
+        return index
+
+    def add_match(self, match_id: str, scheduled_time: str) -> int:
+        self.match_ids.append(match_id)
+        self.match_times.append(scheduled_time)
+        return len(self.match_ids) - 1
+
+    def add(self, match_index: int, team_1: list, team_2: list, winner: int) -> bool:
+        """Record a pairing; False (skipped) unless the teams are 2 + 2 distinct players."""
+        team_1, team_2 = [p for p in team_1 if p], [p for p in team_2 if p]
+        if len(team_1) != 2 or len(team_2) != 2 or len(set(team_1 + team_2)) != 4:
+            return False
+        self.players.extend(self._index(p) for p in team_1 + team_2)
+        self.winners.append(winner if winner in (1, 2) else 0)
+        self.matches.append(match_index)
+        return True
+
+
+def _pairings_from_sets(sets: List[dict]) -> List[tuple]:
+    """(team_1, team_2, winner) per team composition, in order of their first set."""
+    pairings = {}
+    for s in sorted(sets, key=lambda s: s.get("set_number") or 0):
+        team_1 = [s["team_1_player_1"], s["team_1_player_2"]]
+        team_2 = [s["team_2_player_1"], s["team_2_player_2"]]
+        pairing = pairings.setdefault((frozenset(team_1), frozenset(team_2)), [team_1, team_2, 0, 0])
+        if s.get("winner_team") == 1:
+            pairing[2] += 1
+        elif s.get("winner_team") == 2:
+            pairing[3] += 1
+    return [(t1, t2, 1 if won_1 > won_2 else 2 if won_2 > won_1 else 0) for t1, t2, won_1, won_2 in pairings.values()]
+
+
+def load_pairings() -> PairingLog:
+    """Stream every completed match's scored pairings, in chronological order."""
+    log = PairingLog()
+    matches = lambda: supabase.table("matches").select("match_id, scheduled_time, winner_team")\
+        .eq("status", "completed").not_.is_("scheduled_time", "null")
+
+    for page in keyset_pages(matches, ["scheduled_time", "match_id"], MATCH_PAGE_SIZE):
+        match_ids = [m["match_id"] for m in page]
+
+        sets_by_match = {}
+        sets = lambda: supabase.table("match_sets")\
+            .select("set_id, match_id, set_number, team_1_player_1, team_1_player_2, "
+                    "team_2_player_1, team_2_player_2, winner_team")\
+            .in_("match_id", match_ids)
+        for rows in keyset_pages(sets, ["set_id"], ROW_PAGE_SIZE):
+            for row in rows:
+                sets_by_match.setdefault(row["match_id"], []).append(row)
+
+        # Results entered without sets (dashboard): the participation teams
+        teams_by_match = {}
+        unset_ids = [m["match_id"] for m in page if m["match_id"] not in sets_by_match and m.get("winner_team")]
+        if unset_ids:
+            parts = lambda: supabase.table("match_participations").select("match_id, player_id, team_index")\
+                .in_("match_id", unset_ids)
+            for rows in keyset_pages(parts, ["match_id", "player_id"], ROW_PAGE_SIZE):
+                for row in rows:
+                    teams = teams_by_match.setdefault(row["match_id"], {1: [], 2: []})
+                    if row.get("team_index") in teams:
+                        teams[row["team_index"]].append(row["player_id"])
+
+        for match in page:
+            if match["match_id"] in sets_by_match:
+                pairings = _pairings_from_sets(sets_by_match[match["match_id"]])
+            elif match["match_id"] in teams_by_match:
+                teams = teams_by_match[match["match_id"]]
+                pairings = [(teams[1], teams[2], int(match["winner_team"]))]
+            else:
+                continue
+            match_index = log.add_match(match["match_id"], match["scheduled_time"])
+            for team_1, team_2, winner in pairings:
+                log.add(match_index, team_1, team_2, winner)
+
+    return log
+
+
+def _load_players(player_ids: List[str]) -> Dict[str, dict]:
+    players = {}
+    for start in range(0, len(player_ids), ROW_PAGE_SIZE):
+        res = supabase.table("players")\
+            .select("player_id, name, declared_skill_level, elo_rating, elo_confidence, adjusted_skill_level")\
+            .in_("player_id", player_ids[start:start + ROW_PAGE_SIZE])\
+            .execute()
+        for p in (res.data or []):
+            players[p["player_id"]] = p
+    return players
+
+
+def replay(log: PairingLog, seeds: List[int], known: List[bool] = None):
+    """
+    Apply every pairing of the log to ratings starting at `seeds` (per player
+    index). Pairings with a player not in `known` are skipped.
+    Returns (ratings, confidences, history_old, history_new, skipped); history
+    arrays have 4 entries per pairing in log order (0 for skipped pairings).
+    """
+    ratings = array("i", seeds)
+    confidences = array("i", [0]) * len(seeds)
+    history_old = array("i", [0]) * (4 * len(log))
+    history_new = array("i", [0]) * (4 * len(log))
+    players, winners = log.players, log.winners
+    skipped = 0
+
+    for i in range(len(log)):
+        base = 4 * i
+        a, b, c, d = players[base], players[base + 1], players[base + 2], players[base + 3]
+        if known is not None and not (known[a] and known[b] and known[c] and known[d]):
+            skipped += 1
+            continue
+        team_1 = (ratings[a] + ratings[b]) / 2
+        team_2 = (ratings[c] + ratings[d]) / 2
+        winner = winners[i]
+        result_1 = 1.0 if winner == 1 else 0.0 if winner == 2 else 0.5
+
+        # Deltas all use the ratings from before this pairing
+        deltas = (
+            calculate_elo_delta(team_1, team_2, result_1, get_player_k_factor(confidences[a])),
+            calculate_elo_delta(team_1, team_2, result_1, get_player_k_factor(confidences[b])),
+            calculate_elo_delta(team_2, team_1, 1.0 - result_1, get_player_k_factor(confidences[c])),
+            calculate_elo_delta(team_2, team_1, 1.0 - result_1, get_player_k_factor(confidences[d])),
+        )
+        for slot, (index, delta) in enumerate(zip((a, b, c, d), deltas)):
+            history_old[base + slot] = ratings[index]
+            ratings[index] += delta
+            history_new[base + slot] = ratings[index]
+            confidences[index] += 1
+
+    return ratings, confidences, history_old, history_new, skipped
+
+
+def _history_arrays(log: PairingLog, known: List[bool], history_old, history_new) -> dict:
+    """The regenerated match_result history as the parallel arrays apply_elo_replay takes."""
+    columns = {"p_history_player_ids": [], "p_history_match_ids": [], "p_history_old": [], "p_history_new": [],
+               "p_history_times": []}
+    for i in range(len(log)):
+        base = 4 * i
+        indexes = log.players[base:base + 4]
+        if not all(known[index] for index in indexes):
+            continue
+        match_index = log.matches[i]
+        for slot, index in enumerate(indexes):
+            columns["p_history_player_ids"].append(log.player_ids[index])
+            columns["p_history_match_ids"].append(log.match_ids[match_index])
+            columns["p_history_old"].append(history_old[base + slot])
+            columns["p_history_new"].append(history_new[base + slot])
+            # Timeline order follows the matches, not the replay
+            columns["p_history_times"].append(log.match_times[match_index])
+    return columns
+
+
+def _write(log: PairingLog, known: List[bool], history_old, history_new, changes: List[dict]) -> set:
+    """
+    Apply the replay in one transaction (apply_elo_replay): history and ratings
+    are written together or not at all, and players deleted since the read are
+    not re-created. Returns the ids of the players updated.
+    """
+    res = supabase.rpc("apply_elo_replay", {
+        "p_match_ids": log.match_ids,
+        **_history_arrays(log, known, history_old, history_new),
+        "p_players": [{
+            "player_id": c["player_id"],
+            "elo_rating": c["new_elo"],
+            "elo_confidence": c["new_confidence"],
+            "adjusted_skill_level": c["new_sync"]
+        } for c in changes]
+    }).execute()
+    updated = {row["player_id"] for row in (res.data or [])}
+    club_leaderboard.invalidate()
+    return updated
+
+
+def replay_elo(dry_run: bool = True) -> dict:
+    """
+    Replay every scored pairing from the players' seeds. With dry_run nothing is
+    written. Returns counts, timings and `changes` (players whose stored rating
+    differs from the replay, largest rating change first).
+    """
+    if not supabase:
+        raise Exception("Supabase client not initialized. Check environment variables.")
+
+    started = time.monotonic()
+    log = load_pairings()
+    players = _load_players(log.player_ids)
+    loaded = time.monotonic()
+
+    known = [pid in players for pid in log.player_ids]
+    seeds = [
+        get_initial_elo(float(players[pid].get("declared_skill_level") or 3.5)) if pid in players else 0
+        for pid in log.player_ids
+    ]
+    ratings, confidences, history_old, history_new, skipped = replay(log, seeds, known)
+    replayed = time.monotonic()
+
+    changes = []
+    for index, pid in enumerate(log.player_ids):
+        if not known[index]:
+            continue
+        player = players[pid]
+        new_elo, new_confidence = ratings[index], confidences[index]
+        new_sync = elo_to_sync_rating(new_elo)
+        current_sync = player.get("adjusted_skill_level")
+        if (player.get("elo_rating") != new_elo or player.get("elo_confidence") != new_confidence
+                or current_sync is None or float(current_sync) != new_sync):
+            changes.append({
+                "player_id": pid, "name": player.get("name"),
+                "old_elo": player.get("elo_rating"), "new_elo": new_elo,
+                "old_confidence": player.get("elo_confidence"), "new_confidence": new_confidence,
+                "old_sync": current_sync, "new_sync": new_sync
+            })
+    changes.sort(key=lambda c: -abs(c["new_elo"] - (c["old_elo"] or 0)))
+
+    if not dry_run:
+        _write(log, known, history_old, history_new, changes)
+
+    report = {
+        "dry_run": dry_run,
+        "matches": len(log.match_ids),
+        "pairings": len(log),
+        "skipped_pairings": skipped,
+        "players": sum(known),
+        "changed": len(changes),
+        "load_seconds": round(loaded - started, 3),
+        "replay_seconds": round(replayed - loaded, 3),
+        "total_seconds": round(time.monotonic() - started, 3),
+        "changes": changes
+    }
+    mode = "Dry run" if dry_run else "Applied"
+    print(f"[ELO_REPLAY] {mode}: {report['pairings']} pairings in {report['matches']} matches, "
+          f"{report['changed']}/{report['players']} players changed ({report['total_seconds']}s)")
+    return report
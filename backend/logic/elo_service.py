@@ -2,6 +2,7 @@ import math
 from typing import Dict, List, Tuple
 from database import supabase
 from logic_utils import get_match_participants
+import club_leaderboard
 # Elo constants
 BASE_K_FACTOR = 32
 PROVISIONAL_K_FACTOR = 64
@@ -39,147 +40,40 @@ def elo_to_sync_rating(elo: int) -> float:
     rating = (elo - 500) / 400
     return round(max(2.0, min(7.0, rating)), 2)
 
+def _apply_elo(match_id: str, team_1_ids: list, team_2_ids: list, winner_team: int, replace_existing: bool = False) -> bool:
+    """
+    Apply one pairing's Elo in the database (apply_match_elo, migration 051): the
+    four player rows are locked, updated and recorded in player_rating_history
+    in one transaction, so concurrent reports on the same players cannot
+    interleave. replace_existing first reverses the match's previous changes.
+    """
+    res = supabase.rpc("apply_match_elo", {
+        "p_match_id": match_id,
+        "p_team_1": team_1_ids,
+        "p_team_2": team_2_ids,
+        "p_winner_team": winner_team,
+        "p_replace_existing": replace_existing
+    }).execute()
+    rows = res.data or []
+    club_leaderboard.on_ratings_changed([row["player_id"] for row in rows])
+    return bool(rows)
+
 def update_match_elo(match_id: str, winner_team: int):
     """
     Calculates and applies Elo updates for all 4 players in a match.
     Also records the change in player_rating_history.
-    Handles corrections by reversing previous updates for the same match.
+    Handles corrections by reversing previous updates for the same match
+    (in the same transaction).
     """
-    # 0. Check for existing rating history for this match (Correction Case)
-    history_res = supabase.table("player_rating_history").select("*").eq("match_id", match_id).execute()
-    existing_history = history_res.data or []
-    
-    if existing_history:
-        print(f"DEBUG: Found {len(existing_history)} existing rating records for match {match_id}. Reversing...")
-        for entry in existing_history:
-            pid = entry["player_id"]
-            # To reverse, we set the player's rating back to old values
-            # and decrement confidence and match count
-            p_res = supabase.table("players").select("elo_confidence, total_matches_played").eq("player_id", pid).execute()
-            if p_res.data:
-                current_p = p_res.data[0]
-                supabase.table("players").update({
-                    "elo_rating": entry["old_elo_rating"],
-                    "adjusted_skill_level": entry["old_sync_rating"],
-                    "elo_confidence": max(0, current_p["elo_confidence"] - 1),
-                    "total_matches_played": max(0, current_p["total_matches_played"] - 1)
-                }).eq("player_id", pid).execute()
-        
-        # Delete old history for this match before recording new ones
-        supabase.table("player_rating_history").delete().eq("match_id", match_id).execute()
-
-    # 1. Fetch match and players
-    match_res = supabase.table("matches").select("*").eq("match_id", match_id).execute()
-    if not match_res.data:
-        return False
-    match = match_res.data[0]
-    
     participants = get_match_participants(match_id)
     team_1_ids = participants["team_1"]
     team_2_ids = participants["team_2"]
-    
+
     if len(team_1_ids) != 2 or len(team_2_ids) != 2:
         print(f"Match {match_id} does not have 4 players assigned to teams.")
         return False
 
-    # 2. Fetch player ratings (seeding if missing)
-    def get_player_data(pid):
-        p_res = supabase.table("players").select("player_id, elo_rating, elo_confidence, declared_skill_level, total_matches_played").eq("player_id", pid).execute()
-        if not p_res.data: return None
-        p = p_res.data[0]
-        if p.get("elo_rating") is None or (p.get("elo_rating") == 1500 and p.get("elo_confidence", 0) == 0):
-            p["elo_rating"] = get_initial_elo(float(p.get("declared_skill_level") or 3.5))
-        return p
-
-    players_1 = [get_player_data(pid) for pid in team_1_ids]
-    players_2 = [get_player_data(pid) for pid in team_2_ids]
-    
-    if None in players_1 or None in players_2:
-        return False
-
-    # 3. Calculate Team Ratings
-    team_1_rating = sum(p["elo_rating"] for p in players_1) / 2
-    team_2_rating = sum(p["elo_rating"] for p in players_2) / 2
-
-    # 4. Calculate updates for both teams
-    updates = []
-    
-    # Team 1 results
-    if winner_team == 1:
-        result_1 = 1.0
-    elif winner_team == 2:
-        result_1 = 0.0
-    else:
-        # Draw (0)
-        result_1 = 0.5
-
-    for p in players_1:
-        k = get_player_k_factor(p.get("elo_confidence", 0))
-        delta = calculate_elo_delta(team_1_rating, team_2_rating, result_1, k)
-        
-        old_elo = p["elo_rating"]
-        old_sync = elo_to_sync_rating(old_elo)
-        new_elo = old_elo + delta
-        new_sync = elo_to_sync_rating(new_elo)
-        
-        updates.append({
-            "player_id": p["player_id"],
-            "old_elo": old_elo,
-            "new_elo": new_elo,
-            "old_sync": old_sync,
-            "new_sync": new_sync,
-            "new_confidence": p.get("elo_confidence", 0) + 1,
-            "new_matches_played": (p.get("total_matches_played", 0) or 0) + 1
-        })
-
-    # Team 2 results
-    result_2 = 1.0 - result_1
-    for p in players_2:
-        k = get_player_k_factor(p.get("elo_confidence", 0))
-        delta = calculate_elo_delta(team_2_rating, team_1_rating, result_2, k)
-        
-        old_elo = p["elo_rating"]
-        old_sync = elo_to_sync_rating(old_elo)
-        new_elo = old_elo + delta
-        new_sync = elo_to_sync_rating(new_elo)
-        
-        updates.append({
-            "player_id": p["player_id"],
-            "old_elo": old_elo,
-            "new_elo": new_elo,
-            "old_sync": old_sync,
-            "new_sync": new_sync,
-            "new_confidence": p.get("elo_confidence", 0) + 1,
-            "new_matches_played": (p.get("total_matches_played", 0) or 0) + 1
-        })
-
-    # 5. Apply Updates to DB and Record History
-    history_records = []
-    
-    for up in updates:
-        # Update Player
-        supabase.table("players").update({
-            "elo_rating": up["new_elo"],
-            "elo_confidence": up["new_confidence"],
-            "adjusted_skill_level": up["new_sync"],
-            "total_matches_played": up["new_matches_played"]
-        }).eq("player_id", up["player_id"]).execute()
-
-        # Prepare History Entry
-        history_records.append({
-            "player_id": up["player_id"],
-            "old_elo_rating": up["old_elo"],
-            "new_elo_rating": up["new_elo"],
-            "old_sync_rating": up["old_sync"],
-            "new_sync_rating": up["new_sync"],
-            "change_type": "match_result",
-            "match_id": match_id
-        })
-        
-    if history_records:
-        supabase.table("player_rating_history").insert(history_records).execute()
-        
-    return True
+    return _apply_elo(match_id, team_1_ids, team_2_ids, winner_team, replace_existing=True)
 
 
 def apply_elo_for_pairing(match_id: str, team_1_ids: list, team_2_ids: list, winner_team: int):
@@ -192,76 +86,4 @@ def apply_elo_for_pairing(match_id: str, team_1_ids: list, team_2_ids: list, win
         print(f"apply_elo_for_pairing: invalid teams t1={team_1_ids} t2={team_2_ids}")
         return False
 
-    def get_player_data(pid):
-        p_res = supabase.table("players").select("player_id, elo_rating, elo_confidence, declared_skill_level, total_matches_played").eq("player_id", pid).execute()
-        if not p_res.data: return None
-        p = p_res.data[0]
-        if p.get("elo_rating") is None or (p.get("elo_rating") == 1500 and p.get("elo_confidence", 0) == 0):
-            p["elo_rating"] = get_initial_elo(float(p.get("declared_skill_level") or 3.5))
-        return p
-
-    players_1 = [get_player_data(pid) for pid in team_1_ids]
-    players_2 = [get_player_data(pid) for pid in team_2_ids]
-
-    if None in players_1 or None in players_2:
-        return False
-
-    team_1_rating = sum(p["elo_rating"] for p in players_1) / 2
-    team_2_rating = sum(p["elo_rating"] for p in players_2) / 2
-
-    if winner_team == 1:
-        result_1 = 1.0
-    elif winner_team == 2:
-        result_1 = 0.0
-    else:
-        result_1 = 0.5
-
-    updates = []
-    for p in players_1:
-        k = get_player_k_factor(p.get("elo_confidence", 0))
-        delta = calculate_elo_delta(team_1_rating, team_2_rating, result_1, k)
-        old_elo = p["elo_rating"]
-        new_elo = old_elo + delta
-        updates.append({
-            "player_id": p["player_id"],
-            "old_elo": old_elo, "new_elo": new_elo,
-            "old_sync": elo_to_sync_rating(old_elo), "new_sync": elo_to_sync_rating(new_elo),
-            "new_confidence": p.get("elo_confidence", 0) + 1,
-            "new_matches_played": (p.get("total_matches_played", 0) or 0) + 1
-        })
-
-    result_2 = 1.0 - result_1
-    for p in players_2:
-        k = get_player_k_factor(p.get("elo_confidence", 0))
-        delta = calculate_elo_delta(team_2_rating, team_1_rating, result_2, k)
-        old_elo = p["elo_rating"]
-        new_elo = old_elo + delta
-        updates.append({
-            "player_id": p["player_id"],
-            "old_elo": old_elo, "new_elo": new_elo,
-            "old_sync": elo_to_sync_rating(old_elo), "new_sync": elo_to_sync_rating(new_elo),
-            "new_confidence": p.get("elo_confidence", 0) + 1,
-            "new_matches_played": (p.get("total_matches_played", 0) or 0) + 1
-        })
-
-    history_records = []
-    for up in updates:
-        supabase.table("players").update({
-            "elo_rating": up["new_elo"],
-            "elo_confidence": up["new_confidence"],
-            "adjusted_skill_level": up["new_sync"],
-            "total_matches_played": up["new_matches_played"]
-        }).eq("player_id", up["player_id"]).execute()
-
-        history_records.append({
-            "player_id": up["player_id"],
-            "old_elo_rating": up["old_elo"], "new_elo_rating": up["new_elo"],
-            "old_sync_rating": up["old_sync"], "new_sync_rating": up["new_sync"],
-            "change_type": "match_result",
-            "match_id": match_id
-        })
-
-    if history_records:
-        supabase.table("player_rating_history").insert(history_records).execute()
-
-    return True
+    return _apply_elo(match_id, team_1_ids, team_2_ids, winner_team)
@@ -1,4 +1,5 @@
 from datetime import datetime, timezone, timedelta
+from typing import Optional
 import pytz
 from database import supabase
 
@@ -66,6 +67,13 @@ def to_utc_iso(dt_str: str, club_id: str) -> str:
         return dt_str 
 
 
+def _is_hour_in_quiet_window(current_hour: int, quiet_start: int, quiet_end: int) -> bool:
+    """Check if a local hour falls in a quiet window (windows may wrap past midnight)."""
+    if quiet_start > quiet_end:
+        return current_hour >= quiet_start or current_hour < quiet_end
+    return quiet_start <= current_hour < quiet_end
+
+
 def get_quiet_hours_info(club_id: str) -> tuple[bool, int]:
     """
     Returns (is_quiet, end_hour) for a specific club.
@@ -83,25 +91,108 @@ def get_quiet_hours_info(club_id: str) -> tuple[bool, int]:
         tz = pytz.timezone("America/New_York")
         
     now = datetime.now(tz)
-    current_hour = now.hour
-    
-    is_quiet = False
-    if quiet_start > quiet_end:
-        if current_hour >= quiet_start or current_hour < quiet_end:
-            is_quiet = True
-    else:
-        if quiet_start <= current_hour < quiet_end:
-            is_quiet = True
+    is_quiet = _is_hour_in_quiet_window(now.hour, quiet_start, quiet_end)
             
     return is_quiet, quiet_end
 
 
+def get_quiet_hours_release(settings: dict, timezone_str: str, now: datetime = None) -> Optional[datetime]:
+    """
+    Compute the earliest time a message created at `now` may be sent.
+    Returns None outside quiet hours (send immediately), otherwise the UTC
+    datetime at which the club's quiet-hours window ends.
+    """
+    settings = settings or {}
+    quiet_start = int(settings.get("quiet_hours_start", 21))
+    quiet_end = int(settings.get("quiet_hours_end", 8))
+    
+    try:
+        tz = pytz.timezone(timezone_str)
+    except Exception:
+        tz = pytz.timezone("America/New_York")
+    
+    now_local = (now or get_now_utc()).astimezone(tz)
+    if not _is_hour_in_quiet_window(now_local.hour, quiet_start, quiet_end):
+        return None
+    
+    release_date = now_local.date()
+    if quiet_start > quiet_end and now_local.hour >= quiet_start:
+        # Overnight window that started this evening ends tomorrow morning
+        release_date += timedelta(days=1)
+    
+    release_local = tz.localize(datetime(release_date.year, release_date.month, release_date.day, quiet_end))
+    return release_local.astimezone(timezone.utc)
+
+
+def get_club_quiet_hours_release(club_id: str) -> Optional[datetime]:
+    """Fetch a club's quiet-hours window and return its release time (see get_quiet_hours_release)."""
+    if not club_id:
+        return None
+    result = supabase.table("clubs").select("settings, timezone").eq("club_id", club_id).execute()
+    if not result.data:
+        return None
+    club = result.data[0]
+    return get_quiet_hours_release(club.get("settings"), club.get("timezone"))
+
+
 def is_quiet_hours(club_id: str) -> bool:
     """Check if current time is within quiet hours for a specific club."""
     is_quiet, _ = get_quiet_hours_info(club_id)
     return is_quiet
 
 
+# Availability buckets (migration 012), packed as players.availability_mask bits 0-5
+AVAILABILITY_COLUMNS = [
+    "avail_weekday_morning",    # Mon-Fri 6am-12pm
+    "avail_weekday_afternoon",  # Mon-Fri 12pm-5pm
+    "avail_weekday_evening",    # Mon-Fri 5pm-9pm
+    "avail_weekend_morning",    # Sat-Sun 6am-12pm
+    "avail_weekend_afternoon",  # Sat-Sun 12pm-5pm
+    "avail_weekend_evening",    # Sat-Sun 5pm-9pm
+]
+
+
+def availability_mask(avail: dict) -> int:
+    """Pack the six avail_* booleans into a 6-bit mask (0 = no preference given)."""
+    mask = 0
+    for bit, column in enumerate(AVAILABILITY_COLUMNS):
+        if avail.get(column):
+            mask |= 1 << bit
+    return mask
+
+
+def availability_bucket_bit(scheduled_time, timezone_str: str) -> int:
+    """
+    Mask bit of the bucket a match's local start time falls into.
+    Returns 0 when the time is outside every bucket (before 6am, from 9pm) or unknown.
+    """
+    if not scheduled_time:
+        return 0
+    try:
+        dt = parse_iso_datetime(scheduled_time) if isinstance(scheduled_time, str) else scheduled_time
+        tz = pytz.timezone(timezone_str)
+    except Exception:
+        return 0
+
+    local = dt.astimezone(tz)
+    if 6 <= local.hour < 12:
+        slot = 0
+    elif 12 <= local.hour < 17:
+        slot = 1
+    elif 17 <= local.hour < 21:
+        slot = 2
+    else:
+        return 0
+    if local.weekday() >= 5:
+        slot += 3
+    return 1 << slot
+
+
+def is_available_for(mask, bucket_bit: int) -> bool:
+    """A player without any availability set, or a time outside the buckets, counts as available."""
+    return not mask or not bucket_bit or bool(mask & bucket_bit)
+
+
 def get_booking_url(club: dict) -> str:
     """Generate a booking URL based on the club's booking system and slug."""
     system = (club.get("booking_system") or "").lower()
@@ -233,6 +324,31 @@ def normalize_score(score_str: str) -> str:
     
     return score_str # Fallback to original if we can't parse it
 
+def keyset_pages(build_query, keys, page_size):
+    """
+    Yield pages of a query ordered by `keys` (unique together, one or two columns),
+    each page starting after the last row of the previous one. Unlike offsets,
+    every page is an index range scan and nothing is skipped or repeated.
+    """
+    after = None
+    while True:
+        query = build_query()
+        for key in keys:
+            query = query.order(key)
+        if after is not None:
+            if len(keys) == 1:
+                query = query.gt(keys[0], after[0])
+            else:
+                # Values are quoted: timestamps contain PostgREST's reserved "." and ":"
+                (first, second), (a, b) = keys, after
+                query = query.or_(f'{first}.gt."{a}",and({first}.eq."{a}",{second}.gt."{b}")')
+        rows = query.limit(page_size).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        after = tuple(rows[-1][key] for key in keys)
+
 def get_match_participants(match_id: str) -> dict:
     """
     Fetch participants from the match_participations table.
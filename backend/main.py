@@ -81,9 +81,13 @@ async def trigger_score_recalculation_direct():
     from fastapi import HTTPException
     import traceback
     try:
-        from score_calculator import recalculate_player_scores
-        count = recalculate_player_scores()
-        return {"message": f"Scores recalculated successfully for {count} players (DIRECT)"}
+        from score_calculator import reconcile_player_scores
+        from cron_lease import cron_lease
+        with cron_lease("recalculate-scores", api_routes.CRON_LEASE_TTL_SECONDS["recalculate-scores"]) as lease:
+            if lease is None:
+                return {"message": "Skipped: previous recalculate-scores run still in progress", "skipped": True}
+            count = reconcile_player_scores()
+            return {"message": f"Scores reconciled successfully: {count} players corrected (DIRECT)"}
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,7 +1,7 @@
 from typing import List, Optional
 from datetime import datetime
 from database import supabase
-from logic_utils import parse_iso_datetime, get_now_utc, get_now_utc_iso, to_utc_iso, get_match_participants, format_sms_datetime, is_quiet_hours
+from logic_utils import parse_iso_datetime, get_now_utc, get_now_utc_iso, to_utc_iso, get_match_participants, format_sms_datetime, get_club_quiet_hours_release, get_club_timezone, availability_bucket_bit, is_available_for
 
 def _get_club_name(club_id: str) -> str:
     """Helper to get club name from ID."""
@@ -17,7 +17,8 @@ def get_player_recommendations(
     target_level: float,
     gender_preference: Optional[str] = None,
     exclude_player_ids: List[str] = [],
-    limit: int = 10
+    limit: int = 10,
+    scheduled_time: Optional[str] = None
 ) -> List[dict]:
     """
     Get recommended players for a match based on level and gender.
@@ -28,75 +29,51 @@ def get_player_recommendations(
         gender_preference: Optional 'male', 'female', or 'mixed' (any)
         exclude_player_ids: List of player IDs to exclude (e.g. host)
         limit: Max number of recommendations to return
+        scheduled_time: Optional match time; players available then are listed first
         
     Returns:
         List of player dictionaries
     """
     
-    # Base query
-    # 1. Fetch player IDs for this club from club_members
-    members_res = supabase.table("club_members").select("player_id").eq("club_id", club_id).execute()
-    member_ids = [m["player_id"] for m in (members_res.data or [])]
-    
-    if not member_ids:
-        return []
-
-    # 2. Fetch data for these players
-    query = supabase.table("players")\
-        .select("*")\
-        .in_("player_id", member_ids)\
-        .eq("active_status", True)
-        
-    # Filter by level (allow +/- 0.5 range)
-    # Note: Supabase doesn't support complex OR logic easily in one chain, 
-    # so we'll fetch a slightly wider range and filter in python if needed,
-    # or just look for exact matches and adjacent levels.
-    # For now, let's try to find players within 0.5 of target level.
-    # Since we can't do "between" easily with the client sometimes, let's use gte/lte
-    
+    # One query: active members of the club in the level range (inner join on
+    # club_members), optionally of one gender
     min_level = target_level - 0.5
     max_level = target_level + 0.5
     
-    query = query.gte("declared_skill_level", min_level)\
-                 .lte("declared_skill_level", max_level)
-    
-    # Filter by gender if specified and not 'mixed'
+    query = supabase.table("players")\
+        .select("*, club_members!inner(club_id)")\
+        .eq("club_members.club_id", club_id)\
+        .eq("active_status", True)\
+        .gte("declared_skill_level", min_level)\
+        .lte("declared_skill_level", max_level)
     if gender_preference and gender_preference.lower() != 'mixed':
         query = query.eq("gender", gender_preference)
-        
-    # Execute query
-    try:
-        print(f"Executing query for club_id: {club_id}, level: {min_level}-{max_level}, gender: {gender_preference}")
-        result = query.execute()
-        players = result.data
-        print(f"Found {len(players)} players")
-    except Exception as e:
-        print(f"Error executing query: {e}")
-        # Return empty list or re-raise depending on desired behavior
-        # For debugging, let's re-raise to see it in the API response if possible, 
-        # or return empty list to avoid crashing
-        print(f"Full query details: {query}") 
-        raise e
     
-    # Post-processing
-    recommendations = []
+    excluded = set(exclude_player_ids)
+    players = []
+    for row in (query.execute().data or []):
+        row.pop("club_members", None)
+        if row["player_id"] not in excluded:
+            players.append(row)
+    print(f"Found {len(players)} players for club_id: {club_id}, level: {min_level}-{max_level}, gender: {gender_preference}")
+    
+    # Available at the match time first (one bit test on availability_mask), then closest level
+    bucket_bit = 0
+    if scheduled_time:
+        try:
+            bucket_bit = availability_bucket_bit(scheduled_time, get_club_timezone(club_id))
+        except ValueError as e:
+            print(f"Availability not applied to recommendations: {e}")
     
-    for player in players:
-        # Skip excluded players
-        if player['player_id'] in exclude_player_ids:
-            continue
-            
-        # Calculate a simple match score (lower is better)
-        level_diff = abs(float(player['declared_skill_level']) - target_level)
-        
-        # Add to list
-        recommendations.append({
+    recommendations = [
+        {
             **player,
-            'match_score': level_diff
-        })
-        
-    # Sort by match score (closest level first)
-    recommendations.sort(key=lambda x: x['match_score'])
+            'match_score': abs(float(player['declared_skill_level']) - target_level),
+            'is_available': is_available_for(player.get('availability_mask'), bucket_bit)
+        }
+        for player in players
+    ]
+    recommendations.sort(key=lambda x: (not x['is_available'], x['match_score']))
     
     return recommendations[:limit]
 
@@ -292,18 +269,22 @@ def send_match_invites(match_id: str, player_ids: List[str]) -> List[dict]:
             player_list = [f"{p['name']} ({p['declared_skill_level']})" for p in confirmed_result.data]
             confirmed_players_text = "Already in:\n" + "\n".join([f"• {name}" for name in player_list]) + "\n\n"
     
-    # Check for quiet hours deferral
-    is_quiet = is_quiet_hours(match['club_id'])
+    # Check for quiet hours deferral (queued invites are released by deferred_sms_scheduler)
+    send_after = get_club_quiet_hours_release(match['club_id'])
+    is_quiet = send_after is not None
     
     # Create invites
     invites = []
     for pid in player_ids:
-        invites.append({
+        invite = {
             "match_id": match_id,
             "player_id": pid,
             "status": "pending_sms" if is_quiet else "sent",
             "sent_at": get_now_utc().isoformat()
-        })
+        }
+        if is_quiet:
+            invite["send_after"] = send_after.isoformat()
+        invites.append(invite)
     
     if invites:
         supabase.table("match_invites").insert(invites).execute()
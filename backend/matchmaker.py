@@ -1,9 +1,8 @@
 from database import supabase
-from twilio_client import send_sms
+from twilio_client import send_sms, send_sms_bulk
 from datetime import datetime, timedelta, timezone
 import pytz
-import random
-from logic_utils import is_quiet_hours, parse_iso_datetime, get_now_utc, format_sms_datetime, get_club_timezone
+from logic_utils import get_quiet_hours_release, parse_iso_datetime, get_now_utc, format_sms_datetime, get_club_timezone, availability_bucket_bit, is_available_for
 from redis_client import clear_user_state, set_user_state
 import sms_constants as msg
 
@@ -11,9 +10,23 @@ import sms_constants as msg
 # Configuration
 BATCH_SIZE = 6  # Number of invites to send at a time
 INVITE_TIMEOUT_MINUTES = 15  # Time before invite expires
+LAST_CALL_BROADCAST_SIZE = 10  # Random eligible players reached by a last-call flash
+LAST_CALL_BATCH_NUMBER = 99  # Special batch for flash invites
 
 
-def find_and_invite_players(match_id: str, batch_number: int = 1, max_invites: int = None, skip_filters: bool = False, target_player_ids: list[str] = None, is_reschedule: bool = False, notify_deadpool: bool = True):
+def get_match_invite_context(match_id: str, skip_filters: bool = False, target_player_ids: list[str] = None):
+    """Match, requester, club and eligible candidates in one round trip (None if the match is gone)."""
+    # All exclusions (membership, group, already in match/invited, mute, level, gender)
+    # are done in SQL by get_match_invite_context.
+    res = supabase.rpc("get_match_invite_context", {
+        "p_match_id": match_id,
+        "p_skip_filters": skip_filters,
+        "p_target_player_ids": target_player_ids or None
+    }).execute()
+    return res.data
+
+
+def find_and_invite_players(match_id: str, batch_number: int = 1, max_invites: int = None, skip_filters: bool = False, target_player_ids: list[str] = None, is_reschedule: bool = False, notify_deadpool: bool = True, context: dict = None):
     """
     Finds compatible players for a match and sends SMS invites in batches.
     
@@ -23,6 +36,8 @@ def find_and_invite_players(match_id: str, batch_number: int = 1, max_invites: i
         max_invites: Override for number of invites (used for replacements)
         skip_filters: If True, skip level/gender filtering (used for group invites)
         target_player_ids: If provided, only invite these specific players (Admin UI path)
+        context: Pre-fetched get_match_invite_context result (the invite allocator
+            passes one with the candidates it assigned to this match)
     
     Returns:
         Number of invites sent
@@ -31,159 +46,64 @@ def find_and_invite_players(match_id: str, batch_number: int = 1, max_invites: i
     print(f"Finding players for match {match_id} (batch {batch_number}, skip_filters={skip_filters})...")
     sys.stdout.flush()
     
-    # 1. Get Match Details
-    match_res = supabase.table("matches").select("*").eq("match_id", match_id).execute()
-    if not match_res.data:
+    # 1. Match, requester, club and eligible candidates in one round trip
+    if context is None:
+        context = get_match_invite_context(match_id, skip_filters, target_player_ids)
+    if not context:
         print("Match not found.")
         return 0
-    match = match_res.data[0]
+    match = context["match"]
     club_id = match.get("club_id")
     
-    # Check for quiet hours cancellation
-    is_quiet = is_quiet_hours(club_id)
-    if is_quiet:
-        print(f"[QUIET HOURS] Deferring invites for club {club_id} (pending_sms mode)")
-        # We continue to create the records, but they will have status 'pending_sms'
-    
     # Check if match is still pending/active
     if match["status"] not in ["pending", "voting"]:
         print(f"Match status is {match['status']}, not inviting.")
         return 0
-        
-    # Phase 4 Update: Use match_participations for requester (originator/team_1 lead)
-    from logic_utils import get_match_participants
-    participants = get_match_participants(match_id)
-    requester_id = participants["team_1"][0] if participants["team_1"] else match.get("originator_id")
-
-    requester = None
-    if requester_id:
-        player_res = supabase.table("players").select("*").eq("player_id", requester_id).execute()
-        if player_res.data:
-            requester = player_res.data[0]
-            
-    if not requester and not skip_filters:
-        # If no requester and we need filtering, we might have issues determining target level
-        pass  
     
-    # Fetch club name and settings for SMS messages and timeout
+    # Requester: team_1 lead, else originator (resolved in SQL)
+    requester = context.get("requester")
+    
+    # Fetch club name and settings for SMS messages, timeout and quiet hours
     club_name = "the club"
     invite_timeout_minutes = INVITE_TIMEOUT_MINUTES
-    if club_id:
-        club_res = supabase.table("clubs").select("name, settings").eq("club_id", club_id).execute()
-        if club_res.data:
-            club_data = club_res.data[0]
-            club_name = club_data["name"]
-            settings = club_data.get("settings") or {}
-            invite_timeout_minutes = settings.get("invite_timeout_minutes", INVITE_TIMEOUT_MINUTES)
-    
-    # Get match preferences (or use defaults) - only used if not skipping filters
-    level_min = match.get("level_range_min")
-    level_max = match.get("level_range_max")
-    gender_preference = match.get("gender_preference", "mixed")
-    
-    # If no level range set and not skipping filters, use requester's level ± 0.25
-    if not skip_filters and (level_min is None or level_max is None):
-        target_level = 3.5
-        if requester:
-            target_level = requester.get("adjusted_skill_level") or requester.get("declared_skill_level") or 3.5
-        level_min = target_level - 0.25
-        level_max = target_level + 0.25
-    
-    # 2. Find active players in the club
-    # First get member IDs
-    members_res = supabase.table("club_members").select("player_id").eq("club_id", club_id).execute()
-    member_ids = [m["player_id"] for m in (members_res.data or [])]
-    
-    if target_player_ids and len(target_player_ids) > 0:
-        # Use specific players provided by Admin
-        candidates_res = supabase.table("players").select("*").in_("player_id", target_player_ids).execute()
-    else:
-        # Standard filter logic
-        candidates_res = supabase.table("players").select("*").in_("player_id", member_ids).eq("active_status", True).execute()
+    settings = {}
+    send_after = None
+    club_data = context.get("club")
+    if club_data:
+        club_name = club_data["name"]
+        settings = club_data.get("settings") or {}
+        invite_timeout_minutes = settings.get("invite_timeout_minutes", INVITE_TIMEOUT_MINUTES)
+        send_after = get_quiet_hours_release(settings, club_data.get("timezone"))
+    
+    # Quiet hours: we continue to create the records, but they will have status 'pending_sms'
+    # and are released by the deferred SMS scheduler once send_after has passed
+    is_quiet = send_after is not None
+    if is_quiet:
+        print(f"[QUIET HOURS] Deferring invites for club {club_id} until {send_after.isoformat()} (pending_sms mode)")
     
-    # Filter by Group if applicable
     target_group_id = match.get("target_group_id")
-    group_member_ids = None
-    
     if target_group_id:
         print(f"Match {match_id} is targeted to group {target_group_id}")
-        # New schema: Query group_memberships table
-        group_res = supabase.table("group_memberships").select("player_id").eq("group_id", target_group_id).execute()
-        if group_res.data:
-            group_member_ids = {row["player_id"] for row in group_res.data}
-            print(f"Group found with {len(group_member_ids)} members.")
-        else:
+        if not context.get("group_found"):
             print("Target group not found or empty.")
             return 0
     
-    # Get players already in the match (Source of Truth: match_participations)
-    parts_res = supabase.table("match_participations").select("player_id").eq("match_id", match_id).execute()
-    players_in_match = {row["player_id"] for row in (parts_res.data or [])}
-    
-    # Get players already invited to this match
-    existing_invites = supabase.table("match_invites").select("player_id").eq("match_id", match_id).execute()
-    already_invited = {inv["player_id"] for inv in (existing_invites.data or [])}
+    # 2. Eligible candidates with scoring inputs
+    candidates = context.get("candidates") or []
     
-    # Current time for mute check
-    now = get_now_utc()
-    
-    candidates = []
-    print(f"[DEBUG] Processing {len(candidates_res.data)} member candidates...")
-    for p in candidates_res.data:
-        p_id = p["player_id"]
-        p_name = p.get("name", "Unknown")
-        
-        # Filter by group if set
-        if group_member_ids is not None:
-            if p_id not in group_member_ids:
-                continue
-
-        print(f"[DEBUG] Checking candidate {p_name} ({p_id})")
+    # 3. Determine how many to invite
+    # When skip_filters is True (group invite), invite ALL group members
+    if skip_filters:
+        invite_limit = len(candidates)  # Invite everyone in the group
+    elif max_invites is not None:
+        invite_limit = max_invites
+    else:
+        # Use club setting or default BATCH_SIZE
+        batch_size = settings.get("initial_batch_size", BATCH_SIZE) if club_id else BATCH_SIZE
+        invite_limit = batch_size
 
-        # Exclude players already in match
-        if p_id in players_in_match:
-            print(f"[DEBUG]   Excluded {p_name}: Already in match")
-            continue
-        
-        # Exclude already invited
-        if p_id in already_invited:
-            print(f"[DEBUG]   Excluded {p_name}: Already invited")
-            continue
-        
-        # Check if player is muted
-        muted_until = p.get("muted_until")
-        if muted_until:
-            try:
-                muted_dt = parse_iso_datetime(muted_until).replace(tzinfo=None)
-                if muted_dt > now:
-                    print(f"Skipping {p_name} - muted until {muted_until}")
-                    continue
-            except:
-                pass
-        
-        # Skip level/gender filtering if skip_filters is True
-        if not skip_filters:
-            # Check skill range
-            player_level = p.get("adjusted_skill_level") or p.get("declared_skill_level") or 3.5
-            if player_level < level_min or player_level > level_max:
-                print(f"[DEBUG]   Excluded: Level {player_level} out of range")
-                continue
-            
-            # Check gender preference
-            if gender_preference and gender_preference != "mixed":
-                player_gender = (p.get("gender") or "").lower()
-                if gender_preference == "male" and player_gender != "male":
-                    print(f"[DEBUG]   Excluded: Gender {player_gender} mismatch")
-                    continue
-                if gender_preference == "female" and player_gender != "female":
-                    print(f"[DEBUG]   Excluded: Gender {player_gender} mismatch")
-                    continue
-        
-        print(f"[DEBUG]   Accepted: {p_name}")
-        candidates.append(p)
-    
-    # 3. Rank Candidates using Scoring Engine
-    from scoring_engine import rank_candidates
+    # 4. Rank Candidates using Scoring Engine
+    from scoring_engine import rank_candidates_batch
     
     # Construct match details for scoring
     # Note: match keys in DB are level_range_min/max, scoring engine expects level_min/max
@@ -193,79 +113,90 @@ def find_and_invite_players(match_id: str, batch_number: int = 1, max_invites: i
         "gender_preference": match.get("gender_preference")
     }
     
-    # Rank them!
-    # This injects '_invite_score' and '_score_breakdown' into each candidate dict
-    sorted_candidates = rank_candidates(candidates, score_match_details)
-    
-    print(f"Found {len(sorted_candidates)} eligible candidates (Sorted by Score).")
+    # Players whose availability excludes the match's time bucket (one bit test on
+    # availability_mask) only fill the batch once the available ones are used up.
+    # Group invites and explicit targets are taken as-is.
+    available, unavailable = candidates, []
+    if not skip_filters and not target_player_ids:
+        bucket_bit = availability_bucket_bit(match.get("scheduled_time"), (club_data or {}).get("timezone"))
+        if bucket_bit:
+            available = [c for c in candidates if is_available_for(c.get("availability_mask"), bucket_bit)]
+            unavailable = [c for c in candidates if not is_available_for(c.get("availability_mask"), bucket_bit)]
+    
+    # Rank them! Only the top invite_limit are fully sorted and returned.
+    # This injects '_invite_score' and '_score_breakdown' into each returned candidate dict
+    sorted_candidates = rank_candidates_batch(available, score_match_details, top_k=invite_limit)
+    if unavailable and len(sorted_candidates) < invite_limit:
+        sorted_candidates += rank_candidates_batch(unavailable, score_match_details, top_k=invite_limit - len(sorted_candidates))
+    
+    print(f"Found {len(candidates)} eligible candidates ({len(unavailable)} outside their availability, Sorted by Score).")
     if sorted_candidates:
         top = sorted_candidates[0]
         print(f"Top candidate: {top['name']} - Score: {top.get('_invite_score')}")
 
-    # 4. Determine how many to invite
-    # When skip_filters is True (group invite), invite ALL group members
-    if skip_filters:
-        invite_limit = len(sorted_candidates)  # Invite everyone in the group
-    elif max_invites is not None:
-        invite_limit = max_invites
-    else:
-        # Use club setting or default BATCH_SIZE
-        batch_size = settings.get("initial_batch_size", BATCH_SIZE) if club_id else BATCH_SIZE
-        invite_limit = batch_size
-    
-    # 5. Send invites
+    # 5. Create the invites in one atomic RPC (locks the match once), then send SMS
     invite_count = 0
-    expires_at = (get_now_utc() + timedelta(minutes=invite_timeout_minutes)).isoformat()
+    now = get_now_utc()
+    expires_at_dt = now + timedelta(minutes=invite_timeout_minutes)
+    expires_at = expires_at_dt.isoformat()
+    invite_status = "pending_sms" if is_quiet else "sent"
+    batch = sorted_candidates
     
-    for p in sorted_candidates[:invite_limit]:
-        invite_status = "pending_sms" if is_quiet else "sent"
-        
-        # Use RPC to atomically check and insert
-        # This prevents race conditions and ensures data integrity
-        rpc_params = {
-            "p_match_id": match_id,
-            "p_player_id": p["player_id"],
-            "p_status": invite_status,
-            "p_batch_number": batch_number,
-            "p_sent_at": get_now_utc().isoformat(),
-            "p_expires_at": expires_at if not skip_filters else None,
-            "p_invite_score": p.get("_invite_score"),
-            "p_score_breakdown": p.get("_score_breakdown")
-        }
+    results = []
+    if batch:
         try:
-            rpc_res = supabase.rpc("attempt_insert_invite", rpc_params).execute()
-            result = rpc_res.data
-            
-            if result == 'SUCCESS':
-                if not is_quiet:
-                    # PHASE 4: Single build step for SMS
+            rpc_res = supabase.rpc("attempt_insert_invites", {
+                "p_match_id": match_id,
+                "p_player_ids": [p["player_id"] for p in batch],
+                "p_status": invite_status,
+                "p_batch_number": batch_number,
+                "p_sent_at": now.isoformat(),
+                "p_expires_at": expires_at if not skip_filters else None,
+                "p_invite_scores": [p.get("_invite_score") for p in batch],
+                "p_score_breakdowns": [p.get("_score_breakdown") for p in batch],
+                # Queued invites are released by the deferred SMS scheduler at this time
+                "p_send_after": send_after.isoformat() if is_quiet else None
+            }).execute()
+            results = rpc_res.data or []
+        except Exception as e:
+            print(f"Error inviting batch for match {match_id}: {e}")
+    
+    status_by_player = {row["player_id"]: row["status"] for row in results}
+    sms = None
+    
+    for p in batch:
+        result = status_by_player.get(p["player_id"])
+        
+        if result == 'SUCCESS':
+            if not is_quiet:
+                # PHASE 4: Single build step for SMS (same body for the whole batch)
+                if sms is None:
                     sms = _build_invite_sms(match, requester, club_name, is_reschedule=is_reschedule)
-                    send_sms(p["phone_number"], sms, club_id=club_id)
-                    
-                    # CLEAR STATE so they don't get stuck in old feedback loops
-                    clear_user_state(p["phone_number"])
-                
-                invite_count += 1
-                print(f"{'Created' if is_quiet else 'Invited'} {p['name']} ({p['phone_number']}) - Status: {invite_status}")
-            elif result == 'MATCH_FULL':
-                print(f"Skipping {p['name']} - Match is full.")
-                # We can probably break here if strict, but maybe other spots open? 
-                # For now, let's just continue/break based on logic.
-                # If match is full, we should stop inviting people.
-                break 
-                
-            elif result == 'ALREADY_INVITED':
-                print(f"Skipping {p['name']} - Already invited.")
+                send_sms(p["phone_number"], sms, club_id=club_id)
                 
-            elif result == 'ALREADY_IN_MATCH':
-                print(f"Skipping {p['name']} - Already in match.")
-                
-            else:
-                print(f"RPC returned unknown code: {result}")
-                
-        except Exception as e:
-            print(f"Error inviting {p['name']}: {e}")
-            continue
+                # CLEAR STATE so they don't get stuck in old feedback loops
+                clear_user_state(p["phone_number"])
+            
+            invite_count += 1
+            print(f"{'Created' if is_quiet else 'Invited'} {p['name']} ({p['phone_number']}) - Status: {invite_status}")
+        elif result == 'MATCH_FULL':
+            # Full applies to the whole batch: nothing was inserted
+            print(f"Match {match_id} is full, no invites created.")
+            break
+            
+        elif result == 'ALREADY_INVITED':
+            print(f"Skipping {p['name']} - Already invited.")
+            
+        elif result == 'ALREADY_IN_MATCH':
+            print(f"Skipping {p['name']} - Already in match.")
+            
+        elif result is not None:
+            print(f"RPC returned unknown code: {result}")
+    
+    # Register the batch deadline so its refill fires as soon as it expires
+    if invite_count and not is_quiet and not skip_filters:
+        from invite_expiry_queue import schedule_invite_expiry
+        schedule_invite_expiry(match_id, expires_at_dt)
     
     # If this is the first batch and we couldn't find at least 3 people
     # (to make 4 total), check if we should notify about a deadpool.
@@ -301,10 +232,11 @@ def _build_invite_sms(match: dict, requester: dict, club_name: str, is_reschedul
                 pass
 
         organizer_name = requester['name'] if requester else "An organizer"
-        return (
-            f"🎾 {club_name}: {organizer_name} wants to play on {day_str}.\n"
-            f"Options:\n{opt_str}"
-            f"Reply with letter(s) (e.g. 'A' or 'AB') to vote."
+        return msg.MSG_INVITE_VOTING.format(
+            club_name=club_name,
+            organizer_name=organizer_name,
+            day=day_str,
+            options=opt_str
         )
     else:
         # Format time nicely
@@ -325,10 +257,11 @@ def _build_invite_sms(match: dict, requester: dict, club_name: str, is_reschedul
                 time=time_str
             )
 
-        return (
-            f"🎾 {club_name}: {organizer_name}{skill_str} wants to play "
-            f"{time_str}.\n"
-            f"Reply YES to join, NO to decline, or MUTE to pause invites today."
+        return msg.MSG_INVITE.format(
+            club_name=club_name,
+            organizer_name=organizer_name,
+            skill_str=skill_str,
+            time=time_str
         )
 
 
@@ -352,347 +285,313 @@ def invite_replacement_player(match_id: str, count: int = 1):
     return sent
 
 
-def process_batch_refills():
+def process_batch_refills(deadline=None, match_ids: list = None, now=None):
     """
     Find invites that have timed out (15 minutes) but haven't triggered a refill yet.
     Triggers the next batch while keeping existing ones valid.
-    Called by cron job every 5 minutes.
+    With match_ids (due entries from the invite expiry queue) only those matches are
+    checked; without, every stale invite is scanned (cron reconciliation).
+    """
+    new_invites, _ = refill_stale_matches(deadline=deadline, match_ids=match_ids, now=now)
+    return new_invites
+
+
+def _claim_stale_invites(invite_ids: list) -> list:
+    """Mark stale invites refilled. Only rows still unclaimed match, so overlapping runs cannot both claim one."""
+    res = supabase.table("match_invites").update({"refilled_at": get_now_utc().isoformat()})\
+        .in_("invite_id", invite_ids)\
+        .is_("refilled_at", "null")\
+        .execute()
+    return [row["invite_id"] for row in (res.data or [])]
+
+
+def _release_stale_invites(invite_ids: list):
+    """Undo a claim so the next scan refills these invites again."""
+    supabase.table("match_invites").update({"refilled_at": None}).in_("invite_id", invite_ids).execute()
+
+
+def _batch_was_created(match_id: str, batch_number: int) -> bool:
+    """Whether any invite of this batch was inserted (and so may already have been texted)."""
+    res = supabase.table("match_invites").select("invite_id")\
+        .eq("match_id", match_id).eq("batch_number", batch_number).limit(1).execute()
+    return bool(res.data)
+
+
+def refill_stale_matches(deadline=None, match_ids: list = None, now=None):
+    """
+    process_batch_refills, also reporting which matches still need a refill.
+    Returns (new invites sent, ids of matches this run did not refill: not started
+    before the deadline, or failed). Their invites stay unclaimed for the next run,
+    unless a failed refill had already inserted its batch.
     """
     print("Processing batch refills...")
     
-    from logic_utils import get_now_utc_iso
-    now = get_now_utc_iso()
+    now = now or get_now_utc()
     
-    # Find sent invites that have passed their expires_at and haven't been refilled
-    # We only refill if refilled_at is NULL
-    stale_invites = supabase.table("match_invites").select("invite_id, match_id, player_id, batch_number")\
-        .eq("status", "sent")\
-        .not_.is_("match_id", "null")\
-        .filter("expires_at", "lt", now)\
-        .is_("refilled_at", "null")\
-        .execute()
+    # One set-based query: stale invites (sent, expired, refilled_at NULL) grouped by
+    # match, with the match status, club quiet-hours settings and latest batch number
+    stale_res = supabase.rpc("get_stale_invite_refills", {
+        "p_now": now.isoformat(),
+        "p_match_ids": match_ids
+    }).execute()
+    stale_matches = stale_res.data or []
     
-    if not stale_invites.data:
+    if not stale_matches:
         print("No stale invites needing refill found.")
-        return 0
+        return 0, []
     
-    print(f"Found {len(stale_invites.data)} stale invites.")
+    print(f"Found {sum(len(row['invite_ids']) for row in stale_matches)} stale invites across {len(stale_matches)} matches.")
     
-    # Group by match and find the latest batch number per match
-    matches_to_refill = {}
-    invites_to_mark_refilled = []
+    # Quiet hours evaluated once per club (from the settings already in the rows)
+    quiet_release_by_club = {}
+    refills = []
+    closed_invite_ids = []
     
-    for inv in stale_invites.data:
-        match_id = inv["match_id"]
-        # Skip if quiet hours for this match's club
-        match_res = supabase.table("matches").select("club_id").eq("match_id", match_id).execute()
-        if match_res.data:
-            club_id = match_res.data[0].get("club_id")
-            if is_quiet_hours(club_id):
+    for row in stale_matches:
+        club_id = row.get("club_id")
+        if club_id:
+            if club_id not in quiet_release_by_club:
+                quiet_release_by_club[club_id] = get_quiet_hours_release(row.get("club_settings"), row.get("club_timezone"))
+            # Skip if quiet hours for this match's club
+            if quiet_release_by_club[club_id]:
+                if match_ids is not None:
+                    # Popped from the expiry queue: come back when quiet hours end
+                    from invite_expiry_queue import schedule_invite_expiry
+                    schedule_invite_expiry(row["match_id"], quiet_release_by_club[club_id])
                 continue
         
-        if match_id not in matches_to_refill:
-            matches_to_refill[match_id] = 0
-            
-        matches_to_refill[match_id] += 1
-        invites_to_mark_refilled.append(inv["invite_id"])
+        if row.get("match_status") in ["pending", "voting"]:
+            refills.append(row)
+        else:
+            # Nothing left to fill: claim them so they stop showing up as stale
+            closed_invite_ids.extend(row["invite_ids"])
+    
+    if closed_invite_ids:
+        _claim_stale_invites(closed_invite_ids)
+    
+    if not refills:
+        return 0, []
+    
+    # Overlapping matches of a club share the round's candidates instead of all
+    # inviting the same top players
+    from invite_allocator import allocate_invite_round
+    club_by_match = {row["match_id"]: row.get("club_id") for row in refills}
+    contexts = allocate_invite_round(
+        [(row["match_id"], len(row["invite_ids"])) for row in refills], "batch-refills",
+        club_of=club_by_match.get, deadline=deadline
+    )
+    
+    def _refill(row):
+        match_id = row["match_id"]
+        # Claim right before refilling: a match this run never gets to (deadline)
+        # keeps its invites unclaimed, so the next run still finds them
+        claimed_ids = _claim_stale_invites(row["invite_ids"])
+        if not claimed_ids:
+            return 0
+        
+        # Trigger next batch
+        next_batch = (row.get("max_batch_number") or 0) + 1
+        
+        try:
+            new_invites = find_and_invite_players(match_id, batch_number=next_batch, max_invites=len(claimed_ids), context=contexts.get(match_id))
+        except Exception:
+            # Release only if the failure came before the batch was inserted: once it
+            # exists its SMS may be out, and refilling the same slots would double up.
+            # When unsure the claim stays and the reconciliation scan picks it up.
+            try:
+                if not _batch_was_created(match_id, next_batch):
+                    _release_stale_invites(claimed_ids)
+            except Exception as e:
+                print(f"Could not check batch {next_batch} of match {match_id}, keeping its claim: {e}")
+            raise
+        print(f"Triggered batch {next_batch} for match {match_id} ({new_invites} new invites)")
+        
+        if new_invites < len(claimed_ids):
+            check_match_deadpool(match_id)
+        return new_invites
     
-    if not matches_to_refill:
-        return 0
+    from cron_executor import fan_out
+    run = fan_out("batch-refills", refills, _refill, club_of=lambda row: row.get("club_id"), deadline=deadline)
+    unfinished = [row["match_id"] for row, result in zip(refills, run.results) if result is None]
+    return sum(run.values()), unfinished
 
-    # Mark these invites as refilled so they don't trigger again
-    if invites_to_mark_refilled:
-        supabase.table("match_invites").update({"refilled_at": get_now_utc().isoformat()})\
-            .in_("invite_id", invites_to_mark_refilled).execute()
-    
-    # Send refill invites for each affected match
-    total_new_invites = 0
-    for match_id, stale_count in matches_to_refill.items():
-        # Check if match is still pending
-        match_res = supabase.table("matches").select("status").eq("match_id", match_id).execute()
-        if match_res.data and match_res.data[0]["status"] in ["pending", "voting"]:
-            # Trigger next batch
-            latest_inv = supabase.table("match_invites").select("batch_number").eq("match_id", match_id).order("sent_at", desc=True).limit(1).execute()
-            next_batch = (latest_inv.data[0]["batch_number"] + 1) if latest_inv.data else 1
-            
-            new_invites = find_and_invite_players(match_id, batch_number=next_batch, max_invites=stale_count)
-            total_new_invites += new_invites
-            print(f"Triggered batch {next_batch} for match {match_id} ({new_invites} new invites)")
-            
-            if new_invites < stale_count:
-                check_match_deadpool(match_id)
-    
-    return total_new_invites
+
+def get_match_deadpool_snapshot(match_id: str):
+    """Counts and notification details for deadpool evaluation, in one aggregate query (None if no match)."""
+    res = supabase.rpc("get_match_deadpool_snapshot", {"p_match_id": match_id}).execute()
+    return res.data or None
 
 
-def check_match_deadpool(match_id: str):
+def _format_snapshot_time(iso_time: str, timezone_str: str) -> str:
+    """Format a time for SMS in the club timezone carried by the snapshot (no club lookup)."""
+    dt = parse_iso_datetime(iso_time)
+    try:
+        dt = dt.astimezone(pytz.timezone(timezone_str))
+    except Exception:
+        pass
+    return format_sms_datetime(dt)
+
+
+def evaluate_deadpool(snapshot: dict):
+    """
+    Decide what a deadpool check should do, from a snapshot alone (no I/O).
+    Returns None when there is nothing to do, otherwise a dict with:
+        action: "bridge_offer" (suggest the most common alternative time) or "notify"
+        phone_number, sms, state_data: the message and conversation state for the originator
+        needed, remaining: players still needed vs eligible group members left
+    """
+    if not snapshot or snapshot.get("status") not in ["pending", "voting"]:
+        return None
+
+    needed = snapshot.get("needed") or 0
+    remaining = snapshot.get("remaining_pool") or 0
+    if needed <= 0 or remaining >= needed:
+        return None
+
+    originator = snapshot.get("originator")
+    if not originator:
+        return None
+
+    match_id = snapshot["match_id"]
+    target_group_id = snapshot.get("target_group_id")
+    club_name = snapshot.get("club_name") or "the club"
+    group_name = snapshot.get("group_name") or "the group"
+    timezone_str = snapshot.get("club_timezone")
+    decision = {
+        "needed": needed,
+        "remaining": remaining,
+        "phone_number": originator["phone_number"],
+    }
+
+    # "The Diplomat" Bridge Offer: someone suggested a different time
+    suggested_time = snapshot.get("top_suggested_time")
+    if not snapshot.get("bridge_offer_sent") and suggested_time:
+        count = snapshot.get("top_suggested_count") or 1
+        old_time_str = _format_snapshot_time(snapshot["scheduled_time"], timezone_str)
+        new_time_str = _format_snapshot_time(suggested_time, timezone_str)
+        if target_group_id:
+            sms_msg = msg.MSG_BRIDGE_OFFER_GROUP.format(
+                club_name=club_name,
+                group_name=group_name,
+                old_time=old_time_str,
+                new_time=new_time_str,
+                count=count
+            )
+        else:
+            sms_msg = msg.MSG_BRIDGE_OFFER_CLUB.format(
+                club_name=club_name,
+                old_time=old_time_str,
+                new_time=new_time_str,
+                count=count
+            )
+        decision.update({
+            "action": "bridge_offer",
+            "sms": sms_msg,
+            "state_data": {"match_id": match_id, "bridge_time_iso": suggested_time},
+            "new_time_str": new_time_str
+        })
+        return decision
+
+    # Format time
+    try:
+        time_str = _format_snapshot_time(snapshot["scheduled_time"], timezone_str)
+    except Exception:
+        time_str = "your requested time"
+
+    if target_group_id:
+        # Group-to-Club broadening message
+        sms_msg = msg.MSG_DEADPOOL_NOTIFICATION.format(
+            club_name=club_name,
+            group_name=group_name,
+            time=time_str
+        )
+    else:
+        # Club-wide level range broadening message
+        sms_msg = msg.MSG_DEADPOOL_CLUB_WIDE.format(
+            club_name=club_name,
+            time=time_str
+        )
+    decision.update({"action": "notify", "sms": sms_msg, "state_data": {"match_id": match_id}})
+    return decision
+
+
+def check_match_deadpool(match_id: str, snapshot: dict = None):
     """
     Checks if a match has reached a dead end (no more eligible players in group).
     If so, notifies the originator.
+    Pass a snapshot (get_match_deadpool_snapshot) if the caller already holds a fresh one;
+    otherwise it is fetched with one query.
     """
     print(f"Checking for deadpool on match {match_id}...")
     
-    # 1. Fetch match details
-    match_res = supabase.table("matches").select("*").eq("match_id", match_id).execute()
-    if not match_res.data:
+    if snapshot is None:
+        snapshot = get_match_deadpool_snapshot(match_id)
+    decision = evaluate_deadpool(snapshot)
+    if not decision:
         return
-    match = match_res.data[0]
-    
-    if match["status"] not in ["pending", "voting"]:
-        return
-
-    target_group_id = match.get("target_group_id")
-
-    # 2. Count current players and active invites
-    parts_res = supabase.table("match_participations").select("player_id").eq("match_id", match_id).execute()
-    players_in_match_count = len(parts_res.data or [])
     
-    active_invites = supabase.table("match_invites").select("invite_id").eq("match_id", match_id).eq("status", "sent").execute()
-    active_count = len(active_invites.data or [])
+    print(f"Match {match_id} in deadpool! Needed {decision['needed']}, only {decision['remaining']} left in pool.")
+    phone_number = decision["phone_number"]
+    club_id = snapshot.get("club_id")
     
-    needed = 4 - players_in_match_count - active_count
-    if needed <= 0:
+    if decision["action"] == "bridge_offer":
+        send_sms(phone_number, decision["sms"], club_id=club_id)
+        set_user_state(phone_number, msg.STATE_DEADPOOL_REFILL, decision["state_data"])
+        # Mark bridge offer as sent
+        supabase.table("matches").update({"bridge_offer_sent": True}).eq("match_id", match_id).execute()
+        print(f"Bridge offer sent to organizer for match {match_id} (Shift to {decision['new_time_str']})")
         return
-
-    # 3. Check remaining eligible members
-    if target_group_id:
-        # Get group members
-        group_res = supabase.table("group_memberships").select("player_id").eq("group_id", target_group_id).execute()
-        pool_ids = {row["player_id"] for row in (group_res.data or [])}
-    else:
-        # For club-wide, pool is effectively empty since matchmaking already failed
-        pool_ids = set()
     
-    # Get all involvements (in match, invited, or declined)
-    involvement_res = supabase.table("match_invites").select("player_id, status").eq("match_id", match_id).execute()
-    already_involved = {inv["player_id"] for inv in (involvement_res.data or [])}
-    already_involved.update({row["player_id"] for row in (parts_res.data or [])})
-    
-    pool = [pid for pid in pool_ids if pid not in already_involved]
+    # Check if already in refill state for the generic nudge
+    from redis_client import get_user_state
+    state = get_user_state(phone_number)
+    if state and state.get("state") == msg.STATE_DEADPOOL_REFILL:
+        print(f"Skipping generic deadpool nudge for match {match_id} - originator already in refill state.")
+        return
     
-    if len(pool) < needed:
-        print(f"Match {match_id} in deadpool! Needed {needed}, only {len(pool)} left in pool.")
-        
-        # Notify originator
-        originator_id = match.get("originator_id")
-        if not originator_id:
-            return
-            
-        # NEW: Check for "The Diplomat" Bridge Offers (Alternative Times)
-        # See if anyone has suggested a different time
-        if not match.get("bridge_offer_sent"):
-            suggestions_res = supabase.table("match_invites").select("suggested_time")\
-                .eq("match_id", match_id)\
-                .not_.is_("suggested_time", "null")\
-                .execute()
-            
-            if suggestions_res.data:
-                from collections import Counter
-                times = [s["suggested_time"] for s in suggestions_res.data]
-                if times:
-                    # Find the most common suggested time
-                    most_common_time, count = Counter(times).most_common(1)[0]
-                    
-                    # If we have a consensus (or at least a lead)
-                    if count >= 1:
-                        orig_res = supabase.table("players").select("*").eq("player_id", originator_id).execute()
-                        if not orig_res.data:
-                            return
-                        originator = orig_res.data[0]
-                        
-                        club_id = match.get("club_id")
-                        club_res = supabase.table("clubs").select("name").eq("club_id", club_id).maybe_single().execute()
-                        club_name = club_res.data["name"] if club_res.data else "the club"
-                        
-                        old_time_str = format_sms_datetime(parse_iso_datetime(match['scheduled_time']), club_id=club_id)
-                        new_time_str = format_sms_datetime(parse_iso_datetime(most_common_time), club_id=club_id)
-                        
-                        if target_group_id:
-                            g_name_res = supabase.table("player_groups").select("name").eq("group_id", target_group_id).maybe_single().execute()
-                            group_name = g_name_res.data["name"] if g_name_res.data else "the group"
-                            
-                            sms_msg = msg.MSG_BRIDGE_OFFER_GROUP.format(
-                                club_name=club_name,
-                                group_name=group_name,
-                                old_time=old_time_str,
-                                new_time=new_time_str,
-                                count=count
-                            )
-                        else:
-                            sms_msg = msg.MSG_BRIDGE_OFFER_CLUB.format(
-                                club_name=club_name,
-                                old_time=old_time_str,
-                                new_time=new_time_str,
-                                count=count
-                            )
-                        
-                        send_sms(originator["phone_number"], sms_msg, club_id=club_id)
-                        set_user_state(originator["phone_number"], msg.STATE_DEADPOOL_REFILL, {
-                            "match_id": match_id,
-                            "bridge_time_iso": most_common_time
-                        })
-                        # Mark bridge offer as sent
-                        supabase.table("matches").update({"bridge_offer_sent": True}).eq("match_id", match_id).execute()
-                        print(f"Bridge offer sent to organizer for match {match_id} (Shift to {new_time_str})")
-                        return
-        if not originator_id:
-            return
-            
-        orig_res = supabase.table("players").select("*").eq("player_id", originator_id).execute()
-        if not orig_res.data:
-            return
-        originator = orig_res.data[0]
-        
-        # Check if already in refill state for the generic nudge
-        from redis_client import get_user_state
-        from sms_constants import STATE_DEADPOOL_REFILL
-        state = get_user_state(originator["phone_number"])
-        if state and state.get("state") == STATE_DEADPOOL_REFILL:
-            print(f"Skipping generic deadpool nudge for match {match_id} - originator already in refill state.")
-            return
-
-        # Get group name if applicable
-        group_name = "the group"
-        if target_group_id:
-            g_name_res = supabase.table("player_groups").select("name").eq("group_id", target_group_id).maybe_single().execute()
-            group_name = g_name_res.data["name"] if g_name_res.data else "the group"
+    send_sms(phone_number, decision["sms"], club_id=club_id)
+    set_user_state(phone_number, msg.STATE_DEADPOOL_REFILL, decision["state_data"])
 
-        # Get club name & ID
-        club_name = "the club"
-        club_id = match.get("club_id")
-        if club_id:
-            club_res = supabase.table("clubs").select("name").eq("club_id", club_id).maybe_single().execute()
-            if club_res.data:
-                club_name = club_res.data["name"]
-
-        # Format time
-        try:
-            scheduled_dt = parse_iso_datetime(match['scheduled_time'])
-            time_str = format_sms_datetime(scheduled_dt, club_id=club_id)
-        except:
-            time_str = "your requested time"
-
-        if target_group_id:
-            # Group-to-Club broadening message
-            sms_msg = msg.MSG_DEADPOOL_NOTIFICATION.format(
-                club_name=club_name,
-                group_name=group_name,
-                time=time_str
-            )
-        else:
-            # Club-wide level range broadening message
-            sms_msg = msg.MSG_DEADPOOL_CLUB_WIDE.format(
-                club_name=club_name,
-                time=time_str
-            )
-        
-        send_sms(originator["phone_number"], sms_msg, club_id=club_id)
-        set_user_state(originator["phone_number"], msg.STATE_DEADPOOL_REFILL, {"match_id": match_id})
 
 
-
-def process_pending_matches():
+def process_pending_matches(deadline=None):
     """
     1. Finds matches that are pending/voting but have NO invites at all and starts them.
-    2. Finds 'pending_sms' invites and dispatches them if quiet hours are over.
+    2. Releases 'pending_sms' invites whose quiet-hours send_after has passed.
     """
     print("Processing pending invitations and quiet-hour catch-ups...")
     
-    # --- Part 1: Dispatch pending_sms invites ---
-    # Find all pending_sms invites
-    pending_invites = supabase.table("match_invites").select("*, players(phone_number, name)")\
-        .eq("status", "pending_sms")\
-        .not_.is_("match_id", "null")\
-        .execute()
-    
-    total_dispatched = 0
-    if pending_invites.data:
-        # Group by match to avoid repeated match/requester lookups
-        matches_cache = {}
-        for inv in pending_invites.data:
-            match_id = inv["match_id"]
-            
-            # Fetch match/club details if not in cache
-            if match_id not in matches_cache:
-                m_res = supabase.table("matches").select("*, clubs(name)").eq("match_id", match_id).execute()
-                if not m_res.data: continue
-                m_data = m_res.data[0]
-                club_id = m_data.get("club_id")
-                
-                # Check quiet hours
-                if is_quiet_hours(club_id):
-                    continue
-                
-                # Get requester - Phase 4 use match_participations
-                from logic_utils import get_match_participants
-                parts = get_match_participants(match_id)
-                req_id = parts["team_1"][0] if parts["team_1"] else m_data.get("originator_id")
-                
-                requester = None
-                if req_id:
-                    req_res = supabase.table("players").select("*").eq("player_id", req_id).execute()
-                    if req_res.data:
-                        requester = req_res.data[0]
-                
-                matches_cache[match_id] = {
-                    "match": m_data,
-                    "requester": requester,
-                    "club_name": m_data.get("clubs", {}).get("name") or "the club"
-                }
-
-            # If we reach here, we can dispatch
-            m_info = matches_cache[match_id]
-            p_data = inv.get("players")
-            if not p_data: continue
-
-            # Build and send SMS
-            sms_msg = _build_invite_sms(m_info["match"], m_info["requester"], m_info["club_name"])
-            if send_sms(p_data["phone_number"], sms_msg, club_id=m_info["match"].get("club_id")):
-                # Update status to 'sent' and refresh expires_at
-                # Use club settings for timeout
-                invite_timeout = INVITE_TIMEOUT_MINUTES
-                c_id = m_info["match"].get("club_id")
-                if c_id:
-                    club_res = supabase.table("clubs").select("settings").eq("club_id", c_id).execute()
-                    if club_res.data:
-                        invite_timeout = (club_res.data[0].get("settings") or {}).get("invite_timeout_minutes", INVITE_TIMEOUT_MINUTES)
-                
-                new_expires_at = (get_now_utc() + timedelta(minutes=invite_timeout)).isoformat()
-                
-                supabase.table("match_invites").update({
-                    "status": "sent",
-                    "sent_at": get_now_utc().isoformat(),
-                    "expires_at": new_expires_at
-                }).eq("invite_id", inv["invite_id"]).execute()
-                
-                clear_user_state(p_data["phone_number"])
-                total_dispatched += 1
-                
-                # Notify originator once per match if this is the first dispatch
-                # (Can implement a flag in match or just check if it's the first invite in this batch)
+    # --- Part 1: Dispatch due pending_sms invites ---
+    from deferred_sms_scheduler import release_due_invites
+    total_dispatched = release_due_invites()
 
     # --- Part 2: Start matches with NO invites ---
-    matches = supabase.table("matches").select("match_id, status")\
-        .in_("status", ["pending", "voting"])\
-        .not_.is_("match_id", "null")\
-        .not_.is_("scheduled_time", "null")\
-        .execute()
+    # One anti-join (NOT EXISTS) returns only open matches without any invite
+    uninvited = supabase.rpc("get_uninvited_open_matches", {}).execute()
+    uninvited_matches = uninvited.data or []
     
     total_new_starts = 0
-    if matches.data:
-        for match in matches.data:
-            match_id = match["match_id"]
-            # Check if there are any invites at all
-            all_inv_res = supabase.table("match_invites").select("invite_id").eq("match_id", match_id).execute()
-            if not all_inv_res.data:
-                # No invites, try to start
-                invites = find_and_invite_players(match_id, batch_number=1)
-                total_new_starts += (1 if invites > 0 else 0)
+    if uninvited_matches:
+        print(f"Starting {len(uninvited_matches)} matches with no invites...")
+        
+        from cron_executor import fan_out
+        from invite_allocator import allocate_invite_round
+        club_by_match = {row["match_id"]: row.get("club_id") for row in uninvited_matches}
+        contexts = allocate_invite_round(
+            [(row["match_id"], None) for row in uninvited_matches], "pending-matches",
+            club_of=club_by_match.get, deadline=deadline
+        )
+        run = fan_out(
+            "pending-matches", uninvited_matches,
+            lambda row: find_and_invite_players(row["match_id"], batch_number=1, context=contexts.get(row["match_id"])),
+            club_of=lambda row: row.get("club_id"), deadline=deadline
+        )
+        total_new_starts = sum(1 for invites in run.values() if invites > 0)
 
     print(f"Catch-up complete: {total_dispatched} SMS dispatched, {total_new_starts} new matches started.")
     return total_dispatched + total_new_starts
 
-def process_last_call_flash():
+def process_last_call_flash(deadline=None):
     """
     Identifies matches with 1 spot left within a defined timeframe 
     (e.g., 2-4 hours before scheduled_time) and sends a 'Flash Invite' 
@@ -714,37 +613,21 @@ def process_last_call_flash():
     if not matches_res.data:
         return 0
         
-    total_flashed = 0
-    for match in matches_res.data:
+    def _flash(match):
         match_id = match["match_id"]
         club_id = match["club_id"]
-        club_name = match.get("clubs", {}).get("name") or "the club"
+        club_name = (match.get("clubs") or {}).get("name") or "the club"
         
-        # 2. Check if exactly 1 spot left
-        from logic_utils import get_match_participants
-        participants = get_match_participants(match_id)
-        if len(participants["all"]) != 3:
-            continue
-            
-        # 3. Find candidates (Anyone in the club not in the match or recently invited)
-        members_res = supabase.table("club_members").select("player_id").eq("club_id", club_id).execute()
-        member_ids = [m["player_id"] for m in (members_res.data or [])]
-        
-        # Exclude players already in match or already invited
-        already_involved_res = supabase.table("match_invites").select("player_id").eq("match_id", match_id).execute()
-        already_involved = {inv["player_id"] for inv in (already_involved_res.data or [])}
-        already_involved.update(participants["all"])
-        
-        candidates_res = supabase.table("players")\
-            .select("player_id, phone_number, name")\
-            .in_("player_id", member_ids)\
-            .eq("active_status", True)\
-            .execute()
-            
-        candidates = [c for c in (candidates_res.data or []) if c["player_id"] not in already_involved]
+        # 2-3. Random sample of eligible club members, drawn in SQL. Empty unless
+        # exactly 1 spot is left; excludes players in the match or already invited
+        candidates_res = supabase.rpc("sample_last_call_candidates", {
+            "p_match_id": match_id,
+            "p_limit": LAST_CALL_BROADCAST_SIZE
+        }).execute()
+        candidates = candidates_res.data or []
         
         if not candidates:
-            continue
+            return 0
             
         # 4. Broadcast!
         friendly_time = format_sms_datetime(parse_iso_datetime(match['scheduled_time']), club_id=club_id)
@@ -753,23 +636,23 @@ def process_last_call_flash():
             time=friendly_time
         )
         
-        # Limit the broadcast to 10 random eligible players
-        random.shuffle(candidates)
-        for cand in candidates[:10]:
-            # Create a "last_call" invite record
-            supabase.table("match_invites").insert({
-                "match_id": match_id,
-                "player_id": cand["player_id"],
-                "status": "sent",
-                "invite_score": 0,
-                "batch_number": 99 # Special batch for flash
-            }).execute()
-            
-            send_sms(cand["phone_number"], flash_msg, club_id=club_id)
+        # Create all "last_call" invite records in one multi-row insert
+        supabase.table("match_invites").insert([{
+            "match_id": match_id,
+            "player_id": cand["player_id"],
+            "status": "sent",
+            "invite_score": 0,
+            "batch_number": LAST_CALL_BATCH_NUMBER
+        } for cand in candidates]).execute()
+        
+        send_sms_bulk([cand["phone_number"] for cand in candidates], flash_msg, club_id=club_id)
             
         # Mark match as last_call_sent
         supabase.table("matches").update({"last_call_sent": True}).eq("match_id", match_id).execute()
-        total_flashed += 1
-        print(f"Last call sent for match {match_id}")
-        
+        print(f"Last call sent for match {match_id} ({len(candidates)} players)")
+        return 1
+
+    from cron_executor import fan_out
+    run = fan_out("last-call", matches_res.data, _flash, club_of=lambda m: m.get("club_id"), deadline=deadline)
+    total_flashed = sum(run.values())
     return total_flashed
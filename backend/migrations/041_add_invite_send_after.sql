@@ -0,0 +1,15 @@
+-- Deferred SMS scheduling for quiet hours
+-- Invites created during a club's quiet hours are stored as 'pending_sms' with the
+-- UTC time the quiet-hours window ends. The cron pass releases exactly the due rows
+-- instead of re-checking quiet hours for every queued invite.
+
+ALTER TABLE match_invites ADD COLUMN IF NOT EXISTS send_after TIMESTAMP WITH TIME ZONE;
+
+-- Partial index: only queued invites are ever scanned by send_after
+CREATE INDEX IF NOT EXISTS idx_match_invites_pending_send_after
+    ON match_invites(send_after)
+    WHERE status = 'pending_sms';
+
+-- Commentary:
+-- Rows queued before this column existed have send_after = NULL. The scheduler assigns
+-- them a release time on its first pass, so no backfill is needed here.
@@ -0,0 +1,141 @@
+-- Single-call invite context for find_and_invite_players
+-- Returns the match, its requester, the club settings and ONLY the eligible
+-- candidates (with the columns the scoring engine needs) in one round trip.
+-- All exclusions run here: club membership / explicit targets, active status,
+-- target group, already in match, already invited, mute, level range, gender.
+
+-- Supporting indexes for the NOT EXISTS exclusions
+CREATE INDEX IF NOT EXISTS idx_match_invites_match_player ON match_invites(match_id, player_id);
+CREATE INDEX IF NOT EXISTS idx_group_memberships_player ON group_memberships(player_id);
+
+CREATE OR REPLACE FUNCTION get_match_invite_context(
+  p_match_id UUID,
+  p_skip_filters BOOLEAN DEFAULT FALSE,
+  p_target_player_ids UUID[] DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+  v_match matches%ROWTYPE;
+  v_requester_id UUID;
+  v_requester JSONB;
+  v_club JSONB;
+  v_level_min NUMERIC;
+  v_level_max NUMERIC;
+  v_target_level NUMERIC;
+  v_gender TEXT;
+  v_group_found BOOLEAN := TRUE;
+  v_candidates JSONB := '[]'::JSONB;
+BEGIN
+  SELECT * INTO v_match FROM matches WHERE match_id = p_match_id;
+
+  IF NOT FOUND THEN
+    RETURN NULL;
+  END IF;
+
+  -- 1. Requester: team 1 lead, else the originator
+  SELECT player_id INTO v_requester_id
+  FROM match_participations
+  WHERE match_id = p_match_id AND team_index = 1
+  ORDER BY created_at
+  LIMIT 1;
+
+  v_requester_id := COALESCE(v_requester_id, v_match.originator_id);
+
+  SELECT jsonb_build_object(
+    'player_id', player_id,
+    'name', name,
+    'phone_number', phone_number,
+    'declared_skill_level', declared_skill_level,
+    'adjusted_skill_level', adjusted_skill_level
+  ) INTO v_requester
+  FROM players
+  WHERE player_id = v_requester_id;
+
+  -- 2. Club name, settings and timezone
+  SELECT jsonb_build_object('name', name, 'settings', settings, 'timezone', timezone)
+  INTO v_club
+  FROM clubs
+  WHERE club_id = v_match.club_id;
+
+  IF v_match.target_group_id IS NOT NULL THEN
+    v_group_found := EXISTS (
+      SELECT 1 FROM group_memberships WHERE group_id = v_match.target_group_id
+    );
+  END IF;
+
+  -- 3. Candidates (only while the match is still looking for players)
+  IF v_match.status IN ('pending', 'voting') AND v_group_found THEN
+    v_level_min := v_match.level_range_min;
+    v_level_max := v_match.level_range_max;
+    IF NOT p_skip_filters AND (v_level_min IS NULL OR v_level_max IS NULL) THEN
+      v_target_level := COALESCE(
+        (v_requester->>'adjusted_skill_level')::NUMERIC,
+        (v_requester->>'declared_skill_level')::NUMERIC,
+        3.5
+      );
+      v_level_min := v_target_level - 0.25;
+      v_level_max := v_target_level + 0.25;
+    END IF;
+    v_gender := LOWER(COALESCE(v_match.gender_preference, 'mixed'));
+
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+      'player_id', p.player_id,
+      'name', p.name,
+      'phone_number', p.phone_number,
+      'gender', p.gender,
+      'declared_skill_level', p.declared_skill_level,
+      'adjusted_skill_level', p.adjusted_skill_level,
+      'responsiveness_score', p.responsiveness_score,
+      'reputation_score', p.reputation_score
+    )), '[]'::JSONB)
+    INTO v_candidates
+    FROM players p
+    WHERE (
+        -- Explicit targets (admin UI) are taken as-is; otherwise active club members
+        (p_target_player_ids IS NOT NULL AND cardinality(p_target_player_ids) > 0
+          AND p.player_id = ANY(p_target_player_ids))
+        OR
+        ((p_target_player_ids IS NULL OR cardinality(p_target_player_ids) = 0)
+          AND p.active_status = TRUE
+          AND EXISTS (
+            SELECT 1 FROM club_members cm
+            WHERE cm.club_id = v_match.club_id AND cm.player_id = p.player_id
+          ))
+      )
+      AND (v_match.target_group_id IS NULL OR EXISTS (
+        SELECT 1 FROM group_memberships gm
+        WHERE gm.group_id = v_match.target_group_id AND gm.player_id = p.player_id
+      ))
+      AND NOT EXISTS (
+        SELECT 1 FROM match_participations mp
+        WHERE mp.match_id = p_match_id AND mp.player_id = p.player_id
+      )
+      AND NOT EXISTS (
+        SELECT 1 FROM match_invites mi
+        WHERE mi.match_id = p_match_id AND mi.player_id = p.player_id
+      )
+      AND (p.muted_until IS NULL OR p.muted_until <= NOW())
+      AND (p_skip_filters OR (
+        COALESCE(p.adjusted_skill_level, p.declared_skill_level, 3.5) BETWEEN v_level_min AND v_level_max
+        AND (v_gender NOT IN ('male', 'female') OR LOWER(COALESCE(p.gender, '')) = v_gender)
+      ));
+  END IF;
+
+  RETURN jsonb_build_object(
+    'match', to_jsonb(v_match),
+    'requester', v_requester,
+    'club', v_club,
+    'group_found', v_group_found,
+    'candidates', v_candidates
+  );
+END;
+$$;
+
+-- Commentary:
+-- find_and_invite_players previously issued ~8 sequential queries (match, participants,
+-- requester, club, club_members, players in_ all members, group_memberships,
+-- participations again, invites) and filtered every member in Python.
@@ -0,0 +1,108 @@
+-- Batch version of attempt_insert_invite (plsql/rpc_invite_players.sql)
+-- Locks the match row once, counts participations once and inserts every
+-- eligible invite in one statement. Returns one status per requested player,
+-- in input order, with the same codes as the single-player function:
+--   SUCCESS, MATCH_NOT_FOUND, MATCH_FULL, ALREADY_INVITED, ALREADY_IN_MATCH
+-- A player listed twice gets ALREADY_INVITED for the repeat.
+-- p_invite_scores is aligned with p_player_ids; p_score_breakdowns is a JSON array
+-- aligned the same way. p_send_after is set on invites queued during quiet hours.
+
+CREATE OR REPLACE FUNCTION attempt_insert_invites(
+  p_match_id UUID,
+  p_player_ids UUID[],
+  p_status TEXT,
+  p_batch_number INTEGER,
+  p_sent_at TIMESTAMPTZ,
+  p_expires_at TIMESTAMPTZ,
+  p_invite_scores FLOAT[] DEFAULT NULL,
+  p_score_breakdowns JSONB DEFAULT NULL,
+  p_send_after TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS TABLE (player_id UUID, status TEXT)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+#variable_conflict use_column
+DECLARE
+  v_participant_count INT;
+BEGIN
+  -- 1. Lock the match row once for the whole batch
+  PERFORM 1 FROM matches m WHERE m.match_id = p_match_id FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RETURN QUERY
+      SELECT t.pid, 'MATCH_NOT_FOUND'::TEXT
+      FROM unnest(p_player_ids) WITH ORDINALITY AS t(pid, ord)
+      ORDER BY t.ord;
+    RETURN;
+  END IF;
+
+  -- 2. Inviting does not change participations, so "full" applies to the whole batch
+  SELECT COUNT(*) INTO v_participant_count
+  FROM match_participations mp
+  WHERE mp.match_id = p_match_id;
+
+  IF v_participant_count >= 4 THEN
+    RETURN QUERY
+      SELECT t.pid, 'MATCH_FULL'::TEXT
+      FROM unnest(p_player_ids) WITH ORDINALITY AS t(pid, ord)
+      ORDER BY t.ord;
+    RETURN;
+  END IF;
+
+  -- 3. Classify every player, then insert the SUCCESS rows in one statement
+  RETURN QUERY
+  WITH requested AS (
+    SELECT t.pid, t.ord,
+           p_invite_scores[t.ord] AS score,
+           p_score_breakdowns -> (t.ord::INT - 1) AS breakdown
+    FROM unnest(p_player_ids) WITH ORDINALITY AS t(pid, ord)
+  ),
+  classified AS (
+    SELECT r.*,
+      CASE
+        WHEN EXISTS (
+          SELECT 1 FROM match_invites mi
+          WHERE mi.match_id = p_match_id AND mi.player_id = r.pid
+        ) OR EXISTS (
+          SELECT 1 FROM requested r2 WHERE r2.pid = r.pid AND r2.ord < r.ord
+        ) THEN 'ALREADY_INVITED'
+        WHEN EXISTS (
+          SELECT 1 FROM match_participations mp
+          WHERE mp.match_id = p_match_id AND mp.player_id = r.pid
+        ) THEN 'ALREADY_IN_MATCH'
+        ELSE 'SUCCESS'
+      END AS result
+    FROM requested r
+  ),
+  inserted AS (
+    INSERT INTO match_invites (
+      match_id,
+      player_id,
+      status,
+      batch_number,
+      sent_at,
+      expires_at,
+      invite_score,
+      score_breakdown,
+      send_after
+    )
+    SELECT
+      p_match_id,
+      c.pid,
+      p_status,
+      p_batch_number,
+      p_sent_at,
+      p_expires_at,
+      c.score,
+      c.breakdown,
+      p_send_after
+    FROM classified c
+    WHERE c.result = 'SUCCESS'
+    RETURNING match_invites.invite_id
+  )
+  SELECT c.pid, c.result::TEXT
+  FROM classified c
+  ORDER BY c.ord;
+END;
+$$;
@@ -0,0 +1,45 @@
+-- Set-based input for process_batch_refills
+-- Returns one row per match with stale invites (sent, expired, not yet refilled),
+-- joined to the match status, its club's quiet-hours settings and the highest
+-- batch number sent so far, so the cron job needs no per-invite lookups.
+
+-- Supporting partial index: only unclaimed sent invites are scanned
+CREATE INDEX IF NOT EXISTS idx_match_invites_stale_refill
+  ON match_invites(expires_at)
+  WHERE status = 'sent' AND refilled_at IS NULL AND match_id IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION get_stale_invite_refills(p_now TIMESTAMPTZ DEFAULT NOW())
+RETURNS TABLE (
+  match_id UUID,
+  match_status TEXT,
+  club_id UUID,
+  club_settings JSONB,
+  club_timezone TEXT,
+  invite_ids UUID[],
+  max_batch_number INTEGER
+)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+  WITH stale AS (
+    SELECT mi.match_id, array_agg(mi.invite_id ORDER BY mi.invite_id) AS invite_ids
+    FROM match_invites mi
+    WHERE mi.status = 'sent'
+      AND mi.match_id IS NOT NULL
+      AND mi.expires_at < p_now
+      AND mi.refilled_at IS NULL
+    GROUP BY mi.match_id
+  )
+  SELECT
+    s.match_id,
+    m.status::TEXT,
+    m.club_id,
+    c.settings::JSONB,
+    c.timezone,
+    s.invite_ids,
+    (SELECT MAX(bi.batch_number) FROM match_invites bi WHERE bi.match_id = s.match_id)
+  FROM stale s
+  LEFT JOIN matches m ON m.match_id = s.match_id
+  LEFT JOIN clubs c ON c.club_id = m.club_id;
+$$;
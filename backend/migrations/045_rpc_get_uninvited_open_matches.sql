@@ -0,0 +1,23 @@
+-- Open matches that have never sent an invite (process_pending_matches catch-up)
+-- Anti-join instead of one match_invites query per pending/voting match.
+-- The NOT EXISTS probe uses idx_match_invites_match_player (042).
+
+CREATE INDEX IF NOT EXISTS idx_matches_open_scheduled
+  ON matches(created_at)
+  WHERE status IN ('pending', 'voting') AND scheduled_time IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION get_uninvited_open_matches()
+RETURNS TABLE (match_id UUID, club_id UUID)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+  SELECT m.match_id, m.club_id
+  FROM matches m
+  WHERE m.status IN ('pending', 'voting')
+    AND m.scheduled_time IS NOT NULL
+    AND NOT EXISTS (
+      SELECT 1 FROM match_invites mi WHERE mi.match_id = m.match_id
+    )
+  ORDER BY m.created_at;
+$$;
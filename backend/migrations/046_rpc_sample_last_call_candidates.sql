@@ -0,0 +1,32 @@
+-- Random last-call candidates for process_last_call_flash
+-- Returns up to p_limit active club members who are not in the match and were
+-- never invited to it, sampled in SQL. Returns no rows unless the match has
+-- exactly one open spot (3 participants), so the caller needs no extra lookups.
+
+CREATE OR REPLACE FUNCTION sample_last_call_candidates(
+  p_match_id UUID,
+  p_limit INTEGER DEFAULT 10
+)
+RETURNS TABLE (player_id UUID, phone_number TEXT, name TEXT)
+LANGUAGE sql
+VOLATILE
+SECURITY DEFINER
+AS $$
+  SELECT p.player_id, p.phone_number::TEXT, p.name::TEXT
+  FROM matches m
+  JOIN club_members cm ON cm.club_id = m.club_id
+  JOIN players p ON p.player_id = cm.player_id
+  WHERE m.match_id = p_match_id
+    AND p.active_status = TRUE
+    AND (SELECT COUNT(*) FROM match_participations mp WHERE mp.match_id = p_match_id) = 3
+    AND NOT EXISTS (
+      SELECT 1 FROM match_participations mp
+      WHERE mp.match_id = p_match_id AND mp.player_id = p.player_id
+    )
+    AND NOT EXISTS (
+      SELECT 1 FROM match_invites mi
+      WHERE mi.match_id = p_match_id AND mi.player_id = p.player_id
+    )
+  ORDER BY random()
+  LIMIT p_limit;
+$$;
@@ -0,0 +1,57 @@
+-- Deadpool snapshot for check_match_deadpool
+-- One aggregate over the match: players needed, eligible group members left,
+-- the most common suggested time, plus the originator/club/group details the
+-- notification needs. Returns NULL if the match does not exist.
+--   needed          = 4 - participants - invites still 'sent'
+--   remaining_pool  = target group members neither in the match nor ever invited
+--                     (0 for club-wide matches: matchmaking already exhausted the club)
+
+CREATE INDEX IF NOT EXISTS idx_match_invites_suggested_time
+  ON match_invites(match_id)
+  WHERE suggested_time IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION get_match_deadpool_snapshot(p_match_id UUID)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+  SELECT jsonb_build_object(
+    'match_id', m.match_id,
+    'status', m.status,
+    'club_id', m.club_id,
+    'target_group_id', m.target_group_id,
+    'scheduled_time', m.scheduled_time,
+    'bridge_offer_sent', COALESCE(m.bridge_offer_sent, FALSE),
+    'needed', 4
+      - (SELECT COUNT(*) FROM match_participations mp WHERE mp.match_id = m.match_id)
+      - (SELECT COUNT(*) FROM match_invites mi WHERE mi.match_id = m.match_id AND mi.status = 'sent'),
+    'remaining_pool', CASE WHEN m.target_group_id IS NULL THEN 0 ELSE (
+      SELECT COUNT(*) FROM group_memberships gm
+      WHERE gm.group_id = m.target_group_id
+        AND NOT EXISTS (SELECT 1 FROM match_invites mi WHERE mi.match_id = m.match_id AND mi.player_id = gm.player_id)
+        AND NOT EXISTS (SELECT 1 FROM match_participations mp WHERE mp.match_id = m.match_id AND mp.player_id = gm.player_id)
+    ) END,
+    'top_suggested_time', s.suggested_time,
+    'top_suggested_count', COALESCE(s.suggestions, 0),
+    'originator', (
+      SELECT jsonb_build_object('player_id', p.player_id, 'phone_number', p.phone_number, 'name', p.name)
+      FROM players p WHERE p.player_id = m.originator_id
+    ),
+    'club_name', c.name,
+    'club_timezone', c.timezone,
+    'group_name', g.name
+  )
+  FROM matches m
+  LEFT JOIN clubs c ON c.club_id = m.club_id
+  LEFT JOIN player_groups g ON g.group_id = m.target_group_id
+  LEFT JOIN LATERAL (
+    SELECT mi.suggested_time, COUNT(*) AS suggestions
+    FROM match_invites mi
+    WHERE mi.match_id = m.match_id AND mi.suggested_time IS NOT NULL
+    GROUP BY mi.suggested_time
+    ORDER BY COUNT(*) DESC, MIN(mi.sent_at)
+    LIMIT 1
+  ) s ON TRUE
+  WHERE m.match_id = p_match_id;
+$$;
@@ -0,0 +1,46 @@
+-- get_stale_invite_refills (044) restricted to given matches
+-- The invite expiry queue pops the matches whose deadlines are due; the refill
+-- then reads only those matches (match_id index) instead of scanning every
+-- stale invite. p_match_ids NULL keeps the full scan for cron reconciliation.
+
+DROP FUNCTION IF EXISTS get_stale_invite_refills(TIMESTAMPTZ);
+
+CREATE OR REPLACE FUNCTION get_stale_invite_refills(
+  p_now TIMESTAMPTZ DEFAULT NOW(),
+  p_match_ids UUID[] DEFAULT NULL
+)
+RETURNS TABLE (
+  match_id UUID,
+  match_status TEXT,
+  club_id UUID,
+  club_settings JSONB,
+  club_timezone TEXT,
+  invite_ids UUID[],
+  max_batch_number INTEGER
+)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+  WITH stale AS (
+    SELECT mi.match_id, array_agg(mi.invite_id ORDER BY mi.invite_id) AS invite_ids
+    FROM match_invites mi
+    WHERE mi.status = 'sent'
+      AND mi.match_id IS NOT NULL
+      AND mi.expires_at < p_now
+      AND mi.refilled_at IS NULL
+      AND (p_match_ids IS NULL OR mi.match_id = ANY(p_match_ids))
+    GROUP BY mi.match_id
+  )
+  SELECT
+    s.match_id,
+    m.status::TEXT,
+    m.club_id,
+    c.settings::JSONB,
+    c.timezone,
+    s.invite_ids,
+    (SELECT MAX(bi.batch_number) FROM match_invites bi WHERE bi.match_id = s.match_id)
+  FROM stale s
+  LEFT JOIN matches m ON m.match_id = s.match_id
+  LEFT JOIN clubs c ON c.club_id = m.club_id;
+$$;
@@ -0,0 +1,163 @@
+-- Availability packed into a 6-bit mask
+-- The six avail_* booleans (migration 012) become players.availability_mask so
+-- candidate selection can test a match's time bucket with a single AND.
+-- Bits follow the SMS letters A-F:
+--   1 weekday morning, 2 weekday afternoon, 4 weekday evening,
+--   8 weekend morning, 16 weekend afternoon, 32 weekend evening
+-- 0 means no availability given (treated as available for any time).
+
+ALTER TABLE players ADD COLUMN IF NOT EXISTS availability_mask SMALLINT NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION player_availability_mask_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.availability_mask :=
+          (CASE WHEN COALESCE(NEW.avail_weekday_morning, false) THEN 1 ELSE 0 END)
+        | (CASE WHEN COALESCE(NEW.avail_weekday_afternoon, false) THEN 2 ELSE 0 END)
+        | (CASE WHEN COALESCE(NEW.avail_weekday_evening, false) THEN 4 ELSE 0 END)
+        | (CASE WHEN COALESCE(NEW.avail_weekend_morning, false) THEN 8 ELSE 0 END)
+        | (CASE WHEN COALESCE(NEW.avail_weekend_afternoon, false) THEN 16 ELSE 0 END)
+        | (CASE WHEN COALESCE(NEW.avail_weekend_evening, false) THEN 32 ELSE 0 END);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- The SMS handlers write the mask themselves; the trigger keeps it in step when
+-- the dashboard edits the booleans directly
+DROP TRIGGER IF EXISTS trg_player_availability_mask ON players;
+CREATE TRIGGER trg_player_availability_mask
+BEFORE INSERT OR UPDATE OF avail_weekday_morning, avail_weekday_afternoon, avail_weekday_evening,
+    avail_weekend_morning, avail_weekend_afternoon, avail_weekend_evening ON players
+FOR EACH ROW EXECUTE FUNCTION player_availability_mask_trigger();
+
+-- Backfill (fires the trigger)
+UPDATE players SET avail_weekday_morning = avail_weekday_morning;
+
+-- get_match_invite_context (042) now also returns each candidate's availability_mask
+CREATE OR REPLACE FUNCTION get_match_invite_context(
+  p_match_id UUID,
+  p_skip_filters BOOLEAN DEFAULT FALSE,
+  p_target_player_ids UUID[] DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+  v_match matches%ROWTYPE;
+  v_requester_id UUID;
+  v_requester JSONB;
+  v_club JSONB;
+  v_level_min NUMERIC;
+  v_level_max NUMERIC;
+  v_target_level NUMERIC;
+  v_gender TEXT;
+  v_group_found BOOLEAN := TRUE;
+  v_candidates JSONB := '[]'::JSONB;
+BEGIN
+  SELECT * INTO v_match FROM matches WHERE match_id = p_match_id;
+
+  IF NOT FOUND THEN
+    RETURN NULL;
+  END IF;
+
+  -- 1. Requester: team 1 lead, else the originator
+  SELECT player_id INTO v_requester_id
+  FROM match_participations
+  WHERE match_id = p_match_id AND team_index = 1
+  ORDER BY created_at
+  LIMIT 1;
+
+  v_requester_id := COALESCE(v_requester_id, v_match.originator_id);
+
+  SELECT jsonb_build_object(
+    'player_id', player_id,
+    'name', name,
+    'phone_number', phone_number,
+    'declared_skill_level', declared_skill_level,
+    'adjusted_skill_level', adjusted_skill_level
+  ) INTO v_requester
+  FROM players
+  WHERE player_id = v_requester_id;
+
+  -- 2. Club name, settings and timezone
+  SELECT jsonb_build_object('name', name, 'settings', settings, 'timezone', timezone)
+  INTO v_club
+  FROM clubs
+  WHERE club_id = v_match.club_id;
+
+  IF v_match.target_group_id IS NOT NULL THEN
+    v_group_found := EXISTS (
+      SELECT 1 FROM group_memberships WHERE group_id = v_match.target_group_id
+    );
+  END IF;
+
+  -- 3. Candidates (only while the match is still looking for players)
+  IF v_match.status IN ('pending', 'voting') AND v_group_found THEN
+    v_level_min := v_match.level_range_min;
+    v_level_max := v_match.level_range_max;
+    IF NOT p_skip_filters AND (v_level_min IS NULL OR v_level_max IS NULL) THEN
+      v_target_level := COALESCE(
+        (v_requester->>'adjusted_skill_level')::NUMERIC,
+        (v_requester->>'declared_skill_level')::NUMERIC,
+        3.5
+      );
+      v_level_min := v_target_level - 0.25;
+      v_level_max := v_target_level + 0.25;
+    END IF;
+    v_gender := LOWER(COALESCE(v_match.gender_preference, 'mixed'));
+
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+      'player_id', p.player_id,
+      'name', p.name,
+      'phone_number', p.phone_number,
+      'gender', p.gender,
+      'declared_skill_level', p.declared_skill_level,
+      'adjusted_skill_level', p.adjusted_skill_level,
+      'responsiveness_score', p.responsiveness_score,
+      'reputation_score', p.reputation_score,
+      'availability_mask', p.availability_mask
+    )), '[]'::JSONB)
+    INTO v_candidates
+    FROM players p
+    WHERE (
+        -- Explicit targets (admin UI) are taken as-is; otherwise active club members
+        (p_target_player_ids IS NOT NULL AND cardinality(p_target_player_ids) > 0
+          AND p.player_id = ANY(p_target_player_ids))
+        OR
+        ((p_target_player_ids IS NULL OR cardinality(p_target_player_ids) = 0)
+          AND p.active_status = TRUE
+          AND EXISTS (
+            SELECT 1 FROM club_members cm
+            WHERE cm.club_id = v_match.club_id AND cm.player_id = p.player_id
+          ))
+      )
+      AND (v_match.target_group_id IS NULL OR EXISTS (
+        SELECT 1 FROM group_memberships gm
+        WHERE gm.group_id = v_match.target_group_id AND gm.player_id = p.player_id
+      ))
+      AND NOT EXISTS (
+        SELECT 1 FROM match_participations mp
+        WHERE mp.match_id = p_match_id AND mp.player_id = p.player_id
+      )
+      AND NOT EXISTS (
+        SELECT 1 FROM match_invites mi
+        WHERE mi.match_id = p_match_id AND mi.player_id = p.player_id
+      )
+      AND (p.muted_until IS NULL OR p.muted_until <= NOW())
+      AND (p_skip_filters OR (
+        COALESCE(p.adjusted_skill_level, p.declared_skill_level, 3.5) BETWEEN v_level_min AND v_level_max
+        AND (v_gender NOT IN ('male', 'female') OR LOWER(COALESCE(p.gender, '')) = v_gender)
+      ));
+  END IF;
+
+  RETURN jsonb_build_object(
+    'match', to_jsonb(v_match),
+    'requester', v_requester,
+    'club', v_club,
+    'group_found', v_group_found,
+    'candidates', v_candidates
+  );
+END;
+$$;
@@ -0,0 +1,220 @@
+-- Incremental invite/match counters and scores
+-- The nightly score job used to re-aggregate (a truncated slice of) every invite
+-- and participation and update players one by one. The counters are now kept
+-- current by triggers on the rows that change them, and the scores are
+-- recomputed on the touched player row only:
+--   match_invites insert/status change/delete -> total_invites_received/_responded/_accepted
+--   participation added/removed in a confirmed or completed match, or the match
+--   entering/leaving those statuses                 -> total_matches_played
+--   any counter (or total_no_shows) change           -> responsiveness_score, reputation_score
+-- reconcile_player_counters() recomputes everything set-based and fixes drift
+-- (nightly cron).
+--
+-- Definitions (same as score_calculator / scoring_engine):
+--   received  = invites not waiting for quiet hours (status <> 'pending_sms')
+--   responded = accepted + declined
+--   played    = participations in confirmed/completed matches
+
+ALTER TABLE players ADD COLUMN IF NOT EXISTS total_invites_responded INTEGER DEFAULT 0;
+
+-- =====================================================
+-- 1. Score formulas (mirror scoring_engine.calculate_*_score)
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION player_responsiveness_score(p_received INTEGER, p_responded INTEGER)
+RETURNS INTEGER
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT CASE WHEN COALESCE(p_received, 0) = 0 THEN 50
+    ELSE GREATEST(0, LEAST(100, TRUNC(50 + (COALESCE(p_responded, 0)::NUMERIC / p_received - 0.5) * 100)))::INTEGER
+  END;
+$$;
+
+CREATE OR REPLACE FUNCTION player_reputation_score(p_no_shows INTEGER, p_matches_played INTEGER)
+RETURNS INTEGER
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT GREATEST(0, LEAST(100, TRUNC(
+    75 - COALESCE(p_no_shows, 0) * 20 + LEAST(15, COALESCE(p_matches_played, 0) * 0.5)
+  )))::INTEGER;
+$$;
+
+CREATE OR REPLACE FUNCTION player_scores_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.responsiveness_score := player_responsiveness_score(NEW.total_invites_received, NEW.total_invites_responded);
+    NEW.reputation_score := player_reputation_score(NEW.total_no_shows, NEW.total_matches_played);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_player_scores ON players;
+CREATE TRIGGER trg_player_scores
+BEFORE UPDATE OF total_invites_received, total_invites_responded, total_no_shows, total_matches_played ON players
+FOR EACH ROW EXECUTE FUNCTION player_scores_trigger();
+
+-- =====================================================
+-- 2. Invite counters
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION player_invite_counters_trigger()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_old_received INTEGER := 0;
+    v_old_responded INTEGER := 0;
+    v_old_accepted INTEGER := 0;
+    v_new_received INTEGER := 0;
+    v_new_responded INTEGER := 0;
+    v_new_accepted INTEGER := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        v_old_received := (OLD.status <> 'pending_sms')::INTEGER;
+        v_old_responded := (OLD.status IN ('accepted', 'declined'))::INTEGER;
+        v_old_accepted := (OLD.status = 'accepted')::INTEGER;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        v_new_received := (NEW.status <> 'pending_sms')::INTEGER;
+        v_new_responded := (NEW.status IN ('accepted', 'declined'))::INTEGER;
+        v_new_accepted := (NEW.status = 'accepted')::INTEGER;
+    END IF;
+
+    IF TG_OP = 'UPDATE' AND OLD.player_id IS DISTINCT FROM NEW.player_id THEN
+        UPDATE players SET
+            total_invites_received = COALESCE(total_invites_received, 0) - v_old_received,
+            total_invites_responded = COALESCE(total_invites_responded, 0) - v_old_responded,
+            total_invites_accepted = COALESCE(total_invites_accepted, 0) - v_old_accepted
+        WHERE player_id = OLD.player_id;
+        v_old_received := 0;
+        v_old_responded := 0;
+        v_old_accepted := 0;
+    END IF;
+
+    IF v_new_received <> v_old_received OR v_new_responded <> v_old_responded OR v_new_accepted <> v_old_accepted THEN
+        UPDATE players SET
+            total_invites_received = COALESCE(total_invites_received, 0) + v_new_received - v_old_received,
+            total_invites_responded = COALESCE(total_invites_responded, 0) + v_new_responded - v_old_responded,
+            total_invites_accepted = COALESCE(total_invites_accepted, 0) + v_new_accepted - v_old_accepted
+        WHERE player_id = COALESCE(NEW.player_id, OLD.player_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_player_invite_counters ON match_invites;
+CREATE TRIGGER trg_player_invite_counters
+AFTER INSERT OR DELETE OR UPDATE OF status, player_id ON match_invites
+FOR EACH ROW EXECUTE FUNCTION player_invite_counters_trigger();
+
+-- =====================================================
+-- 3. Matches played
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION player_participation_counter_trigger()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_row match_participations%ROWTYPE;
+    v_delta INTEGER;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        v_row := NEW;
+        v_delta := 1;
+    ELSE
+        v_row := OLD;
+        v_delta := -1;
+    END IF;
+
+    UPDATE players SET total_matches_played = GREATEST(0, COALESCE(total_matches_played, 0) + v_delta)
+    WHERE player_id = v_row.player_id
+      AND EXISTS (
+        SELECT 1 FROM matches m
+        WHERE m.match_id = v_row.match_id AND m.status IN ('confirmed', 'completed')
+      );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_player_participation_counter ON match_participations;
+CREATE TRIGGER trg_player_participation_counter
+AFTER INSERT OR DELETE ON match_participations
+FOR EACH ROW EXECUTE FUNCTION player_participation_counter_trigger();
+
+CREATE OR REPLACE FUNCTION match_played_counter_trigger()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_was_played BOOLEAN := OLD.status IN ('confirmed', 'completed');
+    v_is_played BOOLEAN := NEW.status IN ('confirmed', 'completed');
+BEGIN
+    IF v_was_played <> v_is_played THEN
+        UPDATE players p
+        SET total_matches_played = GREATEST(0, COALESCE(p.total_matches_played, 0) + CASE WHEN v_is_played THEN 1 ELSE -1 END)
+        FROM match_participations mp
+        WHERE mp.match_id = NEW.match_id AND mp.player_id = p.player_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_match_played_counter ON matches;
+CREATE TRIGGER trg_match_played_counter
+AFTER UPDATE OF status ON matches
+FOR EACH ROW EXECUTE FUNCTION match_played_counter_trigger();
+
+-- =====================================================
+-- 4. Reconciliation (nightly) and backfill
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_match_invites_player ON match_invites(player_id);
+
+-- Recomputes every counter set-based and updates only the players that drifted
+-- (the score trigger refreshes their scores). Returns the corrected rows.
+CREATE OR REPLACE FUNCTION reconcile_player_counters()
+RETURNS TABLE (player_id UUID, responsiveness_score INTEGER, reputation_score INTEGER)
+LANGUAGE sql
+VOLATILE
+SECURITY DEFINER
+AS $$
+  WITH inv AS (
+    SELECT mi.player_id,
+      COUNT(*) FILTER (WHERE mi.status <> 'pending_sms') AS received,
+      COUNT(*) FILTER (WHERE mi.status IN ('accepted', 'declined')) AS responded,
+      COUNT(*) FILTER (WHERE mi.status = 'accepted') AS accepted
+    FROM match_invites mi
+    GROUP BY mi.player_id
+  ),
+  played AS (
+    SELECT mp.player_id, COUNT(*) AS played
+    FROM match_participations mp
+    JOIN matches m ON m.match_id = mp.match_id
+    WHERE m.status IN ('confirmed', 'completed')
+    GROUP BY mp.player_id
+  ),
+  expected AS (
+    SELECT p.player_id,
+      COALESCE(inv.received, 0)::INTEGER AS received,
+      COALESCE(inv.responded, 0)::INTEGER AS responded,
+      COALESCE(inv.accepted, 0)::INTEGER AS accepted,
+      COALESCE(played.played, 0)::INTEGER AS played
+    FROM players p
+    LEFT JOIN inv ON inv.player_id = p.player_id
+    LEFT JOIN played ON played.player_id = p.player_id
+  )
+  UPDATE players p SET
+    total_invites_received = e.received,
+    total_invites_responded = e.responded,
+    total_invites_accepted = e.accepted,
+    total_matches_played = e.played
+  FROM expected e
+  WHERE p.player_id = e.player_id
+    AND (p.total_invites_received IS DISTINCT FROM e.received
+      OR p.total_invites_responded IS DISTINCT FROM e.responded
+      OR p.total_invites_accepted IS DISTINCT FROM e.accepted
+      OR p.total_matches_played IS DISTINCT FROM e.played
+      OR p.responsiveness_score IS DISTINCT FROM player_responsiveness_score(e.received, e.responded)
+      OR p.reputation_score IS DISTINCT FROM player_reputation_score(p.total_no_shows, e.played))
+  RETURNING p.player_id, p.responsiveness_score, p.reputation_score;
+$$;
+
+-- Backfill
+SELECT COUNT(*) FROM reconcile_player_counters();
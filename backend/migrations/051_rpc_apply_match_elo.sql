@@ -0,0 +1,142 @@
+-- Atomic Elo application for one pairing (replaces the per-player reads and
+-- updates in logic/elo_service.py)
+-- Locks every player it touches (in player_id order, so concurrent reports on
+-- overlapping players queue instead of deadlocking or losing updates), then in
+-- one transaction:
+--   1. p_replace_existing: reverses the match's previous rating changes (a result
+--      correction): each player goes back to the rating before their first
+--      change for the match, loses one confidence point per change, and the
+--      match's history rows are deleted
+--   2. seeds missing ratings, computes the team deltas and writes players and
+--      player_rating_history
+-- Returns one row per rated player, plus any player whose earlier change was
+-- only reversed (old_elo_rating NULL). No rows when the teams are not 2 + 2
+-- distinct existing players (nothing is written).
+--
+-- Math mirrors logic/elo_service.py:
+--   seed        = TRUNC(declared_skill_level * 400 + 500) when elo_rating is NULL
+--                 or still the untouched default (1500 with confidence 0)
+--   expected    = 1 / (1 + 10 ^ ((opponents - team) / 400)), team = mean Elo
+--   delta       = ROUND(k * (result - expected)), k = 64 below 5 rated matches, else 32
+--   sync rating = ROUND(clamp((elo - 500) / 400, 2.0, 7.0), 2)
+
+CREATE OR REPLACE FUNCTION elo_sync_rating(p_elo INTEGER)
+RETURNS NUMERIC
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT ROUND(GREATEST(2.0, LEAST(7.0, (p_elo - 500) / 400.0)), 2);
+$$;
+
+CREATE OR REPLACE FUNCTION apply_match_elo(
+  p_match_id UUID,
+  p_team_1 UUID[],
+  p_team_2 UUID[],
+  p_winner_team INTEGER,
+  p_replace_existing BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (player_id UUID, old_elo_rating INTEGER, new_elo_rating INTEGER, new_sync_rating NUMERIC)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+#variable_conflict use_column
+DECLARE
+  v_players UUID[] := p_team_1 || p_team_2;
+  v_reversed UUID[] := '{}';
+  v_found INT;
+  v_result_1 FLOAT8 := CASE p_winner_team WHEN 1 THEN 1.0 WHEN 2 THEN 0.0 ELSE 0.5 END;
+BEGIN
+  IF COALESCE(array_length(p_team_1, 1), 0) <> 2 OR COALESCE(array_length(p_team_2, 1), 0) <> 2
+     OR (SELECT COUNT(DISTINCT pid) FROM unnest(v_players) AS t(pid)) <> 4 THEN
+    RETURN;
+  END IF;
+
+  IF p_replace_existing THEN
+    SELECT COALESCE(array_agg(DISTINCT h.player_id), '{}') INTO v_reversed
+    FROM player_rating_history h
+    WHERE h.match_id = p_match_id;
+  END IF;
+
+  -- 1. Lock every player touched, in a fixed order
+  PERFORM 1 FROM players p
+  WHERE p.player_id = ANY(v_players || v_reversed)
+  ORDER BY p.player_id
+  FOR UPDATE;
+
+  SELECT COUNT(*) INTO v_found FROM players p WHERE p.player_id = ANY(v_players);
+  IF v_found <> 4 THEN
+    RETURN;
+  END IF;
+
+  -- 2. Correction: undo the match's previous changes
+  IF cardinality(v_reversed) > 0 THEN
+    WITH entries AS (
+      SELECT h.player_id, h.old_elo_rating, h.old_sync_rating,
+             ROW_NUMBER() OVER (PARTITION BY h.player_id ORDER BY h.created_at, h.history_id) AS n,
+             COUNT(*) OVER (PARTITION BY h.player_id) AS changes
+      FROM player_rating_history h
+      WHERE h.match_id = p_match_id
+    )
+    UPDATE players p SET
+      elo_rating = e.old_elo_rating,
+      adjusted_skill_level = e.old_sync_rating,
+      elo_confidence = GREATEST(0, COALESCE(p.elo_confidence, 0) - e.changes)
+    FROM entries e
+    WHERE e.n = 1 AND p.player_id = e.player_id;
+
+    DELETE FROM player_rating_history h WHERE h.match_id = p_match_id;
+  END IF;
+
+  -- 3. Deltas, player updates and history in one statement
+  RETURN QUERY
+  WITH rated AS (
+    SELECT p.player_id,
+           p.player_id = ANY(p_team_1) AS on_team_1,
+           CASE WHEN p.elo_rating IS NULL OR (p.elo_rating = 1500 AND COALESCE(p.elo_confidence, 0) = 0)
+                THEN TRUNC(COALESCE(p.declared_skill_level, 3.5) * 400 + 500)::INTEGER
+                ELSE p.elo_rating END AS old_elo,
+           COALESCE(p.elo_confidence, 0) AS confidence
+    FROM players p
+    WHERE p.player_id = ANY(v_players)
+  ),
+  teams AS (
+    SELECT (AVG(r.old_elo) FILTER (WHERE r.on_team_1))::FLOAT8 AS team_1,
+           (AVG(r.old_elo) FILTER (WHERE NOT r.on_team_1))::FLOAT8 AS team_2
+    FROM rated r
+  ),
+  deltas AS (
+    SELECT r.player_id, r.old_elo, r.confidence,
+           r.old_elo + ROUND(
+             (CASE WHEN r.confidence < 5 THEN 64 ELSE 32 END)::FLOAT8 * (
+               CASE WHEN r.on_team_1 THEN v_result_1 ELSE 1.0 - v_result_1 END
+               - 1.0 / (1.0 + POWER(10.0::FLOAT8,
+                   (CASE WHEN r.on_team_1 THEN t.team_2 - t.team_1 ELSE t.team_1 - t.team_2 END) / 400.0))
+             )
+           )::INTEGER AS new_elo
+    FROM rated r CROSS JOIN teams t
+  ),
+  updated AS (
+    UPDATE players p SET
+      elo_rating = d.new_elo,
+      elo_confidence = d.confidence + 1,
+      adjusted_skill_level = elo_sync_rating(d.new_elo)
+    FROM deltas d
+    WHERE p.player_id = d.player_id
+    RETURNING p.player_id
+  ),
+  history AS (
+    INSERT INTO player_rating_history
+      (player_id, old_elo_rating, new_elo_rating, old_sync_rating, new_sync_rating, change_type, match_id)
+    SELECT d.player_id, d.old_elo, d.new_elo, elo_sync_rating(d.old_elo), elo_sync_rating(d.new_elo),
+           'match_result', p_match_id
+    FROM deltas d
+    RETURNING 1
+  )
+  SELECT d.player_id, d.old_elo, d.new_elo, elo_sync_rating(d.new_elo)
+  FROM deltas d
+  UNION ALL
+  SELECT p.player_id, NULL::INTEGER, p.elo_rating, p.adjusted_skill_level
+  FROM players p
+  WHERE p.player_id = ANY(v_reversed) AND NOT p.player_id = ANY(v_players);
+END;
+$$;
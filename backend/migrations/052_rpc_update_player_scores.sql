@@ -0,0 +1,35 @@
+-- Update-only bulk write for the full score recompute (score_calculator)
+-- The recompute used to write each page's changed players with a multi-row
+-- upsert. An upsert inserts missing rows, so a player deleted while the
+-- recompute ran came back as a ghost row. This updates the players that still
+-- exist and ignores the rest.
+--
+-- p_rows: JSON array of {player_id, total_invites_received, total_invites_responded,
+--         total_invites_accepted, total_matches_played, responsiveness_score,
+--         reputation_score}
+-- Returns the ids of the players updated.
+
+CREATE OR REPLACE FUNCTION update_player_scores(p_rows JSONB)
+RETURNS TABLE (player_id UUID)
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+  UPDATE players p SET
+    total_invites_received = r.total_invites_received,
+    total_invites_responded = r.total_invites_responded,
+    total_invites_accepted = r.total_invites_accepted,
+    total_matches_played = r.total_matches_played,
+    responsiveness_score = r.responsiveness_score,
+    reputation_score = r.reputation_score
+  FROM jsonb_to_recordset(p_rows) AS r(
+    player_id UUID,
+    total_invites_received INTEGER,
+    total_invites_responded INTEGER,
+    total_invites_accepted INTEGER,
+    total_matches_played INTEGER,
+    responsiveness_score INTEGER,
+    reputation_score INTEGER
+  )
+  WHERE p.player_id = r.player_id
+  RETURNING p.player_id;
+$$;
@@ -0,0 +1,57 @@
+-- Atomic write of an Elo replay (logic/elo_replay.py)
+-- Applying a replay used to take separate requests: delete the replayed
+-- matches' match_result history, insert the regenerated rows in batches, then
+-- upsert the changed players. A timeout or error in between left the history
+-- deleted and ratings half-written. The upsert also re-inserted players
+-- deleted since the replay read them.
+-- This function does it all in one transaction:
+--   1. deletes the match_result history of p_match_ids
+--   2. inserts the regenerated history, passed as parallel arrays (one entry
+--      per row; sync ratings derived with elo_sync_rating from migration 051).
+--      Rows for players or matches deleted since the read are dropped.
+--   3. updates (never inserts) the changed players in p_players:
+--      JSON array of {player_id, elo_rating, elo_confidence, adjusted_skill_level}
+-- Returns the ids of the players updated.
+
+CREATE OR REPLACE FUNCTION apply_elo_replay(
+  p_match_ids UUID[],
+  p_history_player_ids UUID[],
+  p_history_match_ids UUID[],
+  p_history_old INTEGER[],
+  p_history_new INTEGER[],
+  p_history_times TIMESTAMPTZ[],
+  p_players JSONB
+)
+RETURNS TABLE (player_id UUID)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+#variable_conflict use_column
+BEGIN
+  DELETE FROM player_rating_history h
+  WHERE h.change_type = 'match_result' AND h.match_id = ANY(p_match_ids);
+
+  INSERT INTO player_rating_history
+    (player_id, old_elo_rating, new_elo_rating, old_sync_rating, new_sync_rating, change_type, match_id, created_at)
+  SELECT t.player_id, t.old_elo, t.new_elo, elo_sync_rating(t.old_elo), elo_sync_rating(t.new_elo),
+         'match_result', t.match_id, t.created_at
+  FROM unnest(p_history_player_ids, p_history_match_ids, p_history_old, p_history_new, p_history_times)
+       AS t(player_id, match_id, old_elo, new_elo, created_at)
+  JOIN players p ON p.player_id = t.player_id
+  JOIN matches m ON m.match_id = t.match_id;
+
+  RETURN QUERY
+  UPDATE players p SET
+    elo_rating = r.elo_rating,
+    elo_confidence = r.elo_confidence,
+    adjusted_skill_level = r.adjusted_skill_level
+  FROM jsonb_to_recordset(p_players) AS r(
+    player_id UUID,
+    elo_rating INTEGER,
+    elo_confidence INTEGER,
+    adjusted_skill_level NUMERIC
+  )
+  WHERE p.player_id = r.player_id
+  RETURNING p.player_id;
+END;
+$$;
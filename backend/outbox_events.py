@@ -0,0 +1,184 @@
+"""
+Outbox Events - Pub/sub for messages written to sms_outbox.
+
+store_in_outbox publishes every stored message here; the simulator long-poll
+subscribes to it to hold the request open until something arrives, instead of
+re-querying sms_outbox on a fixed interval.
+
+When state is shared through Redis, messages are published on the
+"sms_outbox" Redis channel and each process runs one listener thread that
+forwards them to its own subscribers, so a message stored by one serverless
+instance wakes a long-poll held by another. Without Redis everything runs in
+one process and messages are delivered directly.
+
+Subscribers are asyncio queues bound to the event loop that created them;
+publish() is safe to call from any thread.
+"""
+
+import asyncio
+import json
+import threading
+from typing import Callable, Optional
+
+SUBSCRIBER_QUEUE_SIZE = 100
+OUTBOX_CHANNEL = "sms_outbox"
+# How long connect() waits for Redis to confirm the channel subscription
+SUBSCRIBE_CONFIRM_SECONDS = 5
+
+
+def _shared_redis_client():
+    from redis_client import get_shared_redis_client
+    return get_shared_redis_client()
+
+
+class OutboxBroker:
+    """Fan-out of outbox messages to every active subscriber queue."""
+
+    def __init__(self, redis_client: Callable = None):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # queue -> event loop
+        self._redis_client = redis_client or _shared_redis_client
+        self._listener = None  # thread forwarding the Redis channel
+
+    def connect(self) -> bool:
+        """
+        Start the Redis listener of this process unless it is running. Blocks
+        until the channel subscription is confirmed, so call it off the event
+        loop and before querying sms_outbox. False when messages only reach this
+        process (no shared Redis, or Redis unavailable).
+        """
+        if self._listening():
+            return True
+        client = self._redis_client()
+        if client is None:
+            return False
+        try:
+            pubsub = client.pubsub()
+            pubsub.subscribe(OUTBOX_CHANNEL)
+            pubsub.get_message(timeout=SUBSCRIBE_CONFIRM_SECONDS)
+        except Exception as e:
+            print(f"[OUTBOX] Could not subscribe to Redis channel {OUTBOX_CHANNEL}: {e}")
+            return False
+
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                pubsub.close()
+                return True
+            self._listener = threading.Thread(target=self._listen, args=(pubsub,), name="outbox-listener", daemon=True)
+            self._listener.start()
+        return True
+
+    def _listening(self) -> bool:
+        with self._lock:
+            return self._listener is not None and self._listener.is_alive()
+
+    def _listen(self, pubsub):
+        try:
+            for event in pubsub.listen():
+                if event.get("type") == "message":
+                    self._deliver(json.loads(event["data"]))
+        except Exception as e:
+            # The next connect() starts a new listener
+            print(f"[OUTBOX] Redis listener stopped: {e}")
+        finally:
+            pubsub.close()
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a queue on the running event loop. Call unsubscribe() when done."""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, message: dict):
+        """
+        Deliver a message to the subscribers of every process: through the Redis
+        channel when there is one, directly to this process's subscribers when
+        its listener is not running. Never raises.
+        """
+        client = self._redis_client()
+        if client is not None:
+            try:
+                client.publish(OUTBOX_CHANNEL, json.dumps(message, default=str))
+            except Exception as e:
+                print(f"[OUTBOX] Could not publish to Redis channel {OUTBOX_CHANNEL}: {e}")
+        if not self._listening():
+            self._deliver(message)
+
+    def _deliver(self, message: dict):
+        """Hand a message to this process's subscribers. Slow subscribers with a full queue miss it."""
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(_put_nowait, queue, message)
+            except RuntimeError:
+                # Loop already closed; the subscriber is gone
+                self.unsubscribe(queue)
+
+    async def next_message(self, queue: asyncio.Queue, timeout: float, phone_number: str = None) -> Optional[dict]:
+        """Wait up to `timeout` seconds on a subscribed queue for the next message (optionally for one recipient)."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return None
+            if not phone_number or message.get("to_number") == phone_number:
+                return message
+
+    async def wait_for_message(self, timeout: float, phone_number: str = None) -> Optional[dict]:
+        """Wait up to `timeout` seconds for the next message (optionally for one recipient)."""
+        await asyncio.to_thread(self.connect)
+        queue = self.subscribe()
+        try:
+            return await self.next_message(queue, timeout, phone_number)
+        finally:
+            self.unsubscribe(queue)
+
+    async def long_poll(self, query: Callable[[], list], timeout: float, phone_number: str = None) -> list:
+        """
+        query()'s rows as soon as it returns any, or [] after `timeout` seconds.
+        Subscribes before the first query, so a message stored in between is not
+        missed; after that query() only runs again when a matching message is
+        published. query() runs in a worker thread, off the event loop.
+        """
+        await asyncio.to_thread(self.connect)
+        queue = self.subscribe()
+        try:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            rows = await asyncio.to_thread(query)
+            while not rows:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                if await self.next_message(queue, remaining, phone_number) is None:
+                    break
+                rows = await asyncio.to_thread(query)
+            return rows
+        finally:
+            self.unsubscribe(queue)
+
+
+def _put_nowait(queue: asyncio.Queue, message: dict):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        print("[OUTBOX] Subscriber queue full, dropping message")
+
+
+outbox_broker = OutboxBroker()
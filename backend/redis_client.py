@@ -1,64 +1,115 @@
 import os
-import json
+import threading
 import redis
 from dotenv import load_dotenv
+from state_store import StateStore, RedisStateStore, InMemoryStateStore, SharedBackend
+from conversation_state import encode_state, decode_state
 
 load_dotenv()
 
 redis_url = os.environ.get("REDIS_URL")
 
+# "redis" or "memory". Defaults to redis when REDIS_URL is set, otherwise in-memory.
+state_backend = (os.environ.get("STATE_BACKEND") or "").strip().lower()
+
+# Default lifetime of a conversation state (clears stale sessions)
+DEFAULT_STATE_TTL_SECONDS = 3600
+
+# Conversation state keys. The "user:" hashes of the previous JSON-in-hash format
+# are no longer read; they expire on their own TTL.
+STATE_KEY_PREFIX = "user_state:"
+
+# One client (and connection pool) per process, created on first use
+_redis_client = None
+_redis_binary_client = None
+_redis_client_lock = threading.Lock()
+
+
 def get_redis_client():
+    global _redis_client
+    if not redis_url:
+        print("Warning: REDIS_URL not set")
+        return None
+    if _redis_client is not None:
+        return _redis_client
+    try:
+        with _redis_client_lock:
+            if _redis_client is None:
+                pool = redis.ConnectionPool.from_url(redis_url, decode_responses=True)
+                _redis_client = redis.Redis(connection_pool=pool)
+        return _redis_client
+    except Exception as e:
+        print(f"Error connecting to Redis: {e}")
+        return None
+
+
+def get_redis_binary_client():
+    """Client whose responses are raw bytes (for msgpack-encoded values)."""
+    global _redis_binary_client
     if not redis_url:
         print("Warning: REDIS_URL not set")
         return None
+    if _redis_binary_client is not None:
+        return _redis_binary_client
     try:
-        return redis.from_url(redis_url, decode_responses=True)
+        with _redis_client_lock:
+            if _redis_binary_client is None:
+                pool = redis.ConnectionPool.from_url(redis_url, decode_responses=False)
+                _redis_binary_client = redis.Redis(connection_pool=pool)
+        return _redis_binary_client
     except Exception as e:
         print(f"Error connecting to Redis: {e}")
         return None
 
+
+def get_shared_redis_client(binary: bool = False):
+    """
+    The client for state shared across processes (conversation state, cron
+    leases, the invite expiry queue, leaderboards), or None when that state is
+    kept in memory: STATE_BACKEND=memory, no REDIS_URL, or Redis unavailable.
+    """
+    backend = state_backend or ("redis" if redis_url else "memory")
+    if backend != "redis":
+        return None
+    return get_redis_binary_client() if binary else get_redis_client()
+
+
+_state_store = SharedBackend("conversation state", RedisStateStore, InMemoryStateStore, binary=True)
+
+
+def get_state_store() -> StateStore:
+    """Return the process-wide conversation state store, creating it on first use."""
+    return _state_store.get()
+
+
+def set_state_store(store: StateStore):
+    """Replace the conversation state store (tests, offline benchmarks)."""
+    _state_store.set(store)
+
+
 # State management helpers
-def set_user_state(phone_number: str, state: str, data: dict = None):
-    r = get_redis_client()
-    if not r:
+def set_user_state(phone_number: str, state: str, data: dict = None, ttl: int = DEFAULT_STATE_TTL_SECONDS):
+    """
+    Replace a user's conversation state. Each write carries the full data for the
+    new step; fields from the previous step are not kept.
+    """
+    store = get_state_store()
+    if store is None:
         return False
-    
-    key = f"user:{phone_number}"
-    r.hset(key, "state", state)
-    if data:
-        for k, v in data.items():
-            # Serialize dicts/lists to JSON strings for Redis storage
-            if isinstance(v, (dict, list)):
-                r.hset(key, k, json.dumps(v))
-            else:
-                r.hset(key, k, v)
-    # Set expiry to 1 hour to clear stale sessions
-    r.expire(key, 3600)
+
+    store.set(f"{STATE_KEY_PREFIX}{phone_number}", encode_state(state, data), ttl)
     return True
 
 def get_user_state(phone_number: str):
-    r = get_redis_client()
-    if not r:
+    store = get_state_store()
+    if store is None:
         return None
-    
-    key = f"user:{phone_number}"
-    data = r.hgetall(key)
-    
-    # Deserialize any JSON strings back to dicts/lists
-    for k, v in data.items():
-        if isinstance(v, str) and v.startswith('{') or (isinstance(v, str) and v.startswith('[')):
-            try:
-                data[k] = json.loads(v)
-            except json.JSONDecodeError:
-                pass
-    
-    return data
+
+    return decode_state(store.get(f"{STATE_KEY_PREFIX}{phone_number}"))
 
 def clear_user_state(phone_number: str):
-    r = get_redis_client()
-    if not r:
+    store = get_state_store()
+    if store is None:
         return False
-    key = f"user:{phone_number}"
-    r.delete(key)
+    store.delete(f"{STATE_KEY_PREFIX}{phone_number}")
     return True
-
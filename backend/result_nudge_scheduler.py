@@ -157,12 +157,13 @@ def trigger_result_nudge_for_match(match_id: str):
     sent = send_result_nudge_for_match(match, is_manual=True)
     return {"match_id": match_id, "sms_sent": sent}
 
-def run_result_nudge_scheduler():
-    """Main entry for cron."""
+def run_result_nudge_scheduler(deadline=None):
+    """Main entry for cron. Matches fan out on the cron executor."""
+    from cron_executor import fan_out
     matches = get_matches_needing_result_nudge()
-    sent_count = 0
-    for match in matches:
-        sent_count += send_result_nudge_for_match(match)
+    run = fan_out("result-nudges", matches, send_result_nudge_for_match,
+                  club_of=lambda m: m.get("club_id"), deadline=deadline)
+    sent_count = sum(run.values())
     return {
         "matches_checked": len(matches),
         "nudges_sent": sent_count
@@ -139,6 +139,7 @@ CREATE TABLE IF NOT EXISTS match_invites (
   responded_at TIMESTAMP WITH TIME ZONE,
   expires_at TIMESTAMP WITH TIME ZONE,
   refilled_at TIMESTAMP WITH TIME ZONE,
+  send_after TIMESTAMP WITH TIME ZONE, -- quiet-hours release time for 'pending_sms' invites
   
   -- ML tracking fields
   invite_score INTEGER CHECK (invite_score BETWEEN 0 AND 100),
@@ -1,8 +1,9 @@
 
 import os
 import sys
+import json
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-from collections import defaultdict
 
 # Only add path if running as main script, not when imported
 if __name__ == "__main__":
@@ -10,99 +11,182 @@ if __name__ == "__main__":
 
 from database import supabase
 from scoring_engine import calculate_responsiveness_score, calculate_reputation_score
+from logic_utils import keyset_pages
 
-def recalculate_player_scores(player_id=None):
+# A page's ids go in the query string of its invite / participation reads
+# (player_id=in.(...), ~37 bytes per uuid): 100 keeps it near 4 KB
+PLAYER_PAGE_SIZE = 100
+ROW_PAGE_SIZE = 1000
+UPDATE_BATCH_SIZE = 500
+PLAYED_MATCH_STATUSES = ("confirmed", "completed")
+PLAYER_COLUMNS = "player_id, total_no_shows, total_matches_played, total_invites_received, "\
+    "total_invites_responded, total_invites_accepted, responsiveness_score, reputation_score"
+
+# Cursor of a full recompute that spans several cron runs
+RECOMPUTE_STATE_KEY = "score_recompute"
+RECOMPUTE_STATE_TTL_SECONDS = 7 * 24 * 3600
+
+def reconcile_player_scores():
+    """
+    Nightly reconciliation. Counters and scores are kept current by DB triggers on
+    invite status changes and played matches (migration 050); this recomputes them
+    set-based in one RPC, which only writes the players that drifted.
+    Returns the number of corrected players.
+    """
+    if not supabase:
+        raise Exception("Supabase client not initialized. Check environment variables.")
+
+    res = supabase.rpc("reconcile_player_counters", {}).execute()
+    corrected = res.data or []
+
+    if corrected:
+        print(f"Reconciled scores: {len(corrected)} players had drifted and were corrected.")
+    else:
+        print("Reconciled scores: no drift.")
+    return len(corrected)
+
+def _aggregate_player_page(player_ids):
+    """Counters (same definitions as the migration 050 triggers) for one page of players."""
+    stats = {pid: {"received": 0, "responded": 0, "accepted": 0, "played": 0} for pid in player_ids}
+
+    invites = lambda: supabase.table("match_invites").select("invite_id, player_id, status").in_("player_id", player_ids)
+    for rows in keyset_pages(invites, ["invite_id"], ROW_PAGE_SIZE):
+        for inv in rows:
+            status = inv.get("status")
+            counters = stats[inv["player_id"]]
+            # Invites still held for quiet hours have not been received yet
+            if status != "pending_sms":
+                counters["received"] += 1
+            if status in ["accepted", "declined"]:
+                counters["responded"] += 1
+            if status == "accepted":
+                counters["accepted"] += 1
+
+    participations = lambda: supabase.table("match_participations")\
+        .select("player_id, match_id, matches(status)").in_("player_id", player_ids)
+    for rows in keyset_pages(participations, ["player_id", "match_id"], ROW_PAGE_SIZE):
+        for row in rows:
+            if (row.get("matches") or {}).get("status") in PLAYED_MATCH_STATUSES:
+                stats[row["player_id"]]["played"] += 1
+
+    return stats
+
+def _recompute_player_page(players):
+    """
+    Recompute one page of players and write the rows that changed with the
+    update-only update_player_scores RPC (a player deleted meanwhile stays
+    deleted). Returns the number of players updated.
+    """
+    stats = _aggregate_player_page([p["player_id"] for p in players])
+
+    rows = []
+    for player in players:
+        counters = stats[player["player_id"]]
+        # Enrich player dict for scoring engine
+        scored = {**player, "total_invites_received": counters["received"], "responded_count": counters["responded"],
+                  "total_matches_played": counters["played"]}
+        row = {
+            "responsiveness_score": calculate_responsiveness_score(scored),
+            "reputation_score": calculate_reputation_score(scored),
+            "total_invites_received": counters["received"],
+            "total_invites_responded": counters["responded"],
+            "total_invites_accepted": counters["accepted"],
+            "total_matches_played": counters["played"]
+        }
+        if any(player.get(column) != value for column, value in row.items()):
+            rows.append({"player_id": player["player_id"], **row})
+
+    updated = set()
+    for start in range(0, len(rows), UPDATE_BATCH_SIZE):
+        res = supabase.rpc("update_player_scores", {"p_rows": rows[start:start + UPDATE_BATCH_SIZE]}).execute()
+        updated.update(r["player_id"] for r in (res.data or []))
+    return len(updated)
+
+def _load_recompute_state():
+    from redis_client import get_state_store
+    raw = get_state_store().get(RECOMPUTE_STATE_KEY)
+    return json.loads(raw) if raw else None
+
+def _save_recompute_state(state):
+    from redis_client import get_state_store
+    get_state_store().set(RECOMPUTE_STATE_KEY, json.dumps(state).encode(), RECOMPUTE_STATE_TTL_SECONDS)
+
+def get_score_recompute_progress():
+    """Progress of the full recompute in progress, or None when there is none."""
+    return _load_recompute_state()
+
+def score_recompute_is_resumable() -> bool:
     """
-    Recalculate scores for a single player or all players using Supabase client.
-    Updates 'responsiveness_score' and 'reputation_score' in the players table.
+    Whether another process (the /cron/recompute-scores run) can continue a
+    recompute started here: the cursor lives in the state store, which is
+    per process unless it is Redis.
+    """
+    from redis_client import get_state_store
+    return get_state_store().is_shared
+
+def start_score_recompute():
+    """Start a full recompute from the first player (restarts one in progress)."""
+    if not supabase:
+        raise Exception("Supabase client not initialized. Check environment variables.")
+
+    res = supabase.table("players").select("player_id", count="exact").limit(1).execute()
+    state = {
+        "cursor": None,
+        "processed": 0,
+        "updated": 0,
+        "total": getattr(res, "count", None),
+        "started_at": datetime.now(timezone.utc).isoformat()
+    }
+    _save_recompute_state(state)
+    return state
+
+def recalculate_player_scores(player_id=None, deadline=None):
+    """
+    Full recompute (backfill); the nightly job uses reconcile_player_scores.
+    Updates the counters and 'responsiveness_score' / 'reputation_score' of a
+    single player, or continues the full run started by start_score_recompute
+    (starting one if none is in progress).
+
+    Players are processed in keyset pages of PLAYER_PAGE_SIZE; each page streams
+    its invites and participations, then writes its changed rows in bulk. The
+    cursor is saved after every page, so when `deadline` (a CronDeadline) expires
+    the run stops and the next call resumes after the last finished page.
+    Returns the progress: {cursor, processed, updated, total, started_at, done}.
     """
     if not supabase:
         raise Exception("Supabase client not initialized. Check environment variables.")
 
     try:
-        # 1. Fetch Players
-        query = supabase.table("players").select("player_id, name, total_no_shows, total_matches_played")
-        if player_id:
-            query = query.eq("player_id", player_id)
-        
-        # Paginate if needed, but for now assuming < 1000 players fit in one response (default limit is usually 1000)
-        players_res = query.execute()
-        players = players_res.data or []
-        
-        # 2. Fetch Invites (All or filtered)
-        # To avoid N+1, if processing all players, fetch ALL invites.
-        inv_query = supabase.table("match_invites").select("player_id, status")
         if player_id:
-            inv_query = inv_query.eq("player_id", player_id)
-            
-        # Supabase default limit is 1000. Use range only if needed.
-        # For safety let's fetch a large chunk or handle pagination if expecting > 1000 invites.
-        # But 'select' usually returns 1000.
-        # Let's try fetching up to 500 invites (reduced to avoid Vercel timeout).
-        inv_res = inv_query.limit(500).execute()
-        invites = inv_res.data or []
-        
-        # 2b. Fetch Matches to calculate total_matches_played
-        # Phase 4: Use match_participations
-        # First get relevant match IDs (confirmed/completed)
-        match_query = supabase.table("matches").select("match_id").in_("status", ["confirmed", "completed"])
-        match_res = match_query.limit(500).execute()
-        match_ids = [m["match_id"] for m in (match_res.data or [])]
-        
-        # 3. Aggregate Stats
-        # Structure: player_id -> {'total': 0, 'responded': 0, 'accepted': 0}
-        stats_map = defaultdict(lambda: {'total': 0, 'responded': 0, 'accepted': 0})
-        
-        for inv in invites:
-            pid = inv['player_id']
-            status = inv.get('status')
-            
-            stats_map[pid]['total'] += 1
-            if status in ['accepted', 'declined']:
-                stats_map[pid]['responded'] += 1
-            if status == 'accepted':
-                stats_map[pid]['accepted'] += 1
-                
-        # 3b. Aggregate Match Counts via match_participations
-        match_counts = defaultdict(int)
-        if match_ids:
-            # Fetch participations for these matches
-            # Can limit if needed, but for 500 matches * 4 players = 2000 rows, should be fine
-            parts_res = supabase.table("match_participations").select("player_id").in_("match_id", match_ids).execute()
-            for row in (parts_res.data or []):
-                match_counts[row["player_id"]] += 1
-                
-        # 4. Calculate and Update
-        updated_count = 0
-        
-        for player in players:
-            p_id = player['player_id']
-            stats = stats_map[p_id]
-            
-            # Enrich player dict for scoring engine
-            player['total_invites_received'] = stats['total']
-            player['responded_count'] = stats['responded']
-            # player['total_no_shows'] is already there
-            
-            # Calculate Scors
-            resp_score = calculate_responsiveness_score(player)
-            rep_score = calculate_reputation_score(player)
-            
-            # Update DB
-            update_data = {
-                "responsiveness_score": resp_score,
-                "reputation_score": rep_score,
-                "total_invites_received": stats['total'],
-                "total_invites_accepted": stats['accepted'],
-                "total_matches_played": match_counts[p_id]
-            }
-            
-            supabase.table("players").update(update_data).eq("player_id", p_id).execute()
-            updated_count += 1
-            
-        print(f"Successfully updated scores for {updated_count} players.")
-        return updated_count
-        
+            res = supabase.table("players").select(PLAYER_COLUMNS).eq("player_id", player_id).execute()
+            players = res.data or []
+            updated = _recompute_player_page(players) if players else 0
+            return {"cursor": player_id, "processed": len(players), "updated": updated, "done": True}
+
+        state = _load_recompute_state() or start_score_recompute()
+        while True:
+            query = supabase.table("players").select(PLAYER_COLUMNS).order("player_id")
+            if state["cursor"]:
+                query = query.gt("player_id", state["cursor"])
+            players = query.limit(PLAYER_PAGE_SIZE).execute().data or []
+
+            if players:
+                state["updated"] += _recompute_player_page(players)
+                state["processed"] += len(players)
+                state["cursor"] = players[-1]["player_id"]
+            total = f"/{state['total']}" if state.get("total") else ""
+            print(f"[SCORES] Recomputed {state['processed']}{total} players ({state['updated']} updated)")
+
+            if len(players) < PLAYER_PAGE_SIZE:
+                from redis_client import get_state_store
+                get_state_store().delete(RECOMPUTE_STATE_KEY)
+                print(f"Successfully recomputed scores for {state['processed']} players ({state['updated']} updated).")
+                return {**state, "done": True}
+            _save_recompute_state(state)
+            if deadline is not None and deadline.expired():
+                print(f"[SCORES] Time budget used; resuming after player {state['cursor']} on the next run")
+                return {**state, "done": False}
+
     except Exception as e:
         print(f"Error updating scores: {e}")
         # Re-raise so API knows it failed
@@ -111,5 +195,6 @@ def recalculate_player_scores(player_id=None):
 if __name__ == "__main__":
     load_dotenv()
     print("Starting score recalculation...")
+    start_score_recompute()
     recalculate_player_scores()
     print("Done.")
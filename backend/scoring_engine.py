@@ -2,6 +2,19 @@ from datetime import datetime
 from typing import Dict, List, Optional
 import math
 
+try:
+    import numpy as np
+except ImportError:  # Batched scoring falls back to the scalar path
+    np = None
+
+# Invite score weights (shared by the scalar and batched scorers)
+W_COMP = 0.40
+W_RESP = 0.35
+W_REP = 0.25
+
+# Skill compatibility: (max level difference, score), checked in order; beyond the last -> 0
+SKILL_SCORE_STEPS = [(0.1, 100), (0.25, 90), (0.5, 60), (0.75, 30)]
+
 def calculate_responsiveness_score(player: Dict) -> int:
     """
     Calculate responsiveness score (0-100) based on invite history.
@@ -23,7 +36,7 @@ def calculate_responsiveness_score(player: Dict) -> int:
     # Let's assume 'player' dict has: 
     # total_invites, responded_count (accepted+declined), avg_response_time
     
-    responded = player.get('responded_count', 0)
+    responded = player.get('responded_count', player.get('total_invites_responded', 0)) or 0
     
     if total == 0:
         return 50 # Neutral start
@@ -58,15 +71,8 @@ def calculate_reputation_score(player: Dict) -> int:
     score = base_score - penalty + bonus
     return max(0, min(100, int(score)))
 
-def calculate_compatibility_score(player: Dict, match_details: Dict) -> int:
-    """
-    Calculate compatibility (0-100) between a player and a match.
-    
-    Factors:
-    - Skill Level (Most important): Gaussian decay from target level.
-    - Gender preference: Binary match/mismatch (or partial penalty).
-    """
-    player_level = float(player.get('adjusted_skill_level') or player.get('declared_skill_level') or 3.0)
+def _get_target_level(match_details: Dict) -> float:
+    """Midpoint of the match's level range (level_min alone, or 3.0, when the range is incomplete)."""
     # Ensure float conversion for target_level as well
     try:
         target_level = float(match_details.get('level_min') or 3.0) 
@@ -76,35 +82,45 @@ def calculate_compatibility_score(player: Dict, match_details: Dict) -> int:
              target_level = (float(match_details['level_min']) + float(match_details['level_max'])) / 2
     except (ValueError, TypeError):
         target_level = 3.0
+    return target_level
+
+def _get_required_gender(match_details: Dict) -> Optional[str]:
+    """'male'/'female' when the match preference ('M'/'F') restricts gender, else None."""
+    req_gender = match_details.get('gender_preference')
+    if req_gender and req_gender.lower() not in ['any', 'mixed', 'everyone']:
+        return {'m': 'male', 'f': 'female'}.get(req_gender.lower())
+    return None
+
+def calculate_compatibility_score(player: Dict, match_details: Dict) -> int:
+    """
+    Calculate compatibility (0-100) between a player and a match.
+    
+    Factors:
+    - Skill Level (Most important): Gaussian decay from target level.
+    - Gender preference: Binary match/mismatch (or partial penalty).
+    """
+    player_level = float(player.get('adjusted_skill_level') or player.get('declared_skill_level') or 3.0)
+    target_level = _get_target_level(match_details)
 
     # 1. Skill Compatibility (Gaussian-ish)
     # Difference of 0.5 should be ~50% score?
     # Difference of 0.25 should be ~80% score?
     diff = abs(player_level - target_level)
     
-    if diff <= 0.1:
-        skill_score = 100
-    elif diff <= 0.25:
-        skill_score = 90
-    elif diff <= 0.5:
-        skill_score = 60
-    elif diff <= 0.75:
-        skill_score = 30
-    else:
-        skill_score = 0
+    skill_score = 0
+    for max_diff, step_score in SKILL_SCORE_STEPS:
+        if diff <= max_diff:
+            skill_score = step_score
+            break
         
     # 2. Gender Compatibility
     # match_details might have 'gender_preference' ('M', 'F', 'mixed', 'any')
     gender_score = 100
-    req_gender = match_details.get('gender_preference')
+    required_gender = _get_required_gender(match_details)
     player_gender = (player.get('gender') or 'unknown').lower()
     
-    if req_gender and req_gender.lower() not in ['any', 'mixed', 'everyone']:
-        req = req_gender.lower()
-        if req == 'm' and player_gender != 'male':
-            gender_score = 0
-        elif req == 'f' and player_gender != 'female':
-            gender_score = 0
+    if required_gender and player_gender != required_gender:
+        gender_score = 0
             
     # Composite
     # If gender doesn't match, score is usually 0 (hard filter), 
@@ -128,11 +144,6 @@ def calculate_invite_score(player: Dict, match_details: Dict) -> int:
     resp = player.get('responsiveness_score', 50)
     rep = player.get('reputation_score', 50)
     
-    # Weights
-    W_COMP = 0.40
-    W_RESP = 0.35
-    W_REP  = 0.25
-    
     score = (comp * W_COMP) + (resp * W_RESP) + (rep * W_REP)
     
     return int(score)
@@ -159,3 +170,66 @@ def rank_candidates(candidates: List[Dict], match_details: Dict) -> List[Dict]:
     # Sort descending
     ranked.sort(key=lambda x: x['_invite_score'], reverse=True)
     return ranked
+
+def rank_candidates_batch(candidates: List[Dict], match_details: Dict, top_k: Optional[int] = None) -> List[Dict]:
+    """
+    Vectorized rank_candidates: same scores, breakdowns and order (ties keep input order).
+    Candidates are converted once into arrays; the top_k best are picked with
+    argpartition before sorting. Only the returned candidates get '_invite_score'
+    and '_score_breakdown'. Falls back to the scalar path when NumPy is unavailable.
+    """
+    if top_k is not None and top_k <= 0:
+        return []
+    if np is None or not candidates:
+        ranked = rank_candidates(candidates, match_details)
+        return ranked if top_k is None else ranked[:top_k]
+
+    n = len(candidates)
+    levels = np.fromiter(
+        (float(p.get('adjusted_skill_level') or p.get('declared_skill_level') or 3.0) for p in candidates),
+        dtype=np.float64, count=n
+    )
+    resp_raw = [p.get('responsiveness_score', 50) for p in candidates]
+    rep_raw = [p.get('reputation_score', 50) for p in candidates]
+    # A NULL score column (never recalculated) counts as the neutral 50
+    resp = np.array([50 if v is None else v for v in resp_raw], dtype=np.float64)
+    rep = np.array([50 if v is None else v for v in rep_raw], dtype=np.float64)
+
+    # Skill buckets: first step whose max difference covers the gap
+    diff = np.abs(levels - _get_target_level(match_details))
+    comp = np.select(
+        [diff <= max_diff for max_diff, _ in SKILL_SCORE_STEPS],
+        [step_score for _, step_score in SKILL_SCORE_STEPS],
+        default=0
+    ).astype(np.int64)
+
+    required_gender = _get_required_gender(match_details)
+    if required_gender:
+        gender_ok = np.fromiter(
+            ((p.get('gender') or 'unknown').lower() == required_gender for p in candidates),
+            dtype=bool, count=n
+        )
+        comp = np.where(gender_ok, comp, 0)
+
+    # Same operation order as calculate_invite_score, truncated like int()
+    scores = np.trunc((comp * W_COMP) + (resp * W_RESP) + (rep * W_REP)).astype(np.int64)
+
+    # Unique sort key: score first, then earlier input position (stable, like list.sort)
+    keys = scores * n + (n - 1 - np.arange(n, dtype=np.int64))
+    if top_k is not None and top_k < n:
+        top = np.argpartition(-keys, top_k - 1)[:top_k]
+        order = top[np.argsort(-keys[top])]
+    else:
+        order = np.argsort(-keys)
+
+    ranked = []
+    for i in order.tolist():
+        p = candidates[i]
+        p['_invite_score'] = int(scores[i])
+        p['_score_breakdown'] = {
+            "compatibility": int(comp[i]),
+            "responsiveness": resp_raw[i],
+            "reputation": rep_raw[i]
+        }
+        ranked.append(p)
+    return ranked
@@ -0,0 +1,174 @@
+"""
+Simulation: independent ranking vs the invite allocator for overlapping matches.
+
+Seeds a synthetic club (see benchmark_matchmaking.py) with several pending
+matches on the same evening, then plays invite rounds through the real cron
+code against the offline fake datastore:
+  process_pending_matches -> players respond -> invites expire -> process_batch_refills -> ...
+
+Player behaviour is deterministic per (seed, player): a player is free that
+evening with a probability that grows with their responsiveness score. A free
+player accepts the first invite they answer; everyone else ignores their
+invites, which then expire. Nobody joins two of the (overlapping) matches. Both
+modes see the same players and the same draws, and the cron fan-out runs one
+match at a time, so a seed always gives the same result.
+
+Reports per mode: matches filled, mean fill time, SMS sent and SMS per
+confirmed match.
+
+Usage: python scripts/benchmark_invite_allocation.py [--players 200] [--matches 6] [--rounds 8] [--seed 1] [--json]
+"""
+import sys
+import os
+import io
+import json
+import random
+import argparse
+import contextlib
+from datetime import datetime, timedelta, timezone
+
+# Add parent directory to path to allow imports
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_datastore import FakeSupabase
+from benchmark_matchmaking import seed_club, _install
+
+ROUND_MINUTES = 16  # Invite timeout (15) plus the cron tick that notices it
+MATCH_SPACING_MINUTES = 30
+
+
+def _free_probability(player: dict) -> float:
+    return 0.1 + 0.5 * (player.get("responsiveness_score") or 0) / 100
+
+
+def _create_evening_matches(store, seeded, n_matches: int, start: datetime, rng: random.Random) -> list:
+    """Pending matches at overlapping times around one level (all compete for the same players)."""
+    match_ids = []
+    center = 3.5
+    for i in range(n_matches):
+        organizer = rng.choice(seeded["players"])
+        match = store.add("matches", {
+            "club_id": seeded["club_id"], "status": "pending", "originator_id": organizer["player_id"],
+            "scheduled_time": (start + timedelta(minutes=MATCH_SPACING_MINUTES * i)).isoformat(),
+            "level_range_min": center - 1.0, "level_range_max": center + 1.0, "gender_preference": "mixed",
+            "created_at": start.isoformat(), "last_call_sent": False, "bridge_offer_sent": False,
+        })
+        store.add("match_participations", {"match_id": match["match_id"], "player_id": organizer["player_id"],
+                                           "team_index": 1, "created_at": start.isoformat()})
+        match_ids.append(match["match_id"])
+    return match_ids
+
+
+def _play_responses(store, match_ids: list, answered: set, round_index: int, seed: int, filled_at: dict):
+    """Every unanswered sent invite gets its (deterministic) response."""
+    index_of = {match_id: i for i, match_id in enumerate(match_ids)}
+    committed = {p["player_id"] for p in store.rows("match_participations") if p["match_id"] in index_of}
+    invites = [i for i in store.rows("match_invites")
+               if i["match_id"] in index_of and i["status"] == "sent" and i["invite_id"] not in answered]
+    # Draws are keyed by player name (ids are random uuids); responses arrive in an
+    # order that does not depend on the mode
+    def _name(invite):
+        return store.get("players", invite["player_id"])["name"]
+
+    invites.sort(key=lambda i: random.Random(f"{seed}|order|{_name(i)}|{index_of[i['match_id']]}").random())
+
+    for invite in invites:
+        answered.add(invite["invite_id"])
+        player = store.get("players", invite["player_id"])
+        match = store.get("matches", invite["match_id"])
+        free = random.Random(f"{seed}|{_name(invite)}").random() < _free_probability(player)
+        if not free or invite["player_id"] in committed or match["status"] != "pending":
+            continue
+        invite["status"] = "accepted"
+        committed.add(invite["player_id"])
+        store.add("match_participations", {"match_id": match["match_id"], "player_id": invite["player_id"],
+                                           "team_index": 2, "created_at": invite["sent_at"]})
+        count = sum(1 for p in store.rows("match_participations") if p["match_id"] == match["match_id"])
+        if count >= 4:
+            match["status"] = "confirmed"
+            filled_at[match["match_id"]] = (round_index + 1) * ROUND_MINUTES
+
+
+def run_simulation(use_allocator: bool, n_players: int = 200, n_matches: int = 6, max_rounds: int = 8, seed: int = 1) -> dict:
+    """Play invite rounds for one mode and return its metrics."""
+    import matchmaker
+    import invite_allocator
+    import cron_executor
+
+    rng = random.Random(seed)
+    random.seed(seed)
+    store = FakeSupabase()
+    seeded = seed_club(store, n_players, rng)
+    start = datetime(2025, 6, 4, 22, 0, tzinfo=timezone.utc)  # Wed 6pm New York
+    match_ids = _create_evening_matches(store, seeded, n_matches, start, rng)
+
+    clock = [start - timedelta(days=1)]
+    restore = _install(store)
+    original_now, original_enabled = matchmaker.get_now_utc, invite_allocator.ALLOCATOR_ENABLED
+    original_concurrency = cron_executor.get_job_concurrency
+    matchmaker.get_now_utc = lambda: clock[0]
+    invite_allocator.ALLOCATOR_ENABLED = use_allocator
+    # One worker per fan-out: with a thread pool, the order in which matches claim
+    # players from the shared datastore (and so the results) varies between runs
+    cron_executor.get_job_concurrency = lambda job_name: 1
+
+    answered, filled_at = set(), {}
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            matchmaker.process_pending_matches()
+            for round_index in range(max_rounds):
+                _play_responses(store, match_ids, answered, round_index, seed, filled_at)
+                if len(filled_at) == len(match_ids):
+                    break
+                clock[0] += timedelta(minutes=ROUND_MINUTES)
+                matchmaker.process_batch_refills(now=clock[0])
+    finally:
+        matchmaker.get_now_utc, invite_allocator.ALLOCATOR_ENABLED = original_now, original_enabled
+        cron_executor.get_job_concurrency = original_concurrency
+        restore()
+
+    sms = store.stats.snapshot()["sms"]
+    filled = len(filled_at)
+    return {
+        "matches": len(match_ids),
+        "filled": filled,
+        "mean_fill_minutes": sum(filled_at.values()) / filled if filled else None,
+        "sms": sms,
+        "sms_per_confirmed_match": sms / filled if filled else None,
+    }
+
+
+def compare(n_players: int = 200, n_matches: int = 6, max_rounds: int = 8, seed: int = 1) -> dict:
+    return {
+        "independent": run_simulation(False, n_players, n_matches, max_rounds, seed),
+        "allocator": run_simulation(True, n_players, n_matches, max_rounds, seed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--matches", type=int, default=6)
+    parser.add_argument("--rounds", type=int, default=8)
+    parser.add_argument("--seed", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = {seed: compare(args.players, args.matches, args.rounds, seed) for seed in args.seed}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.players} players, {args.matches} overlapping matches, up to {args.rounds} rounds of {ROUND_MINUTES} min")
+    print(f"{'seed':>4} {'mode':<12} {'filled':>7} {'fill min':>9} {'sms':>5} {'sms/match':>10}")
+    for seed, modes in results.items():
+        for mode, r in modes.items():
+            fill = f"{r['mean_fill_minutes']:.1f}" if r["mean_fill_minutes"] is not None else "-"
+            per = f"{r['sms_per_confirmed_match']:.1f}" if r["sms_per_confirmed_match"] is not None else "-"
+            print(f"{seed:>4} {mode:<12} {r['filled']:>4}/{r['matches']:<2} {fill:>9} {r['sms']:>5} {per:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Benchmark: matchmaking hot paths against a synthetic club (no database needed).
+
+Seeds an offline fake datastore (fake_datastore.FakeSupabase) with a club of
+N players, groups, mutes and past matches with invites, then runs match
+lifecycles through the real code:
+  find_and_invite_players -> declines -> invite_replacement_player
+  -> cron refills (expiry queue, then full scan) -> pending-match catch-up
+
+Reports per operation: Supabase round trips, bytes transferred, wall time and
+SMS sent.
+
+Usage: python scripts/benchmark_matchmaking.py [--players 100 1000 10000] [--matches 20] [--json]
+"""
+import sys
+import os
+import io
+import json
+import time
+import random
+import argparse
+import contextlib
+from collections import defaultdict
+from datetime import timedelta
+
+# Add parent directory to path to allow imports
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+import database
+from fake_datastore import FakeSupabase
+from logic_utils import get_now_utc
+
+LEVELS = [2.0 + 0.25 * i for i in range(15)]  # 2.0 .. 5.5
+
+
+def seed_club(store: FakeSupabase, n_players: int, rng: random.Random) -> dict:
+    """Club with members, groups, mutes and past matches with invites."""
+    now = get_now_utc()
+    club = store.add("clubs", {
+        "name": "Bench Padel Club", "timezone": "America/New_York", "phone_number": "+15550000000",
+        "settings": {"quiet_hours_start": 0, "quiet_hours_end": 0, "initial_batch_size": 6},
+    })
+    club_id = club["club_id"]
+
+    players = []
+    for i in range(n_players):
+        player = store.add("players", {
+            "name": f"Player {i}", "phone_number": f"+1555{i:07d}",
+            "gender": rng.choice(["male", "female"]),
+            "declared_skill_level": rng.choice(LEVELS),
+            "adjusted_skill_level": rng.choice([None, round(rng.uniform(2.0, 5.5), 2)]),
+            "active_status": rng.random() < 0.95,
+            "muted_until": (now + timedelta(days=3)).isoformat() if rng.random() < 0.05 else None,
+            "responsiveness_score": rng.randint(0, 100), "reputation_score": rng.randint(0, 100),
+            "availability_mask": rng.choice([0, 0b000111, 0b111000, 0b100100, 0b111111, rng.randint(1, 63)]),
+        })
+        players.append(player)
+        store.add("club_members", {"club_id": club_id, "player_id": player["player_id"]})
+
+    groups = []
+    for g in range(max(1, n_players // 50)):
+        group = store.add("player_groups", {"club_id": club_id, "name": f"Group {g}"})
+        members = rng.sample(players, min(len(players), rng.randint(20, 40)))
+        for p in members:
+            store.add("group_memberships", {"group_id": group["group_id"], "player_id": p["player_id"]})
+        groups.append((group, members))
+
+    # Past matches with participations and answered invites
+    for _ in range(max(1, n_players // 20)):
+        four = rng.sample(players, 4)
+        past = store.add("matches", {
+            "club_id": club_id, "status": "completed", "originator_id": four[0]["player_id"],
+            "scheduled_time": (now - timedelta(days=rng.randint(1, 60))).isoformat(),
+        })
+        for idx, p in enumerate(four):
+            store.add("match_participations", {"match_id": past["match_id"], "player_id": p["player_id"],
+                                               "team_index": 1 if idx < 2 else 2})
+        for p in rng.sample(players, 6):
+            store.add("match_invites", {"match_id": past["match_id"], "player_id": p["player_id"],
+                                        "status": rng.choice(["accepted", "declined", "expired"]),
+                                        "batch_number": 1, "sent_at": past["scheduled_time"]})
+
+    return {"club_id": club_id, "players": players, "groups": groups}
+
+
+def _create_match(store, seeded, rng) -> str:
+    now = get_now_utc()
+    if rng.random() < 0.25:
+        group, members = rng.choice(seeded["groups"])
+        organizer, group_id = rng.choice(members), group["group_id"]
+    else:
+        organizer, group_id = rng.choice(seeded["players"]), None
+    level = organizer.get("adjusted_skill_level") or organizer["declared_skill_level"]
+    match = store.add("matches", {
+        "club_id": seeded["club_id"], "status": "pending", "originator_id": organizer["player_id"],
+        "scheduled_time": (now + timedelta(days=2)).isoformat(), "target_group_id": group_id,
+        "level_range_min": level - 0.5, "level_range_max": level + 0.5, "gender_preference": "mixed",
+        "created_at": now.isoformat(), "last_call_sent": False, "bridge_offer_sent": False,
+    })
+    store.add("match_participations", {"match_id": match["match_id"], "player_id": organizer["player_id"],
+                                       "team_index": 1, "created_at": now.isoformat()})
+    return match["match_id"]
+
+
+def _install(store: FakeSupabase):
+    """
+    Point every loaded backend module at the fake store and count SMS instead of sending.
+    Returns a function that restores the previous modules state.
+    """
+    import matchmaker
+    import deferred_sms_scheduler
+    import logic_utils
+    import redis_client
+    import cron_lease
+    import invite_expiry_queue
+    from state_store import InMemoryStateStore
+
+    patches = []
+
+    def patch(module, name, value):
+        patches.append((module, name, getattr(module, name)))
+        setattr(module, name, value)
+
+    original = database.supabase
+    targets = {matchmaker, deferred_sms_scheduler, logic_utils, database}
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if isinstance(path, str) and path.startswith(BACKEND_DIR) and getattr(module, "supabase", store) is original:
+            targets.add(module)
+    for module in targets:
+        patch(module, "supabase", store)
+
+    def fake_send_sms(to_number, body, reply_from=None, club_id=None):
+        store.stats.record_sms()
+        return True
+
+    def fake_send_sms_bulk(to_numbers, body, club_id, reply_from=None):
+        store.stats.record_sms(len(to_numbers))
+        return {n: True for n in to_numbers}
+
+    patch(matchmaker, "send_sms", fake_send_sms)
+    patch(matchmaker, "send_sms_bulk", fake_send_sms_bulk)
+    patch(deferred_sms_scheduler, "send_sms", fake_send_sms)
+    state_store = InMemoryStateStore()
+    leases = cron_lease.InMemoryLeaseBackend()
+    expiry_queue = invite_expiry_queue.InMemoryExpiryQueue()
+    patch(redis_client, "get_state_store", lambda: state_store)
+    patch(cron_lease, "get_lease_backend", lambda: leases)
+    patch(invite_expiry_queue, "get_expiry_queue", lambda: expiry_queue)
+
+    def restore():
+        for module, name, value in reversed(patches):
+            setattr(module, name, value)
+
+    return restore
+
+
+def run_benchmark(n_players: int, n_matches: int = 20, seed: int = 1) -> dict:
+    """Run the lifecycles and return {operation: {runs, calls, bytes, ms, sms}} (per-run averages, total SMS)."""
+    rng = random.Random(seed)
+    random.seed(seed)
+    store = FakeSupabase()
+    seeded = seed_club(store, n_players, rng)
+    restore = _install(store)
+    try:
+        samples = _run_lifecycles(store, seeded, n_matches, rng)
+    finally:
+        restore()
+
+    report = {}
+    for name, runs in samples.items():
+        report[name] = {
+            "runs": len(runs),
+            "calls": sum(r["calls"] for r in runs) / len(runs),
+            "bytes": sum(r["bytes"] for r in runs) / len(runs),
+            "ms": sum(r["ms"] for r in runs) / len(runs),
+            "sms": sum(r["sms"] for r in runs),
+        }
+    return report
+
+
+def _run_lifecycles(store: FakeSupabase, seeded: dict, n_matches: int, rng: random.Random) -> dict:
+    import matchmaker
+    from invite_expiry_queue import process_due_invite_expiries
+
+    samples = defaultdict(list)
+
+    def measure(name, fn):
+        before = store.stats.snapshot()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = fn()
+        elapsed = time.perf_counter() - start
+        after = store.stats.snapshot()
+        samples[name].append({
+            "calls": after["calls"] - before["calls"],
+            "bytes": after["bytes"] - before["bytes"],
+            "sms": after["sms"] - before["sms"],
+            "ms": elapsed * 1000,
+        })
+        return result
+
+    for _ in range(n_matches):
+        match_id = _create_match(store, seeded, rng)
+        measure("find_and_invite_players", lambda: matchmaker.find_and_invite_players(match_id))
+
+        # Two invitees decline
+        sent = [i for i in store.rows("match_invites") if i["match_id"] == match_id and i["status"] == "sent"]
+        for inv in sent[:2]:
+            inv["status"] = "declined"
+        measure("invite_replacement_player", lambda: matchmaker.invite_replacement_player(match_id, count=2))
+
+    # Every open invite times out
+    later = get_now_utc() + timedelta(hours=1)
+    measure("cron refills (expiry queue)", lambda: process_due_invite_expiries(now=later))
+    later = later + timedelta(hours=1)
+    measure("cron refills (full scan)", lambda: matchmaker.process_batch_refills(now=later))
+    measure("process_pending_matches", matchmaker.process_pending_matches)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--matches", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = {n: run_benchmark(n, args.matches, args.seed) for n in args.players}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for n, report in results.items():
+        print(f"\n=== {n} players, {args.matches} matches ===")
+        print(f"{'operation':<30} {'runs':>5} {'calls/run':>10} {'KB/run':>9} {'ms/run':>9} {'sms':>6}")
+        for name, r in report.items():
+            print(f"{name:<30} {r['runs']:>5} {r['calls']:>10.1f} {r['bytes'] / 1024:>9.1f} {r['ms']:>9.2f} {r['sms']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: scalar rank_candidates vs vectorized rank_candidates_batch.
+
+Usage: python scripts/benchmark_scoring.py [--top-k 6] [--repeat 5]
+Runs on synthetic candidates (no database needed) and checks the top_k match.
+"""
+import sys
+import os
+import time
+import copy
+import random
+import argparse
+
+# Add parent directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring_engine import rank_candidates, rank_candidates_batch
+
+
+def make_candidates(n, seed=0):
+    rng = random.Random(seed)
+    return [{
+        "player_id": f"p{i}",
+        "name": f"Player {i}",
+        "gender": rng.choice(["male", "female"]),
+        "declared_skill_level": round(rng.uniform(2.0, 5.5) * 4) / 4,
+        "adjusted_skill_level": rng.choice([None, round(rng.uniform(2.0, 5.5), 2)]),
+        "responsiveness_score": rng.randint(0, 100),
+        "reputation_score": rng.randint(0, 100),
+    } for i in range(n)]
+
+
+def best_time(fn, candidates, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        data = copy.deepcopy(candidates)
+        start = time.perf_counter()
+        result = fn(data)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    match = {"level_min": 3.0, "level_max": 4.0, "gender_preference": "mixed"}
+    print(f"{'candidates':>10} {'scalar ms':>10} {'batch ms':>10} {'speedup':>8}")
+    for n in (100, 1000, 10000):
+        candidates = make_candidates(n)
+        t_scalar, scalar = best_time(lambda c: rank_candidates(c, match)[:args.top_k], candidates, args.repeat)
+        t_batch, batch = best_time(lambda c: rank_candidates_batch(c, match, top_k=args.top_k), candidates, args.repeat)
+        same = [p["player_id"] for p in scalar] == [p["player_id"] for p in batch]
+        print(f"{n:>10} {t_scalar * 1000:>10.2f} {t_batch * 1000:>10.2f} {t_scalar / t_batch:>7.1f}x"
+              + ("" if same else "  MISMATCH"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Replay every scored pairing to re-rate all players (see logic/elo_replay.py).
+
+Dry run by default: prints the players whose rating would change. --apply
+writes the ratings and regenerates the match_result history.
+--synthetic N replays N generated matches against the offline fake datastore
+instead (nothing touches the database). Its load time measures the fake's
+table scans; the replay time is the engine's.
+
+Usage: python scripts/replay_elo.py [--apply] [--top 20] [--synthetic 20000] [--players 2000] [--json]
+"""
+import sys
+import os
+import json
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+# Add parent directory to path to allow imports
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from dotenv import load_dotenv
+
+SKILL_LEVELS = [2.5, 2.75, 3.0, 3.25, 3.5, 3.75, 4.0, 4.25, 4.5, 4.75, 5.0]
+
+
+def seed_results(store, n_matches: int, n_players: int, seed: int = 1) -> None:
+    """Completed matches between random players: half scored by sets (some with a partner swap), half by winner_team."""
+    rng = random.Random(seed)
+    players = [store.add("players", {
+        "name": f"Player {i}", "phone_number": f"+1555{i:07d}", "declared_skill_level": rng.choice(SKILL_LEVELS),
+        "elo_rating": 1500, "elo_confidence": 0, "adjusted_skill_level": None,
+    })["player_id"] for i in range(n_players)]
+
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(n_matches):
+        four = rng.sample(players, 4)
+        match = store.add("matches", {
+            "status": "completed", "scheduled_time": (start + timedelta(minutes=37 * i)).isoformat(),
+            "winner_team": rng.choice([1, 2]),
+        })
+        if i % 2:
+            for index, pid in enumerate(four):
+                store.add("match_participations", {"match_id": match["match_id"], "player_id": pid,
+                                                   "team_index": 1 if index < 2 else 2})
+            continue
+        pairings = [four] if i % 4 else [four, [four[0], four[2], four[1], four[3]]]
+        set_number = 0
+        for team in pairings:
+            for _ in range(2):
+                set_number += 1
+                store.add("match_sets", {
+                    "match_id": match["match_id"], "set_number": set_number,
+                    "team_1_player_1": team[0], "team_1_player_2": team[1],
+                    "team_2_player_1": team[2], "team_2_player_2": team[3],
+                    "score": "6-4", "winner_team": rng.choice([1, 2]),
+                })
+
+
+def run(apply: bool, synthetic: int = 0, n_players: int = 2000) -> dict:
+    from logic import elo_replay
+
+    if not synthetic:
+        return elo_replay.replay_elo(dry_run=not apply)
+
+    from fake_datastore import FakeSupabase
+    store = FakeSupabase()
+    seed_results(store, synthetic, n_players)
+    with patch.object(elo_replay, "supabase", store), patch.object(elo_replay, "club_leaderboard"):
+        return elo_replay.replay_elo(dry_run=not apply)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apply", action="store_true", help="Write ratings and history (default: dry run)")
+    parser.add_argument("--top", type=int, default=20, help="Changes to print")
+    parser.add_argument("--synthetic", type=int, default=0, help="Replay N generated matches offline")
+    parser.add_argument("--players", type=int, default=2000, help="Players in the synthetic club")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    load_dotenv()
+    report = run(args.apply, args.synthetic, args.players)
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+        return
+
+    print(f"{report['pairings']} pairings in {report['matches']} matches, {report['skipped_pairings']} skipped")
+    print(f"Load {report['load_seconds']}s, replay {report['replay_seconds']}s, total {report['total_seconds']}s")
+    print(f"{report['changed']}/{report['players']} players {'updated' if not report['dry_run'] else 'would change'}")
+    for c in report["changes"][:args.top]:
+        print(f"  {c['name'] or c['player_id']:<24} {c['old_elo']} -> {c['new_elo']} "
+              f"(sync {c['old_sync']} -> {c['new_sync']}, {c['new_confidence']} matches)")
+
+
+if __name__ == "__main__":
+    main()
@@ -76,6 +76,28 @@ MSG_INVITE_RESCHEDULED = (
     "Reply YES to re-confirm your spot, NO to decline."
 )
 
+MSG_INVITE = (
+    "🎾 {club_name}: {organizer_name}{skill_str} wants to play "
+    "{time}.\n"
+    "Reply YES to join, NO to decline, or MUTE to pause invites today."
+)
+MSG_INVITE_VOTING = (
+    "🎾 {club_name}: {organizer_name} wants to play on {day}.\n"
+    "Options:\n{options}"
+    "Reply with letter(s) (e.g. 'A' or 'AB') to vote."
+)
+MSG_MATCH_CONFIRMED_DETAILS = (
+    "🎾 {club_name}: MATCH CONFIRMED!\n\n"
+    "📅 {time}\n\n"
+    "👥 Players:\n{players}\n\n"
+    "{role_text}"
+)
+MSG_CONFIRMED_ROLE_ORGANIZER = (
+    "As the organizer, please book the court here: {booking_url}\n\n"
+    "Alternatively, call {club_name} at {club_phone} to book directly."
+)
+MSG_CONFIRMED_ROLE_PLAYER = "See you on the court! 🏸"
+
 MSG_DECLINE = "No problem! We'll ask you next time."
 MSG_MAYBE = "Got it, we'll keep you updated as this match comes together and follow up with you if we still need players."
 
@@ -0,0 +1,250 @@
+"""
+SMS Segments - Encoding, segment counting and per-template statistics for outbound SMS.
+
+A single non-GSM-7 character (e.g. the 🎾 emoji) switches the whole message to
+UCS-2, which drops the segment size from 160 to 70 characters. Twilio bills and
+throttles per segment, so this module:
+1. Computes the encoding and segment count of any rendered message
+2. Produces a GSM-7-safe variant (used when a club enables `sms_gsm7_only`)
+3. Attributes each sent message to its sms_constants template and aggregates segment stats
+4. Compiles every template with sample values into a static cost report
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from string import Formatter
+import sms_constants as msg
+
+# GSM 03.38 basic character set and the extension table (extension chars cost 2 septets)
+GSM7_BASIC_CHARS = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENDED_CHARS = set("^{}\\[~]|€\f")
+
+GSM7_SINGLE_SEGMENT = 160
+GSM7_MULTI_SEGMENT = 153
+UCS2_SINGLE_SEGMENT = 70
+UCS2_MULTI_SEGMENT = 67
+
+# Approximate Twilio US outbound price per segment, for the cost report
+SMS_SEGMENT_COST_USD = 0.0083
+
+# Common non-GSM characters in our templates and their GSM-7 replacements.
+# Anything not listed (emoji, symbols) is dropped.
+GSM7_REPLACEMENTS = {
+    "‘": "'", "’": "'", "“": '"', "”": '"',
+    "–": "-", "—": "-", "…": "...", "•": "-",
+    "±": "+/-", " ": " ", "→": "->",
+}
+
+ENCODING_GSM7 = "GSM-7"
+ENCODING_UCS2 = "UCS-2"
+
+UNCLASSIFIED_TEMPLATE = "UNCLASSIFIED"
+
+
+def is_gsm7(text: str) -> bool:
+    """Check if every character of the text can be sent with GSM-7 encoding."""
+    return all(c in GSM7_BASIC_CHARS or c in GSM7_EXTENDED_CHARS for c in text)
+
+
+def get_sms_encoding(text: str) -> str:
+    """Return the encoding a carrier will use for this message."""
+    return ENCODING_GSM7 if is_gsm7(text) else ENCODING_UCS2
+
+
+def count_sms_segments(text: str) -> tuple[str, int]:
+    """
+    Return (encoding, segment_count) for a message body.
+    GSM-7 extension characters count as two septets; UCS-2 counts UTF-16 code units,
+    so emoji outside the BMP take two.
+    """
+    if not text:
+        return ENCODING_GSM7, 0
+
+    if is_gsm7(text):
+        length = sum(2 if c in GSM7_EXTENDED_CHARS else 1 for c in text)
+        single, multi, encoding = GSM7_SINGLE_SEGMENT, GSM7_MULTI_SEGMENT, ENCODING_GSM7
+    else:
+        length = len(text.encode("utf-16-le")) // 2
+        single, multi, encoding = UCS2_SINGLE_SEGMENT, UCS2_MULTI_SEGMENT, ENCODING_UCS2
+
+    if length <= single:
+        return encoding, 1
+    return encoding, math.ceil(length / multi)
+
+
+def to_gsm7(text: str) -> str:
+    """
+    Produce a GSM-7-safe variant of a message.
+    Smart punctuation is replaced, accents are stripped where the base letter is
+    GSM-7, and emoji are dropped together with the space that followed them.
+    """
+    if not text or is_gsm7(text):
+        return text
+
+    out = []
+    skip_space = False
+    for c in text:
+        if c in GSM7_BASIC_CHARS or c in GSM7_EXTENDED_CHARS:
+            if skip_space and c == " ":
+                skip_space = False
+                continue
+            skip_space = False
+            out.append(c)
+            continue
+
+        if c in GSM7_REPLACEMENTS:
+            out.append(GSM7_REPLACEMENTS[c])
+            skip_space = False
+            continue
+
+        base = "".join(b for b in unicodedata.normalize("NFKD", c) if not unicodedata.combining(b))
+        if base and is_gsm7(base):
+            out.append(base)
+            skip_space = False
+            continue
+
+        # Dropped symbol: also drop the separator space after it if it led the line/word
+        skip_space = not out or out[-1] in (" ", "\n")
+
+    return "".join(out).strip()
+
+
+@lru_cache(maxsize=1)
+def _compiled_templates() -> list:
+    """Compile every MSG_* template in sms_constants into a matcher, most specific first."""
+    compiled = []
+    for name in dir(msg):
+        value = getattr(msg, name)
+        if not name.startswith("MSG_") or not isinstance(value, str):
+            continue
+        pattern = ""
+        literal_len = 0
+        for literal, field, _, _ in Formatter().parse(value):
+            pattern += re.escape(literal)
+            literal_len += len(literal)
+            if field is not None:
+                pattern += "(.*?)"
+        compiled.append((literal_len, name, re.compile(pattern, re.DOTALL)))
+    compiled.sort(key=lambda t: t[0], reverse=True)
+    return [(name, regex) for _, name, regex in compiled]
+
+
+def classify_template(body: str) -> str:
+    """Return the name of the sms_constants template a rendered body came from."""
+    for name, regex in _compiled_templates():
+        if regex.fullmatch(body):
+            return name
+    return UNCLASSIFIED_TEMPLATE
+
+
+class SegmentStats:
+    """Thread-safe per-template counters of messages, characters and segments sent."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, template: str, body: str):
+        encoding, segments = count_sms_segments(body)
+        with self._lock:
+            entry = self._stats.setdefault(template, {
+                "messages": 0, "segments": 0, "chars": 0, "ucs2_messages": 0
+            })
+            entry["messages"] += 1
+            entry["segments"] += segments
+            entry["chars"] += len(body)
+            if encoding == ENCODING_UCS2:
+                entry["ucs2_messages"] += 1
+
+    def report(self) -> list:
+        """Per-template totals sorted by segment volume, with estimated cost."""
+        with self._lock:
+            items = [(name, dict(entry)) for name, entry in self._stats.items()]
+
+        rows = []
+        for name, entry in items:
+            rows.append({
+                "template": name,
+                "messages": entry["messages"],
+                "segments": entry["segments"],
+                "avg_segments": round(entry["segments"] / entry["messages"], 2),
+                "ucs2_pct": round(100 * entry["ucs2_messages"] / entry["messages"], 1),
+                "est_cost_usd": round(entry["segments"] * SMS_SEGMENT_COST_USD, 4)
+            })
+        rows.sort(key=lambda r: r["segments"], reverse=True)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+segment_stats = SegmentStats()
+
+
+def record_outbound_sms(body: str, original_body: str = None):
+    """Attribute an outbound message to its template and record its segment usage."""
+    segment_stats.record(classify_template(original_body or body), body)
+
+
+# Representative values used to compile templates for the static report
+SAMPLE_TEMPLATE_VALUES = {
+    "club_name": "Palm Beach Padel Club",
+    "name": "Alexandra Johnson",
+    "organizer_name": "Alexandra Johnson",
+    "time": "Fri, Dec 26th @ 6:30pm",
+    "old_time": "Fri, Dec 26th @ 6:30pm",
+    "new_time": "Fri, Dec 26th @ 7:30pm",
+    "match_time": "Fri, Dec 26th @ 6:30pm",
+    "group_name": "Thursday Night Crew",
+    "player1_name": "Alexandra Johnson",
+    "player2_name": "Michael Rodriguez",
+    "player3_name": "Sarah Williams",
+}
+DEFAULT_SAMPLE_VALUE = "xxxxxxxxxx"
+
+
+class _SampleValues(dict):
+    def __missing__(self, key):
+        return DEFAULT_SAMPLE_VALUE
+
+
+def build_template_report(sample_values: dict = None) -> list:
+    """
+    Render every sms_constants template with sample values and report its encoding
+    and segment count, both as written and as its GSM-7-safe variant.
+    """
+    values = _SampleValues(SAMPLE_TEMPLATE_VALUES)
+    if sample_values:
+        values.update(sample_values)
+
+    rows = []
+    for name in sorted(n for n in dir(msg) if n.startswith("MSG_")):
+        template = getattr(msg, name)
+        if not isinstance(template, str):
+            continue
+        try:
+            rendered = template.format_map(values)
+        except (ValueError, IndexError) as e:
+            print(f"[SMS SEGMENTS] Could not render {name}: {e}")
+            continue
+
+        encoding, segments = count_sms_segments(rendered)
+        gsm_variant = to_gsm7(rendered)
+        _, gsm_segments = count_sms_segments(gsm_variant)
+        rows.append({
+            "template": name,
+            "encoding": encoding,
+            "chars": len(rendered),
+            "segments": segments,
+            "gsm7_segments": gsm_segments,
+            "segments_saved": segments - gsm_segments
+        })
+    rows.sort(key=lambda r: (r["segments_saved"], r["segments"]), reverse=True)
+    return rows
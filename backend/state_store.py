@@ -0,0 +1,136 @@
+"""
+State Store - Backends for per-user conversation state.
+
+redis_client.get_user_state / set_user_state / clear_user_state read and write
+through a StateStore. Two implementations:
+- RedisStateStore: production backend (one binary string per user: GET / SET EX)
+- InMemoryStateStore: process-local, thread-safe, TTL-honouring and LRU-bounded;
+  used for local runs without REDIS_URL, tests and offline benchmarks
+
+Stores hold opaque bytes; encoding and the state schema live in conversation_state.
+
+SharedBackend is the process-wide, created-on-first-use holder for this and the
+other Redis-or-memory backends (cron leases, invite expiry queue, leaderboards);
+which one it builds is decided by redis_client.get_shared_redis_client.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+class StateStore(ABC):
+    """Interface: a keyed binary value with a per-key expiry."""
+
+    # True when every process sees the same values
+    is_shared = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the value for a key (None if missing or expired)."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: int):
+        """Replace the value for a key and reset its expiry to `ttl` seconds."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove a key (no-op if missing)."""
+
+
+class RedisStateStore(StateStore):
+    """
+    Redis string per key: one GET per read, one SET with EX per write.
+    The client must not decode responses (values are binary).
+    """
+
+    is_shared = True
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int):
+        self.client.set(key, value, ex=ttl)
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+
+class InMemoryStateStore(StateStore):
+    """
+    Process-local store with Redis-like semantics.
+    Expired keys are dropped lazily on access; once `max_keys` is reached the
+    least recently used key is evicted.
+    """
+
+    def __init__(self, max_keys: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int):
+        with self._lock:
+            self._data[key] = (self._clock() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class SharedBackend:
+    """
+    A process-wide backend created on first use: `redis_backend(client)` when
+    state lives in Redis, otherwise `memory_backend()`.
+    """
+
+    def __init__(self, description: str, redis_backend: Callable, memory_backend: Callable, binary: bool = False):
+        self.description = description
+        self._redis_backend = redis_backend
+        self._memory_backend = memory_backend
+        self._binary = binary
+        self._backend = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._backend is not None:
+            return self._backend
+        with self._lock:
+            if self._backend is None:
+                from redis_client import get_shared_redis_client
+                client = get_shared_redis_client(binary=self._binary)
+                if client:
+                    self._backend = self._redis_backend(client)
+                else:
+                    print(f"Warning: Using in-memory {self.description} (not shared across processes)")
+                    self._backend = self._memory_backend()
+        return self._backend
+
+    def set(self, backend):
+        """Replace the backend (tests, offline benchmarks); None builds it again on next use."""
+        with self._lock:
+            self._backend = backend
@@ -0,0 +1,19 @@
+import importlib
+import sys
+from types import ModuleType
+
+import pytest
+
+
+@pytest.fixture
+def real_module(monkeypatch):
+    """
+    Import the real module even when another test file left a mock for it in
+    sys.modules at import time; the mock is put back after the test.
+    """
+    def load(name):
+        if not isinstance(sys.modules.get(name), ModuleType):
+            monkeypatch.delitem(sys.modules, name, raising=False)
+            importlib.import_module(name)
+        return sys.modules[name]
+    return load
@@ -0,0 +1,88 @@
+"""
+Tests for the 6-bit availability mask: packing the avail_* booleans, mapping a
+match's local start time to its bucket bit, and find_and_invite_players only
+falling back to players outside their availability once the others are used up.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import matchmaker
+from logic_utils import availability_mask, availability_bucket_bit, is_available_for
+
+NY = "America/New_York"
+
+
+def test_mask_packs_columns_in_letter_order():
+    assert availability_mask({}) == 0
+    assert availability_mask({"avail_weekday_morning": True}) == 0b000001
+    assert availability_mask({"avail_weekday_evening": True, "avail_weekend_morning": True}) == 0b001100
+    assert availability_mask({"avail_weekend_evening": True, "avail_weekday_afternoon": False}) == 0b100000
+
+
+def test_bucket_bit_uses_club_local_time():
+    # Wed 2025-06-04 13:00 UTC = 9am New York -> weekday morning
+    assert availability_bucket_bit("2025-06-04T13:00:00+00:00", NY) == 0b000001
+    # Wed 22:30 UTC = 6:30pm New York -> weekday evening
+    assert availability_bucket_bit("2025-06-04T22:30:00Z", NY) == 0b000100
+    # Sat 2025-06-07 17:00 UTC = 1pm -> weekend afternoon
+    assert availability_bucket_bit("2025-06-07T17:00:00Z", NY) == 0b010000
+    # Sat 02:00 UTC = Fri 10pm New York -> outside every bucket
+    assert availability_bucket_bit("2025-06-07T02:00:00Z", NY) == 0
+    assert availability_bucket_bit(None, NY) == 0
+
+    assert is_available_for(0b000101, 0b000100)
+    assert not is_available_for(0b000101, 0b000010)
+    assert is_available_for(0, 0b000010)   # nothing set: no preference
+    assert is_available_for(0b000001, 0)   # time outside the buckets
+
+
+def _candidate(pid, mask, responsiveness):
+    return {"player_id": pid, "name": pid, "phone_number": f"+1555{pid}", "gender": "male",
+            "declared_skill_level": 3.5, "adjusted_skill_level": None,
+            "responsiveness_score": responsiveness, "reputation_score": 50, "availability_mask": mask}
+
+
+def _invited(candidates, batch_size):
+    context = {
+        # Wed 9am New York: weekday morning (bit 1)
+        "match": {"match_id": "m1", "club_id": "c1", "status": "pending", "scheduled_time": "2025-06-04T13:00:00Z",
+                  "level_range_min": 3.0, "level_range_max": 4.0, "gender_preference": "mixed"},
+        "requester": {"player_id": "r1", "name": "Req", "declared_skill_level": 3.5},
+        "club": {"name": "Test Club", "settings": {"initial_batch_size": batch_size}, "timezone": NY},
+        "group_found": True,
+        "candidates": candidates,
+    }
+    inserted = []
+
+    def rpc(name, params):
+        result = MagicMock()
+        if name == "get_match_invite_context":
+            result.execute.return_value.data = context
+        else:
+            inserted.extend(params["p_player_ids"])
+            result.execute.return_value.data = [{"player_id": pid, "status": "SUCCESS"} for pid in params["p_player_ids"]]
+        return result
+
+    mock = MagicMock()
+    mock.rpc.side_effect = rpc
+    with patch.object(matchmaker, "supabase", mock), \
+         patch.object(matchmaker, "send_sms"), \
+         patch.object(matchmaker, "clear_user_state"), \
+         patch.object(matchmaker, "availability_bucket_bit", availability_bucket_bit), \
+         patch.object(matchmaker, "is_available_for", is_available_for), \
+         patch.object(matchmaker, "get_quiet_hours_release", return_value=None), \
+         patch.object(matchmaker, "_build_invite_sms", return_value="invite"):
+        matchmaker.find_and_invite_players("m1", notify_deadpool=False)
+    return inserted
+
+
+def test_players_outside_availability_only_fill_the_remainder():
+    candidates = [
+        _candidate("evenings", 0b000100, 95),   # best score, but never plays weekday mornings
+        _candidate("mornings", 0b000001, 40),
+        _candidate("unset", 0, 30),
+        _candidate("weekends", 0b111000, 90),
+    ]
+    assert _invited(candidates, batch_size=2) == ["mornings", "unset"]
+    # Batch larger than the available pool: the rest are filled by score
+    assert _invited(candidates, batch_size=3) == ["mornings", "unset", "evenings"]
@@ -0,0 +1,167 @@
+"""
+Tests that process_batch_refills reads every stale invite with one
+get_stale_invite_refills call, checks quiet hours once per club and claims a
+match's invites only when it refills that match.
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+import matchmaker
+from cron_executor import CronDeadline
+from fake_datastore import FakeSupabase
+
+QUIET = {"quiet": False}
+ALWAYS_QUIET = {"quiet": True}
+
+
+def _fake_release(settings, timezone_str):
+    return "08:00" if settings.get("quiet") else None
+
+
+def _row(match_id, invite_ids, status="pending", club_id="c1", settings=None, max_batch=1):
+    return {"match_id": match_id, "match_status": status, "club_id": club_id,
+            "club_settings": settings if settings is not None else QUIET,
+            "club_timezone": "America/New_York", "invite_ids": invite_ids, "max_batch_number": max_batch}
+
+
+def _mock_supabase(rows, claimed=None):
+    mock = MagicMock()
+    mock.rpc.return_value.execute.return_value.data = rows
+    if claimed is None:
+        claimed = [i for row in rows for i in row["invite_ids"]]
+
+    def claim(column, invite_ids):
+        query = MagicMock()
+        query.is_.return_value.execute.return_value.data = [{"invite_id": i} for i in invite_ids if i in claimed]
+        return query
+
+    mock.table.return_value.update.return_value.in_.side_effect = claim
+    return mock
+
+
+def test_refills_each_pending_match_once():
+    rows = [
+        _row("m1", ["i1", "i2"], max_batch=2),
+        _row("m2", ["i3"], status="confirmed"),
+        _row("m3", ["i4"], club_id="c2", settings=ALWAYS_QUIET),
+        _row("m4", ["i5"], club_id="c2", settings=ALWAYS_QUIET),
+    ]
+    mock = _mock_supabase(rows)
+    with patch.object(matchmaker, "supabase", mock), \
+         patch.object(matchmaker, "find_and_invite_players", return_value=2) as invite, \
+         patch.object(matchmaker, "check_match_deadpool") as deadpool, \
+         patch.object(matchmaker, "get_quiet_hours_release", side_effect=_fake_release) as quiet:
+        total = matchmaker.process_batch_refills()
+
+    assert total == 2
+    mock.rpc.assert_called_once()
+    assert mock.rpc.call_args[0][0] == "get_stale_invite_refills"
+    # One quiet-hours evaluation per club, no per-invite queries
+    assert quiet.call_count == 2
+    # Quiet club skipped; non-pending match claimed up front but not refilled
+    claims = [c[0][1] for c in mock.table.return_value.update.return_value.in_.call_args_list]
+    assert claims == [["i3"], ["i1", "i2"]]
+    invite.assert_called_once_with("m1", batch_number=3, max_invites=2, context=None)
+    deadpool.assert_not_called()
+
+
+def test_only_claimed_invites_count():
+    mock = _mock_supabase([_row("m1", ["i1", "i2"])], claimed=["i2"])
+    with patch.object(matchmaker, "supabase", mock), \
+         patch.object(matchmaker, "get_quiet_hours_release", return_value=None), \
+         patch.object(matchmaker, "find_and_invite_players", return_value=0) as invite, \
+         patch.object(matchmaker, "check_match_deadpool") as deadpool:
+        matchmaker.process_batch_refills()
+
+    invite.assert_called_once_with("m1", batch_number=2, max_invites=1, context=None)
+    deadpool.assert_called_once_with("m1")
+
+
+def test_nothing_claimed_by_overlapping_run():
+    mock = _mock_supabase([_row("m1", ["i1"])], claimed=[])
+    with patch.object(matchmaker, "supabase", mock), \
+         patch.object(matchmaker, "get_quiet_hours_release", return_value=None), \
+         patch.object(matchmaker, "find_and_invite_players") as invite:
+        assert matchmaker.process_batch_refills() == 0
+    invite.assert_not_called()
+
+
+NOW = datetime(2025, 6, 3, 18, 0, tzinfo=timezone.utc)
+
+
+def _seed_stale(store, n_matches):
+    for i in range(n_matches):
+        store.add("matches", {"match_id": f"m{i}", "status": "pending", "club_id": "c1"})
+        store.add("match_invites", {"invite_id": f"i{i}", "match_id": f"m{i}", "status": "sent", "batch_number": 1,
+                                    "expires_at": (NOW - timedelta(minutes=1)).isoformat(), "refilled_at": None})
+
+
+def _unclaimed(store):
+    return sorted(i["match_id"] for i in store.rows("match_invites") if i["refilled_at"] is None)
+
+
+def test_matches_not_reached_before_deadline_stay_unclaimed():
+    store = FakeSupabase()
+    _seed_stale(store, 3)
+    clock = [0.0]
+    deadline = CronDeadline(10, clock=lambda: clock[0])
+
+    def invite(match_id, **kwargs):
+        clock[0] += 11  # the first refill uses up the whole budget
+        return 1
+
+    with patch.object(matchmaker, "supabase", store), \
+         patch.object(matchmaker, "get_quiet_hours_release", return_value=None), \
+         patch.object(matchmaker, "find_and_invite_players", side_effect=invite) as invited, \
+         patch.dict("os.environ", {"CRON_CONCURRENCY_BATCH_REFILLS": "1"}):
+        sent, unfinished = matchmaker.refill_stale_matches(deadline=deadline, now=NOW)
+
+        assert (sent, unfinished) == (1, ["m1", "m2"])
+        assert _unclaimed(store) == ["m1", "m2"]
+
+        # The next run still finds and refills them
+        assert matchmaker.process_batch_refills(now=NOW) == 2
+
+    assert invited.call_count == 3
+    assert _unclaimed(store) == []
+
+
+def test_failed_refill_releases_its_claim():
+    store = FakeSupabase()
+    _seed_stale(store, 2)
+
+    def invite(match_id, **kwargs):
+        if match_id == "m0":
+            raise RuntimeError("twilio down")
+        return 1
+
+    with patch.object(matchmaker, "supabase", store), \
+         patch.object(matchmaker, "get_quiet_hours_release", return_value=None), \
+         patch.object(matchmaker, "find_and_invite_players", side_effect=invite):
+        assert matchmaker.refill_stale_matches(now=NOW) == (1, ["m0"])
+
+    assert _unclaimed(store) == ["m0"]
+
+
+def test_refill_failing_after_its_batch_was_inserted_keeps_its_claim():
+    store = FakeSupabase()
+    _seed_stale(store, 2)
+
+    def invite(match_id, batch_number, **kwargs):
+        # Inserted (and texted), then a later step such as the deadpool check fails
+        store.add("match_invites", {"invite_id": f"{match_id}-b{batch_number}", "match_id": match_id,
+                                    "status": "sent", "batch_number": batch_number, "refilled_at": None,
+                                    "expires_at": (NOW + timedelta(minutes=15)).isoformat()})
+        if match_id == "m0":
+            raise RuntimeError("deadpool check failed")
+        return 1
+
+    with patch.object(matchmaker, "supabase", store), \
+         patch.object(matchmaker, "get_quiet_hours_release", return_value=None), \
+         patch.object(matchmaker, "find_and_invite_players", side_effect=invite) as invited:
+        assert matchmaker.refill_stale_matches(now=NOW) == (1, ["m0"])
+        # Nothing left to refill: the next run does not invite for m0 again
+        assert matchmaker.process_batch_refills(now=NOW) == 0
+
+    assert invited.call_count == 2
+    assert store.get("match_invites", "i0")["refilled_at"] is not None
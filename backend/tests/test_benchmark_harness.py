@@ -0,0 +1,47 @@
+"""
+Smoke test for the offline matchmaking benchmark: the fake datastore runs the
+real hot paths end to end, and the round-trip budget of each operation holds.
+"""
+
+import importlib.util
+import os
+import sys
+from types import ModuleType
+from unittest.mock import patch
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(BACKEND_DIR, "scripts", "benchmark_matchmaking.py")
+
+
+def _run_with_real_modules(**kwargs):
+    # Other test modules replace backend modules with mocks; run on fresh real imports
+    with patch.dict(sys.modules):
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, "__file__", None)
+            if not isinstance(module, ModuleType) or (isinstance(path, str) and path.startswith(BACKEND_DIR)):
+                del sys.modules[name]
+        spec = importlib.util.spec_from_file_location("benchmark_matchmaking", SCRIPT)
+        benchmark = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(benchmark)
+        import matchmaker
+        original_supabase = matchmaker.supabase
+        report = benchmark.run_benchmark(**kwargs)
+        restored = matchmaker.supabase is original_supabase
+    return report, restored
+
+
+def test_small_club_lifecycle_report_and_budgets():
+    report, restored = _run_with_real_modules(n_players=80, n_matches=4, seed=3)
+
+    assert set(report) == {
+        "find_and_invite_players", "invite_replacement_player", "cron refills (expiry queue)",
+        "cron refills (full scan)", "process_pending_matches",
+    }
+    assert report["find_and_invite_players"]["runs"] == 4
+    assert report["find_and_invite_players"]["sms"] > 0
+    assert all(r["bytes"] > 0 for r in report.values())
+    # Round-trip budgets (regressions in the hot paths show up here)
+    assert report["find_and_invite_players"]["calls"] <= 4
+    assert report["invite_replacement_player"]["calls"] <= 6
+    # Module state is restored afterwards
+    assert restored
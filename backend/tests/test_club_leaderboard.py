@@ -0,0 +1,155 @@
+"""
+Tests for the club leaderboard: ranks, pages and incremental updates on the
+in-memory board, the Redis page assembly, the rankings endpoint logic only
+reading Supabase to build a shared board (and on every read of a process-local
+one), and dashboard writes reaching the boards through on_player_changed.
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import club_leaderboard
+from club_leaderboard import InMemoryLeaderboard, RedisLeaderboard
+from fake_datastore import FakeSupabase
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _player(pid, elo, active=True):
+    return {"player_id": pid, "name": pid.upper(), "elo_rating": elo, "elo_confidence": 3,
+            "adjusted_skill_level": 3.5, "gender": "male", "active_status": active}
+
+
+def test_ranks_pages_and_incremental_updates():
+    board = InMemoryLeaderboard()
+    board.build("c1", [_player("a", 1900), _player("b", 2100), _player("c", 1900), _player("d", 1700)])
+
+    # Highest first; equal ratings by player id descending (ZREVRANGE order)
+    assert [(p["rank"], p["player_id"]) for p in board.page("c1")] == [(1, "b"), (2, "c"), (3, "a"), (4, "d")]
+    assert [p["player_id"] for p in board.page("c1", offset=1, limit=2)] == ["c", "a"]
+    assert board.page("c1", offset=4, limit=2) == []
+    assert (board.rank("c1", "a"), board.rank("c1", "x"), board.size("c1")) == (3, None, 4)
+
+    board.update_players([{**_player("d", 2200), "name": "Dee"}])
+    assert board.page("c1", limit=1)[0] == {**club_leaderboard._entry(_player("d", 2200)), "name": "Dee", "rank": 1}
+    board.add_member("c1", _player("e", 2000))
+    board.remove_member("c1", "b")
+    assert [p["player_id"] for p in board.page("c1")] == ["d", "e", "c", "a"]
+    assert board.clubs_of(["e", "b"]) == {"c1"}
+    # Boards not built are not touched
+    board.add_member("c2", _player("e", 2000))
+    board.update_players([_player("zz", 1500)])
+    assert (board.size("c2"), board.clubs_of(["zz"])) == (0, set())
+
+
+def test_boards_expire_for_rebuild():
+    clock = FakeClock()
+    board = InMemoryLeaderboard(rebuild_seconds=60, clock=clock)
+    board.build("c1", [_player("a", 1900)])
+    assert board.is_built("c1")
+    clock.now += 61
+    assert not board.is_built("c1")
+    board.build("c1", [_player("a", 1900)])
+    board.invalidate()
+    assert not board.is_built("c1")
+
+
+def test_redis_page_joins_scores_with_player_entries():
+    client = MagicMock()
+    client.zrevrange.return_value = [("b", 2100.0), ("a", 1900.0)]
+    client.mget.return_value = [json.dumps({"player_id": "b", "name": "B"}), None]
+    board = RedisLeaderboard(client)
+
+    assert board.page("c1", offset=10, limit=2) == [
+        {"player_id": "b", "name": "B", "elo_rating": 2100, "rank": 11},
+        {"player_id": "a", "elo_rating": 1900, "rank": 12},
+    ]
+    client.zrevrange.assert_called_once_with("leaderboard:c1", 10, 11, withscores=True)
+    client.zrevrank.return_value = 0
+    assert board.rank("c1", "b") == 1
+
+
+class SharedLeaderboard(InMemoryLeaderboard):
+    """Stands in for the Redis board, which every process sees."""
+
+    is_shared = True
+
+
+def _club_store(*players, club_id="c1"):
+    store = FakeSupabase()
+    for p in players:
+        store.add("players", p)
+        store.add("club_members", {"club_id": club_id, "player_id": p["player_id"]})
+    return store
+
+
+def test_rankings_read_supabase_only_to_build():
+    store = _club_store(_player("a", 1900), _player("b", 2100), _player("c", 2500, active=False))
+
+    with patch.object(club_leaderboard, "supabase", store), \
+         patch.object(club_leaderboard, "get_leaderboard", return_value=SharedLeaderboard()):
+        result = club_leaderboard.get_club_rankings("c1", player_id="a")
+        assert [p["player_id"] for p in result["rankings"]] == ["b", "a"]  # inactive c left out
+        assert (result["total"], result["player_rank"]) == (2, 2)
+        built_calls = store.stats.snapshot()["calls"]
+
+        club_leaderboard.get_club_rankings("c1", offset=1, limit=1)
+        assert store.stats.snapshot()["calls"] == built_calls
+
+        # An Elo write refreshes the rated players (one query)
+        store.get("players", "a")["elo_rating"] = 2200
+        club_leaderboard.on_ratings_changed(["a", "d"])
+        assert club_leaderboard.get_club_rankings("c1", player_id="a")["player_rank"] == 1
+        assert store.stats.snapshot()["calls"] == built_calls + 1
+
+        # Players on no board cost nothing
+        club_leaderboard.on_ratings_changed(["d"])
+        assert store.stats.snapshot()["calls"] == built_calls + 1
+
+
+def test_process_local_board_is_rebuilt_on_every_read():
+    store = _club_store(_player("a", 1900), _player("b", 2100))
+
+    with patch.object(club_leaderboard, "supabase", store), \
+         patch.object(club_leaderboard, "get_leaderboard", return_value=InMemoryLeaderboard()):
+        assert club_leaderboard.get_club_rankings("c1", player_id="a")["player_rank"] == 2
+        # Written by another process (or the dashboard), no hook fired here
+        store.get("players", "a")["elo_rating"] = 2200
+        assert club_leaderboard.get_club_rankings("c1", player_id="a")["player_rank"] == 1
+
+
+def test_player_changes_from_the_dashboard_reach_the_boards():
+    store = _club_store(_player("a", 1900), _player("b", 2100), _player("c", 1700))
+    store.add("club_members", {"club_id": "c2", "player_id": "a"})
+
+    with patch.object(club_leaderboard, "supabase", store), \
+         patch.object(club_leaderboard, "get_leaderboard", return_value=SharedLeaderboard()):
+        club_leaderboard.get_club_rankings("c1")
+        club_leaderboard.get_club_rankings("c2")
+
+        # Verified at a new rating: moved on both boards
+        store.get("players", "c")["elo_rating"] = 2300
+        club_leaderboard.on_player_changed("c")
+        assert club_leaderboard.get_club_rankings("c1", player_id="c")["player_rank"] == 1
+
+        # Deactivated: off every board
+        store.get("players", "b")["active_status"] = False
+        club_leaderboard.on_player_changed("b")
+        assert [p["player_id"] for p in club_leaderboard.get_club_rankings("c1")["rankings"]] == ["c", "a"]
+
+        # Removed from c1 only: still ranked in c2
+        store.table("club_members").delete().eq("club_id", "c1").eq("player_id", "a").execute()
+        club_leaderboard.on_player_changed("a")
+        assert club_leaderboard.get_club_rankings("c1")["total"] == 1
+        assert club_leaderboard.get_club_rankings("c2", player_id="a")["player_rank"] == 1
+
+        # Added to c2 from the dashboard
+        store.add("club_members", {"club_id": "c2", "player_id": "c"})
+        club_leaderboard.on_player_changed("c")
+        assert [p["player_id"] for p in club_leaderboard.get_club_rankings("c2")["rankings"]] == ["c", "a"]
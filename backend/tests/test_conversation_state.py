@@ -0,0 +1,49 @@
+"""
+Tests for the typed, versioned conversation state encoding.
+"""
+
+import msgpack
+import pytest
+from conversation_state import (
+    encode_state, decode_state, StateSchemaError, STATE_FIELDS, STATE_SCHEMA_VERSION
+)
+
+
+def test_round_trip_keeps_types():
+    data = {
+        "club_id": "c1",
+        "level": 3.5,
+        "level_min": None,
+        "players_to_rate": ["a", "b", "c"],
+        "group_options": {"2": {"group_id": "g1", "group_name": "Crew"}},
+    }
+    assert decode_state(encode_state("WAITING_FEEDBACK", data)) == {"state": "WAITING_FEEDBACK", **data}
+
+
+def test_values_are_coerced_to_declared_type():
+    state = decode_state(encode_state("WAITING_GENDER", {"level": "4.0", "member_group_ids": ("g1",)}))
+    assert state["level"] == 4.0
+    assert state["member_group_ids"] == ["g1"]
+
+
+def test_wrong_type_is_rejected():
+    with pytest.raises(StateSchemaError):
+        encode_state("X", {"players_to_rate": "a,b,c"})
+
+
+def test_fields_are_packed_by_id():
+    blob = encode_state("X", {"match_id": "m1"})
+    version, fields = msgpack.unpackb(blob, strict_map_key=False)
+    assert version == STATE_SCHEMA_VERSION
+    assert fields == {STATE_FIELDS["state"][0]: "X", STATE_FIELDS["match_id"][0]: "m1"}
+
+
+def test_field_ids_are_unique():
+    ids = [field_id for field_id, _ in STATE_FIELDS.values()]
+    assert len(ids) == len(set(ids))
+
+
+def test_other_versions_and_garbage_decode_to_empty():
+    assert decode_state(None) == {}
+    assert decode_state(b"{\"state\": \"X\"}") == {}
+    assert decode_state(msgpack.packb([STATE_SCHEMA_VERSION + 1, {0: "X"}])) == {}
@@ -0,0 +1,68 @@
+"""
+Tests for the shared cron fan-out: input-order results, bounded concurrency,
+per-club fairness and the run deadline.
+"""
+
+import threading
+import time
+from cron_executor import CronDeadline, fan_out
+
+
+class _Tracker:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.active_by_club = {}
+        self.peak_by_club = {}
+        self.started = []
+
+    def __call__(self, item):
+        club, value = item
+        with self.lock:
+            self.started.append(item)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.active_by_club[club] = self.active_by_club.get(club, 0) + 1
+            self.peak_by_club[club] = max(self.peak_by_club.get(club, 0), self.active_by_club[club])
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+            self.active_by_club[club] -= 1
+        if value < 0:
+            raise ValueError("bad item")
+        return value
+
+
+def test_results_in_input_order_and_failures_isolated():
+    items = [("c1", 1), ("c2", 2), ("c1", -1), ("c3", 4)]
+    run = fan_out("test", items, _Tracker(), club_of=lambda i: i[0], max_workers=3)
+    assert run.results == [1, 2, None, 4]
+    assert run.values() == [1, 2, 4]
+    assert run.failed == 1 and run.not_started == 0
+
+
+def test_concurrency_and_per_club_limits():
+    tracker = _Tracker()
+    items = [("big", i) for i in range(12)] + [("small", 100)]
+    run = fan_out("test", items, tracker, club_of=lambda i: i[0], max_workers=4)
+    assert len(run.values()) == 13
+    assert tracker.peak <= 4
+    assert tracker.peak_by_club["big"] <= 2
+    # The small club gets its turn right away instead of after the big club's backlog
+    assert ("small", 100) in tracker.started[:2]
+
+
+def test_deadline_stops_new_work():
+    tracker = _Tracker(delay=0.05)
+    items = [(f"c{i}", i) for i in range(20)]
+    run = fan_out("test", items, tracker, club_of=lambda i: i[0],
+                  deadline=CronDeadline(0.08), max_workers=2)
+    assert run.not_started > 0
+    assert len(run.values()) + run.not_started == 20
+
+
+def test_expired_deadline_runs_nothing():
+    run = fan_out("test", [("c1", 1)], _Tracker(), deadline=CronDeadline(0))
+    assert run.results == [None] and run.not_started == 1
@@ -0,0 +1,78 @@
+"""
+Tests for the cron lease (overlap prevention, fencing tokens, skipped-run metric).
+"""
+
+from unittest.mock import MagicMock, patch
+import cron_lease
+from cron_lease import InMemoryLeaseBackend, RedisLeaseBackend, cron_lease as lease_block
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_second_acquire_is_refused_until_release():
+    backend = InMemoryLeaseBackend()
+    token = backend.acquire("invite-timeout", 60000)
+    assert token is not None
+    assert backend.acquire("invite-timeout", 60000) is None
+    backend.release("invite-timeout", token)
+    assert backend.acquire("invite-timeout", 60000) > token
+
+
+def test_expired_lease_is_taken_over_with_higher_token():
+    clock = FakeClock()
+    backend = InMemoryLeaseBackend(clock=clock)
+    first = cron_lease.Lease(backend, "feedback", backend.acquire("feedback", 1000))
+
+    clock.now += 2
+    second_token = backend.acquire("feedback", 1000)
+    assert second_token > first.token
+    assert not first.is_current()
+
+    # The stale holder's release must not free the new holder's lease
+    first.release()
+    assert backend.current_token("feedback") == second_token
+
+
+def test_overlapping_run_is_skipped_and_counted():
+    backend = InMemoryLeaseBackend()
+    with patch.object(cron_lease, "get_lease_backend", return_value=backend):
+        with lease_block("invite-timeout", 300) as outer:
+            assert outer is not None and outer.is_current()
+            with lease_block("invite-timeout", 300) as inner:
+                assert inner is None
+        # Released after the block
+        with lease_block("invite-timeout", 300) as again:
+            assert again is not None
+    assert backend.skip_counts() == {"invite-timeout": 1}
+
+
+def test_unreachable_backend_runs_unguarded():
+    backend = MagicMock()
+    backend.acquire.side_effect = ConnectionError("down")
+    with patch.object(cron_lease, "get_lease_backend", return_value=backend):
+        with lease_block("feedback", 600) as lease:
+            assert lease is not None and lease.is_current()
+
+
+def test_redis_backend_uses_set_nx_px():
+    client = MagicMock()
+    client.incr.return_value = 7
+    client.set.return_value = True
+    backend = RedisLeaseBackend(client)
+
+    assert backend.acquire("feedback", 600000) == 7
+    client.incr.assert_called_once_with("lease:feedback:fence")
+    client.set.assert_called_once_with("lease:feedback", "7", nx=True, px=600000)
+
+    client.set.return_value = None
+    assert backend.acquire("feedback", 600000) is None
+
+    backend.release("feedback", 7)
+    args = client.eval.call_args[0]
+    assert args[1:] == (1, "lease:feedback", "7")
@@ -0,0 +1,78 @@
+"""
+Tests for deadpool evaluation: evaluate_deadpool is a pure function of the
+snapshot, and check_match_deadpool needs one snapshot query plus at most one write.
+"""
+
+from unittest.mock import MagicMock, patch
+import matchmaker
+import sms_constants as msg
+
+
+def _snapshot(**overrides):
+    snapshot = {
+        "match_id": "m1", "status": "pending", "club_id": "c1", "target_group_id": "g1",
+        "scheduled_time": "2025-06-03T22:00:00+00:00", "bridge_offer_sent": False,
+        "needed": 2, "remaining_pool": 1, "top_suggested_time": None, "top_suggested_count": 0,
+        "originator": {"player_id": "o1", "phone_number": "+15550001111", "name": "Org"},
+        "club_name": "Test Club", "club_timezone": "America/New_York", "group_name": "Tuesday Crew",
+    }
+    snapshot.update(overrides)
+    return snapshot
+
+
+def test_no_action_when_pool_suffices_or_match_closed():
+    assert matchmaker.evaluate_deadpool(_snapshot(remaining_pool=2)) is None
+    assert matchmaker.evaluate_deadpool(_snapshot(needed=0)) is None
+    assert matchmaker.evaluate_deadpool(_snapshot(status="confirmed")) is None
+    assert matchmaker.evaluate_deadpool(_snapshot(originator=None)) is None
+    assert matchmaker.evaluate_deadpool(None) is None
+
+
+def test_group_notification_uses_snapshot_names_and_timezone():
+    decision = matchmaker.evaluate_deadpool(_snapshot())
+    assert decision["action"] == "notify"
+    assert decision["state_data"] == {"match_id": "m1"}
+    assert "Tuesday Crew" in decision["sms"] and "Test Club" in decision["sms"]
+    assert "6pm" in decision["sms"]  # 22:00 UTC in New York
+
+
+def test_club_wide_and_bridge_offer():
+    club_wide = matchmaker.evaluate_deadpool(_snapshot(target_group_id=None, remaining_pool=0, group_name=None))
+    assert club_wide["sms"].startswith(msg.MSG_DEADPOOL_CLUB_WIDE.split("{")[0])
+
+    bridge = matchmaker.evaluate_deadpool(_snapshot(
+        top_suggested_time="2025-06-03T23:00:00+00:00", top_suggested_count=2))
+    assert bridge["action"] == "bridge_offer"
+    assert bridge["state_data"]["bridge_time_iso"] == "2025-06-03T23:00:00+00:00"
+    assert "7pm" in bridge["sms"] and "2 others" in bridge["sms"]
+
+    already_offered = matchmaker.evaluate_deadpool(_snapshot(
+        top_suggested_time="2025-06-03T23:00:00+00:00", bridge_offer_sent=True))
+    assert already_offered["action"] == "notify"
+
+
+def test_check_issues_one_query_and_marks_bridge_offer():
+    mock = MagicMock()
+    mock.rpc.return_value.execute.return_value.data = _snapshot(top_suggested_time="2025-06-03T23:00:00+00:00")
+    with patch.object(matchmaker, "supabase", mock), \
+         patch.object(matchmaker, "send_sms") as send, \
+         patch.object(matchmaker, "set_user_state") as set_state:
+        matchmaker.check_match_deadpool("m1")
+
+    mock.rpc.assert_called_once_with("get_match_deadpool_snapshot", {"p_match_id": "m1"})
+    mock.table.assert_called_once_with("matches")
+    mock.table.return_value.update.assert_called_once_with({"bridge_offer_sent": True})
+    send.assert_called_once()
+    assert set_state.call_args.args[1] == msg.STATE_DEADPOOL_REFILL
+
+
+def test_check_with_held_snapshot_skips_query():
+    mock = MagicMock()
+    with patch.object(matchmaker, "supabase", mock), \
+         patch.object(matchmaker, "send_sms") as send, \
+         patch.object(matchmaker, "set_user_state"), \
+         patch("redis_client.get_user_state", return_value={"state": msg.STATE_DEADPOOL_REFILL}):
+        matchmaker.check_match_deadpool("m1", snapshot=_snapshot())
+
+    mock.rpc.assert_not_called()
+    send.assert_not_called()
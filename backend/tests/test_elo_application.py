@@ -0,0 +1,52 @@
+"""
+Tests for Elo application: each pairing is one apply_match_elo RPC (locking,
+deltas, history and corrections happen in the database transaction), and the
+club leaderboards are refreshed from the rows it returns.
+"""
+
+from unittest.mock import MagicMock, patch
+
+from logic import elo_service
+
+
+def _rpc_mock(rows):
+    mock = MagicMock()
+    mock.rpc.return_value.execute.return_value.data = rows
+    return mock
+
+
+def test_pairing_is_one_rpc_and_refreshes_the_leaderboards():
+    rows = [{"player_id": pid, "old_elo_rating": 1900, "new_elo_rating": 1916, "new_sync_rating": "3.54"}
+            for pid in ("a", "b")]
+    mock = _rpc_mock(rows)
+    with patch.object(elo_service, "supabase", mock), \
+         patch.object(elo_service, "club_leaderboard") as leaderboard:
+        assert elo_service.apply_elo_for_pairing("m1", ["a", "b"], ["c", "d"], 1) is True
+
+    mock.rpc.assert_called_once_with("apply_match_elo", {
+        "p_match_id": "m1", "p_team_1": ["a", "b"], "p_team_2": ["c", "d"],
+        "p_winner_team": 1, "p_replace_existing": False
+    })
+    mock.table.assert_not_called()
+    leaderboard.on_ratings_changed.assert_called_once_with(["a", "b"])
+
+    # Invalid teams never reach the database; no rows back means nothing was applied
+    with patch.object(elo_service, "supabase", mock):
+        assert elo_service.apply_elo_for_pairing("m1", ["a"], ["c", "d"], 1) is False
+    assert mock.rpc.call_count == 1
+    with patch.object(elo_service, "supabase", _rpc_mock([])), \
+         patch.object(elo_service, "club_leaderboard"):
+        assert elo_service.apply_elo_for_pairing("m1", ["a", "b"], ["c", "d"], 2) is False
+
+
+def test_match_result_replaces_previous_changes_in_the_same_call():
+    mock = _rpc_mock([{"player_id": "a", "old_elo_rating": 1900, "new_elo_rating": 1884, "new_sync_rating": 3.46}])
+    participants = {"team_1": ["a", "b"], "team_2": ["c", "d"], "all": ["a", "b", "c", "d"]}
+    with patch.object(elo_service, "supabase", mock), \
+         patch.object(elo_service, "club_leaderboard"), \
+         patch.object(elo_service, "get_match_participants", return_value=participants):
+        assert elo_service.update_match_elo("m1", 2) is True
+
+    name, params = mock.rpc.call_args[0]
+    assert name == "apply_match_elo"
+    assert (params["p_winner_team"], params["p_replace_existing"]) == (2, True)
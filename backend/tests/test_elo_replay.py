@@ -0,0 +1,102 @@
+"""
+Tests for the Elo replay engine: pairings are replayed chronologically from the
+seeds with the live elo_service math, dry runs only report the diff, and an
+applied replay regenerates the match_result history in bulk.
+"""
+
+from unittest.mock import patch
+
+from fake_datastore import FakeSupabase
+from logic import elo_replay
+
+
+def _store():
+    store = FakeSupabase()
+    for pid in ("a", "b", "c", "d"):
+        store.add("players", {"player_id": pid, "name": pid.upper(), "phone_number": f"+1555{pid}",
+                              "declared_skill_level": 3.5, "elo_rating": 1500, "elo_confidence": 0,
+                              "adjusted_skill_level": 3.5})
+    # Added out of order: the replay follows scheduled_time
+    store.add("matches", {"match_id": "m2", "status": "completed", "scheduled_time": "2025-06-02T18:00:00Z",
+                          "winner_team": 2})
+    store.add("matches", {"match_id": "m1", "status": "completed", "scheduled_time": "2025-06-01T18:00:00Z",
+                          "winner_team": None})
+    store.add("matches", {"match_id": "m0", "status": "cancelled", "scheduled_time": "2025-05-01T18:00:00Z",
+                          "winner_team": 1})
+    for number, winner in ((1, 1), (2, 2), (3, 1)):
+        store.add("match_sets", {"match_id": "m1", "set_number": number, "team_1_player_1": "a",
+                                 "team_1_player_2": "b", "team_2_player_1": "c", "team_2_player_2": "d",
+                                 "winner_team": winner})
+    # m2 has no sets: its participation teams and winner_team
+    for pid, team in (("a", 1), ("c", 1), ("b", 2), ("d", 2)):
+        store.add("match_participations", {"match_id": "m2", "player_id": pid, "team_index": team})
+    store.add("player_rating_history", {"player_id": "a", "match_id": "m1", "change_type": "match_result",
+                                        "old_elo_rating": 1900, "new_elo_rating": 1950})
+    store.add("player_rating_history", {"player_id": "a", "match_id": None, "change_type": "manual_adjustment",
+                                        "old_elo_rating": 1950, "new_elo_rating": 2000})
+    return store
+
+
+def _replay(store, dry_run):
+    with patch.object(elo_replay, "supabase", store), \
+         patch.object(elo_replay, "club_leaderboard") as leaderboard:
+        report = elo_replay.replay_elo(dry_run=dry_run)
+    # Applied replays drop the cached club leaderboards
+    assert leaderboard.invalidate.called is not dry_run
+    return report
+
+
+def test_dry_run_replays_in_order_and_writes_nothing():
+    store = _store()
+    report = _replay(store, dry_run=True)
+
+    assert (report["matches"], report["pairings"], report["changed"]) == (2, 2, 4)
+    # m1: 1900 each, team 1 wins 2 sets to 1 (K 64) -> a, b 1932 / c, d 1868
+    # m2: a+c (1900) vs b+d (1900), team 2 wins -> a 1900, c 1836, b 1964, d 1900
+    final = {c["player_id"]: (c["new_elo"], c["new_confidence"], c["new_sync"]) for c in report["changes"]}
+    assert final == {"a": (1900, 2, 3.5), "b": (1964, 2, 3.66), "c": (1836, 2, 3.34), "d": (1900, 2, 3.5)}
+    assert report["changes"][0]["player_id"] in ("b", "c")  # largest change first
+
+    by_target = store.stats.snapshot()["by_target"]
+    assert not [t for t in by_target if t.endswith((".insert", ".upsert", ".update", ".delete"))]
+
+
+def test_apply_rewrites_ratings_and_match_history():
+    store = _store()
+    store.add("match_sets", {"match_id": "m2", "set_number": 1, "team_1_player_1": "a", "team_1_player_2": "gone",
+                             "team_2_player_1": "c", "team_2_player_2": "d", "winner_team": 1})
+    report = _replay(store, dry_run=False)
+
+    # m2 now has sets with a deleted player: that pairing is skipped
+    assert (report["pairings"], report["skipped_pairings"]) == (2, 1)
+    assert store.get("players", "a")["elo_rating"] == 1932
+    assert store.get("players", "c")["adjusted_skill_level"] == 3.42
+    assert store.get("players", "a")["elo_confidence"] == 1
+
+    history = store.rows("player_rating_history")
+    match_rows = [h for h in history if h["change_type"] == "match_result"]
+    assert sorted((h["player_id"], h["old_elo_rating"], h["new_elo_rating"]) for h in match_rows) == [
+        ("a", 1900, 1932), ("b", 1900, 1932), ("c", 1900, 1868), ("d", 1900, 1868)]
+    assert all(h["created_at"] == "2025-06-01T18:00:00Z" for h in match_rows)
+    assert [h["change_type"] for h in history if h["change_type"] != "match_result"] == ["manual_adjustment"]
+    # History and ratings in one transactional call; players are never upserted
+    by_target = store.stats.snapshot()["by_target"]
+    assert by_target["rpc.apply_elo_replay"] == 1
+    assert not [t for t in by_target if t.endswith((".insert", ".upsert", ".update", ".delete"))]
+
+
+def test_apply_does_not_recreate_a_player_deleted_since_the_read():
+    store = _store()
+    load_players = elo_replay._load_players
+
+    def load_then_delete_d(player_ids):
+        players = load_players(player_ids)
+        store.table("players").delete().eq("player_id", "d").execute()
+        return players
+
+    with patch.object(elo_replay, "_load_players", side_effect=load_then_delete_d):
+        report = _replay(store, dry_run=False)
+
+    assert report["changed"] == 4
+    assert store.get("players", "d") is None
+    assert "d" not in {h["player_id"] for h in store.rows("player_rating_history")}
@@ -0,0 +1,117 @@
+"""
+Tests that find_and_invite_players gets its match, requester, club and eligible
+candidates from one get_match_invite_context call, ranks only those, and creates
+the batch with one attempt_insert_invites call.
+"""
+
+from datetime import datetime, timezone
+
+from unittest.mock import MagicMock, patch
+import matchmaker
+
+
+def _context(candidates, status="pending"):
+    return {
+        "match": {"match_id": "m1", "club_id": "c1", "status": status,
+                  "level_range_min": 3.0, "level_range_max": 4.0, "gender_preference": "mixed"},
+        "requester": {"player_id": "r1", "name": "Req", "declared_skill_level": 3.5},
+        "club": {"name": "Test Club", "settings": {"initial_batch_size": 2}, "timezone": "America/New_York"},
+        "group_found": True,
+        "candidates": candidates,
+    }
+
+
+def _candidate(pid, level, responsiveness=50):
+    return {"player_id": pid, "name": pid, "phone_number": f"+1555{pid}", "gender": "male",
+            "declared_skill_level": level, "adjusted_skill_level": None,
+            "responsiveness_score": responsiveness, "reputation_score": 50}
+
+
+def _mock_supabase(context, statuses=None):
+    mock = MagicMock()
+    calls = []
+
+    def rpc(name, params):
+        calls.append((name, params))
+        result = MagicMock()
+        if name == "get_match_invite_context":
+            result.execute.return_value.data = context
+        else:
+            result.execute.return_value.data = [
+                {"player_id": pid, "status": (statuses or {}).get(pid, "SUCCESS")}
+                for pid in params["p_player_ids"]
+            ]
+        return result
+
+    mock.rpc.side_effect = rpc
+    return mock, calls
+
+
+def test_one_context_call_then_top_ranked_invites():
+    candidates = [_candidate("a", 3.5, 20), _candidate("b", 3.5, 90), _candidate("c", 3.5, 60)]
+    mock, calls = _mock_supabase(_context(candidates))
+    with patch.object(matchmaker, "supabase", mock), \
+         patch.object(matchmaker, "send_sms") as send, \
+         patch.object(matchmaker, "clear_user_state"), \
+         patch.object(matchmaker, "get_quiet_hours_release", return_value=None), \
+         patch.object(matchmaker, "_build_invite_sms", return_value="invite"):
+        count = matchmaker.find_and_invite_players("m1", notify_deadpool=False)
+
+    assert count == 2
+    assert calls[0] == ("get_match_invite_context", {
+        "p_match_id": "m1", "p_skip_filters": False, "p_target_player_ids": None
+    })
+    assert len(calls) == 2
+    name, params = calls[1]
+    assert name == "attempt_insert_invites"
+    assert params["p_player_ids"] == ["b", "c"]
+    assert params["p_status"] == "sent"
+    assert params["p_send_after"] is None
+    assert len(params["p_invite_scores"]) == len(params["p_score_breakdowns"]) == 2
+    assert {c.args[0] for c in send.call_args_list} == {"+1555b", "+1555c"}
+    mock.table.assert_not_called()
+
+
+def test_missing_match_and_closed_match():
+    mock, _ = _mock_supabase(None)
+    with patch.object(matchmaker, "supabase", mock):
+        assert matchmaker.find_and_invite_players("m1") == 0
+
+    mock, calls = _mock_supabase(_context([_candidate("a", 3.5)], status="confirmed"))
+    with patch.object(matchmaker, "supabase", mock):
+        assert matchmaker.find_and_invite_players("m1") == 0
+    assert len(calls) == 1
+
+
+def test_batch_statuses_decide_who_gets_sms():
+    candidates = [_candidate("a", 3.5, 90), _candidate("b", 3.5, 60)]
+    mock, _ = _mock_supabase(_context(candidates), statuses={"a": "ALREADY_INVITED"})
+    with patch.object(matchmaker, "supabase", mock), \
+         patch.object(matchmaker, "send_sms") as send, \
+         patch.object(matchmaker, "clear_user_state"), \
+         patch.object(matchmaker, "get_quiet_hours_release", return_value=None), \
+         patch.object(matchmaker, "_build_invite_sms", return_value="invite"):
+        assert matchmaker.find_and_invite_players("m1", notify_deadpool=False) == 1
+    assert [c.args[0] for c in send.call_args_list] == ["+1555b"]
+
+    mock, _ = _mock_supabase(_context(candidates), statuses={"a": "MATCH_FULL", "b": "MATCH_FULL"})
+    with patch.object(matchmaker, "supabase", mock), \
+         patch.object(matchmaker, "send_sms") as send, \
+         patch.object(matchmaker, "get_quiet_hours_release", return_value=None):
+        assert matchmaker.find_and_invite_players("m1", notify_deadpool=False) == 0
+    send.assert_not_called()
+
+
+def test_quiet_hours_queue_with_send_after():
+    release = datetime(2025, 6, 4, 12, 0, tzinfo=timezone.utc)
+    mock, calls = _mock_supabase(_context([_candidate("a", 3.5)]))
+    with patch.object(matchmaker, "supabase", mock), \
+         patch.object(matchmaker, "send_sms") as send, \
+         patch.object(matchmaker, "get_quiet_hours_release", return_value=release):
+        assert matchmaker.find_and_invite_players("m1", batch_number=2, notify_deadpool=False) == 1
+
+    params = calls[1][1]
+    assert params["p_status"] == "pending_sms"
+    assert params["p_send_after"] == release.isoformat()
+    send.assert_not_called()
+    mock.table.assert_not_called()
@@ -0,0 +1,140 @@
+"""
+Tests for the invite expiry delay queue: due-only pops, per-deadline entries,
+refills limited to the popped matches, claims that survive an unfinished run
+and quiet-hours requeueing.
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import invite_expiry_queue as eq
+from invite_expiry_queue import InMemoryExpiryQueue
+
+NOW = datetime(2025, 6, 3, 18, 2, tzinfo=timezone.utc)
+
+
+def test_pops_only_due_entries_in_order():
+    queue = InMemoryExpiryQueue()
+    queue.schedule("m2", NOW - timedelta(minutes=1))
+    queue.schedule("m1", NOW - timedelta(minutes=5))
+    queue.schedule("m3", NOW + timedelta(minutes=10))
+    queue.schedule("m1", NOW - timedelta(minutes=5))  # same deadline registered twice
+
+    assert queue.size() == 3
+    assert queue.pop_due(NOW) == ["m1", "m2"]
+    assert queue.pop_due(NOW) == []
+    assert queue.pop_due(NOW + timedelta(minutes=10)) == ["m3"]
+
+
+def test_each_batch_keeps_its_own_deadline():
+    queue = InMemoryExpiryQueue()
+    queue.schedule("m1", NOW - timedelta(minutes=1))
+    queue.schedule("m1", NOW + timedelta(minutes=14))
+    assert queue.pop_due(NOW) == ["m1"]
+    assert queue.size() == 1
+
+
+def test_pop_limit():
+    queue = InMemoryExpiryQueue()
+    for i in range(5):
+        queue.schedule(f"m{i}", NOW - timedelta(minutes=i))
+    assert len(queue.pop_due(NOW, limit=2)) == 2
+    assert queue.size() == 3
+
+
+def test_due_expiries_refill_only_popped_matches():
+    queue = InMemoryExpiryQueue()
+    queue.schedule("m1", NOW - timedelta(minutes=1))
+    queue.schedule("m2", NOW + timedelta(minutes=5))
+    eq.set_expiry_queue(queue)
+    try:
+        with patch("matchmaker.refill_stale_matches", return_value=(3, [])) as refills:
+            assert eq.process_due_invite_expiries(now=NOW) == 3
+            refills.assert_called_once_with(deadline=None, match_ids=["m1"], now=NOW)
+
+            refills.reset_mock()
+            assert eq.process_due_invite_expiries(now=NOW) == 0
+            refills.assert_not_called()
+    finally:
+        eq.set_expiry_queue(None)
+
+
+def test_unfinished_matches_come_back_after_visibility_timeout():
+    queue = InMemoryExpiryQueue()
+    queue.schedule("m1", NOW - timedelta(minutes=2))
+    queue.schedule("m2", NOW - timedelta(minutes=1))
+    eq.set_expiry_queue(queue)
+    later = NOW + timedelta(seconds=eq.CLAIM_VISIBILITY_SECONDS)
+    try:
+        # m2 was not reached before the cron deadline
+        with patch("matchmaker.refill_stale_matches", return_value=(1, ["m2"])):
+            assert eq.process_due_invite_expiries(now=NOW) == 1
+        assert queue.size() == 1
+        assert queue.claim_due(NOW) == []  # hidden while the claim lasts
+
+        # The whole refill fails: nothing is acknowledged
+        with patch("matchmaker.refill_stale_matches", side_effect=RuntimeError("db down")) as refills:
+            try:
+                eq.process_due_invite_expiries(now=later)
+            except RuntimeError:
+                pass
+            assert refills.call_args.kwargs["match_ids"] == ["m2"]
+        assert queue.size() == 1
+
+        with patch("matchmaker.refill_stale_matches", return_value=(1, [])) as refills:
+            assert eq.process_due_invite_expiries(now=later + timedelta(seconds=eq.CLAIM_VISIBILITY_SECONDS)) == 1
+            assert refills.call_args.kwargs["match_ids"] == ["m2"]
+        assert queue.size() == 0
+    finally:
+        eq.set_expiry_queue(None)
+
+
+def test_redis_claim_rescores_and_ack_removes():
+    client = MagicMock()
+    client.eval.return_value = ["m1|100"]
+    queue = eq.RedisExpiryQueue(client)
+    assert queue.claim_due(NOW) == ["m1|100"]
+    args = client.eval.call_args.args
+    assert args[2:] == (eq.EXPIRY_QUEUE_KEY, NOW.timestamp(), eq.POP_BATCH_LIMIT,
+                        NOW.timestamp() + eq.CLAIM_VISIBILITY_SECONDS)
+    queue.ack(["m1|100"])
+    client.zrem.assert_called_once_with(eq.EXPIRY_QUEUE_KEY, "m1|100")
+
+
+def test_quiet_club_match_is_requeued_at_release():
+    import matchmaker
+    queue = InMemoryExpiryQueue()
+    eq.set_expiry_queue(queue)
+    release = NOW + timedelta(hours=10)
+    mock = MagicMock()
+    mock.rpc.return_value.execute.return_value.data = [{
+        "match_id": "m1", "match_status": "pending", "club_id": "c1", "club_settings": {},
+        "club_timezone": "America/New_York", "invite_ids": ["i1"], "max_batch_number": 1,
+    }]
+    try:
+        with patch.object(matchmaker, "supabase", mock), \
+             patch.object(matchmaker, "get_quiet_hours_release", return_value=release), \
+             patch.object(matchmaker, "find_and_invite_players") as invite:
+            assert matchmaker.process_batch_refills(match_ids=["m1"], now=NOW) == 0
+
+        assert mock.rpc.call_args.args[1]["p_match_ids"] == ["m1"]
+        invite.assert_not_called()
+        assert queue.pop_due(release) == ["m1"]
+    finally:
+        eq.set_expiry_queue(None)
+
+
+def test_reconciliation_scan_schedule():
+    eq.set_expiry_queue(InMemoryExpiryQueue())
+    try:
+        assert eq.needs_reconciliation_scan(NOW)  # process-local queue: always scan
+    finally:
+        eq.set_expiry_queue(None)
+
+    shared = MagicMock(is_shared=True)
+    eq.set_expiry_queue(shared)
+    try:
+        assert eq.needs_reconciliation_scan(NOW.replace(minute=2))
+        assert not eq.needs_reconciliation_scan(NOW.replace(minute=30))
+    finally:
+        eq.set_expiry_queue(None)
@@ -0,0 +1,55 @@
+"""
+Tests that process_last_call_flash samples candidates with one
+sample_last_call_candidates call, inserts the invites in one multi-row insert
+and sends the broadcast with one bulk send per match.
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+import matchmaker
+
+
+def _mock_supabase(matches, candidates_by_match):
+    mock = MagicMock()
+    mock.table.return_value.select.return_value.eq.return_value.eq.return_value\
+        .gte.return_value.lte.return_value.execute.return_value.data = matches
+
+    def rpc(name, params):
+        result = MagicMock()
+        result.execute.return_value.data = candidates_by_match.get(params["p_match_id"], [])
+        return result
+
+    mock.rpc.side_effect = rpc
+    return mock
+
+
+def test_flash_uses_one_insert_and_one_bulk_send():
+    start = (datetime.now(timezone.utc) + timedelta(hours=3)).isoformat()
+    matches = [
+        {"match_id": "m1", "club_id": "c1", "scheduled_time": start, "clubs": {"name": "Club"}},
+        {"match_id": "m2", "club_id": "c1", "scheduled_time": start, "clubs": None},
+    ]
+    candidates = [{"player_id": f"p{i}", "phone_number": f"+1555000000{i}", "name": f"P{i}"} for i in range(3)]
+    mock = _mock_supabase(matches, {"m1": candidates})
+
+    with patch.object(matchmaker, "supabase", mock), \
+         patch.object(matchmaker, "send_sms_bulk") as bulk, \
+         patch.object(matchmaker, "send_sms") as single, \
+         patch.object(matchmaker, "format_sms_datetime", return_value="today 6pm"):
+        flashed = matchmaker.process_last_call_flash()
+
+    assert flashed == 1
+    rpc_params = [c.args[1] for c in mock.rpc.call_args_list]
+    assert {p["p_match_id"] for p in rpc_params} == {"m1", "m2"}
+    assert all(p["p_limit"] == matchmaker.LAST_CALL_BROADCAST_SIZE for p in rpc_params)
+
+    inserts = mock.table.return_value.insert.call_args_list
+    assert len(inserts) == 1
+    rows = inserts[0].args[0]
+    assert [r["player_id"] for r in rows] == ["p0", "p1", "p2"]
+    assert all(r["batch_number"] == matchmaker.LAST_CALL_BATCH_NUMBER for r in rows)
+
+    bulk.assert_called_once()
+    assert bulk.call_args.args[0] == [c["phone_number"] for c in candidates]
+    assert bulk.call_args.kwargs["club_id"] == "c1"
+    single.assert_not_called()
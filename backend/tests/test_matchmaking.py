@@ -1,23 +1,10 @@
 import sys
 from unittest.mock import MagicMock
 
-# 1. Mock Redis BEFORE anything else
-_test_state = {}
-def mock_set_user_state(phone, state, data=None):
-    _test_state[phone] = {"state": state}
-    if data: _test_state[phone].update(data)
-    print(f"[STATE] {phone} -> {state}")
-def mock_get_user_state(phone):
-    return _test_state.get(phone, {})
-def mock_clear_user_state(phone):
-    _test_state.pop(phone, None)
-
-# Create a mock redis_client module
-mock_redis = MagicMock()
-mock_redis.set_user_state = mock_set_user_state
-mock_redis.get_user_state = mock_get_user_state
-mock_redis.clear_user_state = mock_clear_user_state
-sys.modules["redis_client"] = mock_redis
+# 1. Keep conversation state in memory instead of Redis
+import redis_client
+from state_store import InMemoryStateStore
+redis_client.set_state_store(InMemoryStateStore())
 
 # 2. Mock Reasoner BEFORE anything else
 from logic.reasoner import ReasonerResult
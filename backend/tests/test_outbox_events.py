@@ -0,0 +1,163 @@
+"""
+Tests for the sms_outbox pub/sub behind the simulator long-poll, in one process
+and across processes sharing a Redis channel.
+"""
+
+import asyncio
+import queue
+import threading
+from outbox_events import OutboxBroker
+
+
+class FakeRedis:
+    """publish() and pubsub() over in-process queues, like processes sharing one Redis."""
+
+    def __init__(self):
+        self.channels = {}
+
+    def publish(self, channel, data):
+        for q in list(self.channels.get(channel, [])):
+            q.put({"type": "message", "channel": channel, "data": data})
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue = queue.Queue()
+
+    def subscribe(self, channel):
+        self.redis.channels.setdefault(channel, []).append(self.queue)
+        self.queue.put({"type": "subscribe", "channel": channel, "data": 1})
+
+    def get_message(self, timeout=None):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def listen(self):
+        while True:
+            yield self.queue.get()
+
+    def close(self):
+        pass
+
+
+def local_broker():
+    return OutboxBroker(redis_client=lambda: None)
+
+
+def test_publish_reaches_subscriber():
+    broker = local_broker()
+
+    async def run():
+        queue = broker.subscribe()
+        broker.publish({"id": "1", "to_number": "+15550000001", "body": "hi"})
+        message = await asyncio.wait_for(queue.get(), timeout=1)
+        broker.unsubscribe(queue)
+        return message
+
+    assert asyncio.run(run())["id"] == "1"
+    assert broker.subscriber_count() == 0
+
+
+def test_wait_for_message_filters_by_phone():
+    broker = local_broker()
+
+    async def run():
+        waiter = asyncio.create_task(broker.wait_for_message(1, phone_number="+15550000002"))
+        await asyncio.sleep(0.01)
+        broker.publish({"id": "1", "to_number": "+15550000001"})
+        broker.publish({"id": "2", "to_number": "+15550000002"})
+        return await waiter
+
+    assert asyncio.run(run())["id"] == "2"
+
+
+def test_wait_for_message_times_out():
+    broker = local_broker()
+    assert asyncio.run(broker.wait_for_message(0.05)) is None
+    assert broker.subscriber_count() == 0
+
+
+def test_publish_from_worker_thread():
+    broker = local_broker()
+
+    async def run():
+        waiter = asyncio.create_task(broker.wait_for_message(1))
+        await asyncio.sleep(0.01)
+        threading.Thread(target=broker.publish, args=({"id": "t"},)).start()
+        return await waiter
+
+    assert asyncio.run(run())["id"] == "t"
+
+
+def test_long_poll_sees_message_stored_before_wait():
+    broker = local_broker()
+    rows = []
+
+    def query():
+        # The first query misses a message stored right after it
+        result = list(rows)
+        if not rows:
+            rows.append({"id": "1"})
+            broker.publish({"id": "1"})
+        return result
+
+    assert asyncio.run(broker.long_poll(query, 5)) == [{"id": "1"}]
+    assert broker.subscriber_count() == 0
+
+
+def test_idle_long_poll_queries_once():
+    broker = local_broker()
+    calls = []
+
+    def query():
+        calls.append(1)
+        return []
+
+    assert asyncio.run(broker.long_poll(query, 0.1)) == []
+    assert len(calls) == 1
+
+
+def test_message_stored_by_another_process_wakes_long_poll():
+    redis = FakeRedis()
+    poller, publisher = OutboxBroker(redis_client=lambda: redis), OutboxBroker(redis_client=lambda: redis)
+    rows = []
+
+    def query():
+        return list(rows)
+
+    async def run():
+        waiter = asyncio.create_task(poller.long_poll(query, 5, phone_number="+15550000002"))
+        await asyncio.sleep(0.05)
+        message = {"id": "remote", "to_number": "+15550000002"}
+        rows.append(message)
+        publisher.publish(message)
+        return await waiter
+
+    assert asyncio.run(run()) == [{"id": "remote", "to_number": "+15550000002"}]
+
+
+def test_listening_process_gets_its_own_message_once():
+    redis = FakeRedis()
+    broker = OutboxBroker(redis_client=lambda: redis)
+
+    async def run():
+        assert await asyncio.to_thread(broker.connect)
+        q = broker.subscribe()
+        broker.publish({"id": "1", "created_at": "now"})
+        first = await asyncio.wait_for(q.get(), timeout=1)
+        await asyncio.sleep(0.05)
+        return first, q.qsize()
+
+    assert asyncio.run(run()) == ({"id": "1", "created_at": "now"}, 0)
+
+
+def test_long_poll_times_out_empty():
+    broker = local_broker()
+    assert asyncio.run(broker.long_poll(lambda: [], 0.05)) == []
+    assert broker.subscriber_count() == 0
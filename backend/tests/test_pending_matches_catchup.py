@@ -0,0 +1,57 @@
+"""
+Tests that process_pending_matches finds invite-less matches with one
+get_uninvited_open_matches call and starts them through the bounded pool.
+(Allocation across overlapping matches is covered in test_invite_allocator.py.)
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+import cron_executor
+import matchmaker
+
+
+def _mock_supabase(match_ids):
+    mock = MagicMock()
+    mock.rpc.return_value.execute.return_value.data = [{"match_id": m, "club_id": "c1"} for m in match_ids]
+    return mock
+
+
+def test_starts_only_uninvited_matches_with_one_query():
+    mock = _mock_supabase(["m1", "m2", "m3"])
+    with patch.object(matchmaker, "supabase", mock), \
+         patch("deferred_sms_scheduler.release_due_invites", return_value=2), \
+         patch("invite_allocator.allocate_invite_round", return_value={}), \
+         patch.object(matchmaker, "find_and_invite_players", side_effect=lambda m, batch_number, context: 0 if m == "m2" else 3) as invite:
+        total = matchmaker.process_pending_matches()
+
+    mock.rpc.assert_called_once_with("get_uninvited_open_matches", {})
+    mock.table.assert_not_called()
+    assert sorted(c.args[0] for c in invite.call_args_list) == ["m1", "m2", "m3"]
+    assert total == 2 + 2
+
+
+def test_pool_is_bounded_and_survives_errors():
+    ids = [f"m{i}" for i in range(12)]
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def fake_invite(match_id, batch_number, context):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        if match_id == "m0":
+            raise RuntimeError("boom")
+        return 1
+
+    with patch.object(matchmaker, "supabase", _mock_supabase(ids)), \
+         patch("deferred_sms_scheduler.release_due_invites", return_value=0), \
+         patch("invite_allocator.allocate_invite_round", return_value={}), \
+         patch.object(matchmaker, "find_and_invite_players", side_effect=fake_invite):
+        total = matchmaker.process_pending_matches()
+
+    assert total == 11
+    assert 1 < peak[0] <= cron_executor.MAX_IN_FLIGHT_PER_CLUB
@@ -0,0 +1,64 @@
+"""
+Tests for quiet-hours release time calculation used by the deferred SMS scheduler.
+"""
+
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+NY = "America/New_York"
+LA = "America/Los_Angeles"
+DEFAULT_SETTINGS = {"quiet_hours_start": 21, "quiet_hours_end": 8}
+
+
+@pytest.fixture
+def get_quiet_hours_release(real_module, monkeypatch):
+    pytz = real_module("pytz")
+    logic_utils = real_module("logic_utils")
+    # logic_utils may have been first imported while pytz was mocked
+    monkeypatch.setattr(logic_utils, "pytz", pytz)
+    return logic_utils.get_quiet_hours_release
+
+
+def _utc(tz, *args):
+    return datetime(*args, tzinfo=ZoneInfo(tz)).astimezone(timezone.utc)
+
+
+def test_outside_quiet_hours_sends_now(get_quiet_hours_release):
+    assert get_quiet_hours_release(DEFAULT_SETTINGS, "America/New_York", now=_utc(NY, 2025, 6, 3, 14, 0)) is None
+
+
+def test_evening_releases_next_morning(get_quiet_hours_release):
+    release = get_quiet_hours_release(DEFAULT_SETTINGS, "America/New_York", now=_utc(NY, 2025, 6, 3, 22, 30))
+    assert release == _utc(NY, 2025, 6, 4, 8, 0)
+
+
+def test_early_morning_releases_same_day(get_quiet_hours_release):
+    release = get_quiet_hours_release(DEFAULT_SETTINGS, "America/New_York", now=_utc(NY, 2025, 6, 3, 5, 15))
+    assert release == _utc(NY, 2025, 6, 3, 8, 0)
+
+
+def test_uses_club_timezone(get_quiet_hours_release):
+    # 11 PM in New York is 8 PM in LA: quiet for NY clubs, not for LA clubs
+    now = _utc(NY, 2025, 6, 3, 23, 0)
+    assert get_quiet_hours_release(DEFAULT_SETTINGS, "America/Los_Angeles", now=now) is None
+    assert get_quiet_hours_release(DEFAULT_SETTINGS, "America/New_York", now=now) == _utc(NY, 2025, 6, 4, 8, 0)
+
+
+def test_same_day_window(get_quiet_hours_release):
+    settings = {"quiet_hours_start": 1, "quiet_hours_end": 6}
+    release = get_quiet_hours_release(settings, "America/Los_Angeles", now=_utc(LA, 2025, 6, 3, 2, 0))
+    assert release == _utc(LA, 2025, 6, 3, 6, 0)
+
+
+def test_release_across_dst_change(get_quiet_hours_release):
+    # Night of the spring-forward change: release is still 8 AM local
+    release = get_quiet_hours_release(DEFAULT_SETTINGS, "America/New_York", now=_utc(NY, 2025, 3, 8, 23, 0))
+    assert release == _utc(NY, 2025, 3, 9, 8, 0)
+    assert release.hour == 12  # EDT is UTC-4
+
+
+def test_invalid_timezone_falls_back_to_new_york(get_quiet_hours_release):
+    release = get_quiet_hours_release(DEFAULT_SETTINGS, None, now=_utc(NY, 2025, 6, 3, 22, 0))
+    assert release == _utc(NY, 2025, 6, 4, 8, 0)
@@ -0,0 +1,53 @@
+"""
+Tests that player recommendations are one filtered players query (active club
+members in the declared-level range), ranked available-first, then by level.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import match_organizer
+
+
+def _player(pid, level, mask=None):
+    return {"player_id": pid, "declared_skill_level": level, "availability_mask": mask,
+            "club_members": [{"club_id": "c1"}]}
+
+
+def test_recommendations_are_one_filtered_query():
+    mock = MagicMock()
+    query = mock.table.return_value.select.return_value
+    query.eq.return_value = query
+    query.gte.return_value = query
+    query.lte.return_value = query
+    query.execute.return_value.data = [_player("a", 3.0), _player("b", 3.5), _player("host", 3.0)]
+
+    with patch.object(match_organizer, "supabase", mock):
+        players = match_organizer.get_player_recommendations("c1", 3.0, "female", exclude_player_ids=["host"])
+
+    mock.table.assert_called_once_with("players")
+    mock.table.return_value.select.assert_called_once_with("*, club_members!inner(club_id)")
+    assert [c.args for c in query.eq.call_args_list] == [
+        ("club_members.club_id", "c1"), ("active_status", True), ("gender", "female"),
+    ]
+    query.gte.assert_called_once_with("declared_skill_level", 2.5)
+    query.lte.assert_called_once_with("declared_skill_level", 3.5)
+    assert [(p["player_id"], p["match_score"]) for p in players] == [("a", 0.0), ("b", 0.5)]
+    assert "club_members" not in players[0]
+
+
+def test_players_available_at_the_match_time_come_first():
+    mock = MagicMock()
+    query = mock.table.return_value.select.return_value
+    query.eq.return_value = query
+    query.gte.return_value = query
+    query.lte.return_value = query
+    query.execute.return_value.data = [_player("close", 3.0, mask=0b10), _player("free", 3.5, mask=0b11)]
+
+    with patch.object(match_organizer, "supabase", mock), \
+         patch.object(match_organizer, "get_club_timezone", return_value="America/New_York"), \
+         patch.object(match_organizer, "availability_bucket_bit", return_value=1):
+        players = match_organizer.get_player_recommendations("c1", 3.0, scheduled_time="2025-06-03T18:00:00Z")
+
+    assert [(p["player_id"], p["is_available"]) for p in players] == [("free", True), ("close", False)]
+    # 'mixed' / no preference does not filter on gender
+    assert [c.args[0] for c in query.eq.call_args_list] == ["club_members.club_id", "active_status"]
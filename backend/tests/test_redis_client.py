@@ -0,0 +1,69 @@
+"""
+Tests for pooled Redis client reuse and single-value conversation-state reads/writes.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from conversation_state import encode_state
+from state_store import RedisStateStore
+
+
+@pytest.fixture
+def redis_client(real_module):
+    return real_module("redis_client")
+
+
+def test_client_is_created_once(redis_client):
+    with patch.object(redis_client, "redis_url", "redis://localhost:6379/0"), \
+         patch.object(redis_client, "_redis_client", None):
+        first = redis_client.get_redis_client()
+        second = redis_client.get_redis_client()
+        assert first is second
+
+
+def test_shared_client_follows_the_state_backend(redis_client):
+    with patch.object(redis_client, "redis_url", "redis://localhost:6379/0"), \
+         patch.object(redis_client, "get_redis_client", return_value="text"), \
+         patch.object(redis_client, "get_redis_binary_client", return_value="binary"):
+        with patch.object(redis_client, "state_backend", ""):
+            assert redis_client.get_shared_redis_client() == "text"
+            assert redis_client.get_shared_redis_client(binary=True) == "binary"
+        with patch.object(redis_client, "state_backend", "memory"):
+            assert redis_client.get_shared_redis_client() is None
+    with patch.object(redis_client, "redis_url", None), patch.object(redis_client, "state_backend", ""):
+        assert redis_client.get_shared_redis_client() is None
+
+
+def test_set_user_state_is_one_set_with_expiry(redis_client):
+    mock_client = MagicMock()
+    with patch.object(redis_client, "get_state_store", return_value=RedisStateStore(mock_client)):
+        assert redis_client.set_user_state("+15550000001", "WAITING_FEEDBACK", {
+            "match_id": "m1",
+            "players_to_rate": ["a", "b", "c"]
+        }, ttl=86400)
+
+    mock_client.set.assert_called_once_with(
+        "user_state:+15550000001",
+        encode_state("WAITING_FEEDBACK", {"match_id": "m1", "players_to_rate": ["a", "b", "c"]}),
+        ex=86400
+    )
+    mock_client.hset.assert_not_called()
+    mock_client.pipeline.assert_not_called()
+
+
+def test_get_user_state_is_one_get(redis_client):
+    mock_client = MagicMock()
+    mock_client.get.return_value = encode_state("X", {"players_to_rate": ["a", "b"]})
+    with patch.object(redis_client, "get_state_store", return_value=RedisStateStore(mock_client)):
+        state = redis_client.get_user_state("+15550000001")
+    mock_client.get.assert_called_once_with("user_state:+15550000001")
+    assert state == {"state": "X", "players_to_rate": ["a", "b"]}
+
+
+def test_get_user_state_missing_key(redis_client):
+    mock_client = MagicMock()
+    mock_client.get.return_value = None
+    with patch.object(redis_client, "get_state_store", return_value=RedisStateStore(mock_client)):
+        assert redis_client.get_user_state("+15550000001") == {}
@@ -0,0 +1,126 @@
+"""
+Tests for score maintenance: the nightly job is one reconciliation RPC that only
+touches drifted players, and the full recompute uses the same counter definitions
+as the incremental triggers (migration 050), in keyset pages resumable across runs.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import score_calculator
+from fake_datastore import FakeSupabase
+from state_store import InMemoryStateStore, RedisStateStore
+
+
+def test_reconciliation_is_one_rpc():
+    mock = MagicMock()
+    mock.rpc.return_value.execute.return_value.data = [
+        {"player_id": "p1", "responsiveness_score": 80, "reputation_score": 76},
+    ]
+    with patch.object(score_calculator, "supabase", mock):
+        assert score_calculator.reconcile_player_scores() == 1
+
+    mock.rpc.assert_called_once_with("reconcile_player_counters", {})
+    mock.table.assert_not_called()
+
+
+def _store(players, invites=(), participations=(), matches=()):
+    store = FakeSupabase()
+    for pid in players:
+        store.add("players", {"player_id": pid, "name": pid, "phone_number": f"+1555{pid}", "total_no_shows": 0})
+    for i, (pid, status) in enumerate(invites):
+        store.add("match_invites", {"invite_id": f"i{i:03d}", "player_id": pid, "status": status})
+    for match_id, status in matches:
+        store.add("matches", {"match_id": match_id, "status": status})
+    for match_id, pid in participations:
+        store.add("match_participations", {"match_id": match_id, "player_id": pid})
+    return store
+
+
+def test_full_recompute_counts_like_the_triggers():
+    store = _store(["p1"], invites=[
+        ("p1", "accepted"),
+        ("p1", "declined"),
+        ("p1", "expired"),
+        ("p1", "pending_sms"),  # not received yet
+    ])
+    with patch.object(score_calculator, "supabase", store), \
+         patch("redis_client.get_state_store", return_value=InMemoryStateStore()):
+        assert score_calculator.recalculate_player_scores()["updated"] == 1
+
+    player = store.get("players", "p1")
+    assert player["total_invites_received"] == 3
+    assert player["total_invites_responded"] == 2
+    assert player["total_invites_accepted"] == 1
+    # 2 of 3 answered: 50 + (0.667 - 0.5) * 100
+    assert player["responsiveness_score"] == 66
+
+
+class _ExpiresAfter:
+    """CronDeadline stand-in that expires after `checks` pages."""
+
+    def __init__(self, checks):
+        self.checks = checks
+
+    def expired(self):
+        self.checks -= 1
+        return self.checks < 0
+
+
+def test_full_recompute_pages_and_resumes_across_runs():
+    players = [f"p{i}" for i in range(5)]
+    store = _store(
+        players,
+        invites=[(pid, "accepted") for pid in players for _ in range(3)],
+        matches=[("m1", "completed"), ("m2", "confirmed"), ("m3", "cancelled")],
+        participations=[(m, pid) for m in ("m1", "m2", "m3") for pid in players],
+    )
+    state_store = InMemoryStateStore()
+    with patch.object(score_calculator, "supabase", store), \
+         patch.object(score_calculator, "PLAYER_PAGE_SIZE", 2), \
+         patch.object(score_calculator, "ROW_PAGE_SIZE", 2), \
+         patch("redis_client.get_state_store", return_value=state_store):
+        score_calculator.start_score_recompute()
+        first = score_calculator.recalculate_player_scores(deadline=_ExpiresAfter(0))
+        assert (first["done"], first["processed"], first["cursor"]) == (False, 2, "p1")
+        assert score_calculator.get_score_recompute_progress()["cursor"] == "p1"
+
+        second = score_calculator.recalculate_player_scores(deadline=_ExpiresAfter(5))
+        assert (second["done"], second["processed"], second["updated"]) == (True, 5, 5)
+        assert score_calculator.get_score_recompute_progress() is None
+
+        # Nothing changed since: no writes
+        score_calculator.start_score_recompute()
+        assert score_calculator.recalculate_player_scores()["updated"] == 0
+
+    for pid in players:
+        player = store.get("players", pid)
+        # Invites and participations span several keyset pages per player page
+        assert (player["total_invites_accepted"], player["total_matches_played"]) == (3, 2)
+    # One update-only bulk write per page of players
+    assert store.stats.snapshot()["by_target"]["rpc.update_player_scores"] == 3
+    assert "players.upsert" not in store.stats.snapshot()["by_target"]
+
+
+def test_player_deleted_during_recompute_is_not_recreated():
+    store = _store(["p1", "p2"], invites=[("p1", "accepted"), ("p2", "accepted")])
+    aggregate = score_calculator._aggregate_player_page
+
+    def delete_p2_after_reading(player_ids):
+        stats = aggregate(player_ids)
+        store.table("players").delete().eq("player_id", "p2").execute()
+        return stats
+
+    with patch.object(score_calculator, "supabase", store), \
+         patch.object(score_calculator, "_aggregate_player_page", side_effect=delete_p2_after_reading), \
+         patch("redis_client.get_state_store", return_value=InMemoryStateStore()):
+        assert score_calculator.recalculate_player_scores()["updated"] == 1
+
+    assert store.get("players", "p2") is None
+    assert [r["player_id"] for r in store.rows("players")] == ["p1"]
+
+
+def test_recompute_is_resumable_only_with_a_shared_state_store():
+    with patch("redis_client.get_state_store", return_value=InMemoryStateStore()):
+        assert not score_calculator.score_recompute_is_resumable()
+    with patch("redis_client.get_state_store", return_value=RedisStateStore(MagicMock())):
+        assert score_calculator.score_recompute_is_resumable()
@@ -0,0 +1,74 @@
+"""
+Parity tests: rank_candidates_batch must return exactly what the scalar
+rank_candidates returns (scores, breakdowns, order incl. ties), truncated to top_k.
+"""
+
+import copy
+import random
+import scoring_engine
+from scoring_engine import rank_candidates, rank_candidates_batch
+
+
+def _random_candidates(n, seed):
+    rng = random.Random(seed)
+    levels = [None, 2.5, 3.0, 3.25, 3.5, 3.6, 3.75, 4.0, 4.5, 5.0]
+    genders = ["male", "female", "Male", None]
+    candidates = []
+    for i in range(n):
+        p = {
+            "player_id": f"p{i}",
+            "name": f"P{i}",
+            "gender": rng.choice(genders),
+            "declared_skill_level": rng.choice(levels),
+            "adjusted_skill_level": rng.choice([None, None, rng.choice(levels)]),
+        }
+        # Few distinct values so ties are common; sometimes the keys are missing
+        if rng.random() < 0.9:
+            p["responsiveness_score"] = rng.choice([0, 35, 50, 51, 80, 100])
+        if rng.random() < 0.9:
+            p["reputation_score"] = rng.choice([0, 50, 70, 100])
+        candidates.append(p)
+    return candidates
+
+
+MATCHES = [
+    {"level_min": 3.0, "level_max": 4.0, "gender_preference": "mixed"},
+    {"level_min": 3.25, "level_max": 3.75, "gender_preference": "M"},
+    {"level_min": None, "level_max": None, "gender_preference": "F"},
+    {"level_min": 3.5, "gender_preference": None},
+    {"level_min": "bad", "level_max": 4.0, "gender_preference": "any"},
+]
+
+
+def _summary(ranked):
+    return [(p["player_id"], p["_invite_score"], p["_score_breakdown"]) for p in ranked]
+
+
+def test_batch_matches_scalar_for_all_match_shapes():
+    for seed, match in enumerate(MATCHES):
+        candidates = _random_candidates(300, seed)
+        expected = _summary(rank_candidates(copy.deepcopy(candidates), match))
+        assert _summary(rank_candidates_batch(copy.deepcopy(candidates), match)) == expected
+
+
+def test_top_k_is_prefix_of_full_ranking():
+    candidates = _random_candidates(500, 42)
+    match = MATCHES[0]
+    expected = _summary(rank_candidates(copy.deepcopy(candidates), match))
+    for k in (1, 6, 37, 499, 500, 900):
+        assert _summary(rank_candidates_batch(copy.deepcopy(candidates), match, top_k=k)) == expected[:k]
+    assert rank_candidates_batch(copy.deepcopy(candidates), match, top_k=0) == []
+
+
+def test_ties_keep_input_order():
+    candidates = [{"player_id": str(i), "declared_skill_level": 3.5} for i in range(10)]
+    ranked = rank_candidates_batch(candidates, {"level_min": 3.0, "level_max": 4.0}, top_k=4)
+    assert [p["player_id"] for p in ranked] == ["0", "1", "2", "3"]
+
+
+def test_scalar_fallback_without_numpy(monkeypatch):
+    candidates = _random_candidates(50, 7)
+    match = MATCHES[1]
+    expected = _summary(rank_candidates_batch(copy.deepcopy(candidates), match, top_k=10))
+    monkeypatch.setattr(scoring_engine, "np", None)
+    assert _summary(rank_candidates_batch(copy.deepcopy(candidates), match, top_k=10)) == expected
@@ -0,0 +1,47 @@
+"""
+Tests for send_sms_bulk: one club settings lookup per broadcast, every
+recipient delivered once, dry-run capture kept on the calling context.
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+@pytest.fixture
+def tc(real_module):
+    return real_module("twilio_client")
+
+
+CONFIG = {"phone_number": "+15550000000", "test_mode": False, "gsm7_only": False, "whitelist": set()}
+
+
+def test_bulk_send_loads_settings_once_and_dedupes(tc):
+    client = MagicMock()
+    with patch.object(tc, "_load_club_sms_config", return_value=CONFIG) as load, \
+         patch.object(tc, "get_twilio_client", return_value=client), \
+         patch.object(tc, "record_outbound_sms"):
+        sent = tc.send_sms_bulk(["5551112222", "+15551112222", "5553334444", None], "Last call!", club_id="c1")
+
+    load.assert_called_once_with("c1")
+    assert sent == {"+15551112222": True, "+15553334444": True}
+    assert client.messages.create.call_count == 2
+    assert {c.kwargs["from_"] for c in client.messages.create.call_args_list} == {"+15550000000"}
+
+
+def test_bulk_send_unknown_club_sends_nothing(tc):
+    with patch.object(tc, "_load_club_sms_config", return_value=None), \
+         patch.object(tc, "get_twilio_client") as get_client:
+        assert tc.send_sms_bulk(["5551112222"], "hi", club_id="missing") == {"+15551112222": False}
+    get_client.assert_not_called()
+
+
+def test_bulk_send_dry_run_captures_all(tc):
+    tc.set_dry_run(True)
+    try:
+        with patch.object(tc, "_load_club_sms_config", return_value=CONFIG), \
+             patch.object(tc, "record_outbound_sms"):
+            tc.send_sms_bulk(["5551112222", "5553334444"], "hi", club_id="c1")
+        assert [r["to"] for r in tc.get_dry_run_responses()] == ["+15551112222", "+15553334444"]
+    finally:
+        tc.set_dry_run(False)
@@ -0,0 +1,65 @@
+"""
+Tests for SMS encoding detection, segment counting and GSM-7 variants.
+"""
+
+import sms_constants as msg
+from sms_segments import (
+    count_sms_segments, to_gsm7, is_gsm7, classify_template,
+    build_template_report, SegmentStats, UNCLASSIFIED_TEMPLATE
+)
+
+
+def test_gsm7_single_and_multi_segment():
+    assert count_sms_segments("a" * 160) == ("GSM-7", 1)
+    assert count_sms_segments("a" * 161) == ("GSM-7", 2)
+    assert count_sms_segments("a" * 306) == ("GSM-7", 2)
+    assert count_sms_segments("a" * 307) == ("GSM-7", 3)
+
+
+def test_gsm7_extension_chars_count_double():
+    assert count_sms_segments("€" * 80) == ("GSM-7", 1)
+    assert count_sms_segments("€" * 81) == ("GSM-7", 2)
+
+
+def test_emoji_forces_ucs2():
+    body = "🎾 " + "a" * 67
+    assert count_sms_segments(body) == ("UCS-2", 1)  # emoji is 2 UTF-16 units + space: 70 total
+    assert count_sms_segments(body + "a") == ("UCS-2", 2)
+
+
+def test_to_gsm7_strips_emoji_and_smart_punctuation():
+    body = "🎾 Club: Match on Fri • 6pm — don’t be late! 🏸"
+    variant = to_gsm7(body)
+    assert variant == "Club: Match on Fri - 6pm - don't be late!"
+    assert is_gsm7(variant)
+
+
+def test_to_gsm7_keeps_indentation_and_plain_text():
+    assert to_gsm7("Players:\n  - Ann (3.5)") == "Players:\n  - Ann (3.5)"
+    assert to_gsm7("📅 Fri\n\n👥 Players:") == "Fri\n\nPlayers:"
+
+
+def test_classify_template():
+    body = msg.MSG_LAST_CALL_BROADCAST.format(club_name="Test Club", time="Fri @ 6pm")
+    assert classify_template(body) == "MSG_LAST_CALL_BROADCAST"
+    assert classify_template("something entirely ad hoc") == UNCLASSIFIED_TEMPLATE
+
+
+def test_segment_stats_report():
+    stats = SegmentStats()
+    stats.record("MSG_A", "🎾 " + "a" * 100)
+    stats.record("MSG_A", "hello")
+    rows = stats.report()
+    assert rows[0]["template"] == "MSG_A"
+    assert rows[0]["messages"] == 2
+    assert rows[0]["segments"] == 3
+    assert rows[0]["ucs2_pct"] == 50.0
+
+
+def test_template_report_gsm7_never_worse():
+    rows = build_template_report()
+    assert rows
+    for row in rows:
+        assert row["gsm7_segments"] <= row["segments"]
+    invite = next(r for r in rows if r["template"] == "MSG_INVITE")
+    assert invite["encoding"] == "UCS-2"
@@ -0,0 +1,93 @@
+"""
+Tests for the in-memory conversation state store (TTL, LRU bound, thread safety).
+"""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from state_store import InMemoryStateStore
+
+
+@pytest.fixture
+def redis_client(real_module):
+    return real_module("redis_client")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_set_replaces_value():
+    store = InMemoryStateStore()
+    store.set("user:1", b"first", ttl=60)
+    store.set("user:1", b"second", ttl=60)
+    assert store.get("user:1") == b"second"
+    assert store.get("user:2") is None
+
+
+def test_ttl_expiry_and_refresh():
+    clock = FakeClock()
+    store = InMemoryStateStore(clock=clock)
+    store.set("user:1", b"A", ttl=60)
+
+    clock.now += 59
+    assert store.get("user:1") == b"A"
+
+    # A write resets the expiry, like SET EX
+    store.set("user:1", b"B", ttl=60)
+    clock.now += 59
+    assert store.get("user:1") == b"B"
+
+    clock.now += 2
+    assert store.get("user:1") is None
+    assert len(store) == 0
+
+
+def test_lru_eviction():
+    store = InMemoryStateStore(max_keys=2)
+    store.set("a", b"1", ttl=60)
+    store.set("b", b"2", ttl=60)
+    store.get("a")  # a is now most recently used
+    store.set("c", b"3", ttl=60)
+    assert store.get("b") is None
+    assert store.get("a") == b"1"
+    assert store.get("c") == b"3"
+
+
+def test_delete():
+    store = InMemoryStateStore()
+    store.set("a", b"1", ttl=60)
+    store.delete("a")
+    store.delete("missing")
+    assert store.get("a") is None
+
+
+def test_concurrent_writers():
+    store = InMemoryStateStore(max_keys=500)
+
+    def worker(n):
+        for i in range(200):
+            store.set(f"user:{n}:{i % 50}", str(i).encode(), ttl=60)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(store) == 400
+
+
+def test_user_state_helpers_with_memory_backend(redis_client):
+    with patch.object(redis_client, "get_state_store", return_value=InMemoryStateStore()):
+        redis_client.set_user_state("+15550000001", "WAITING_FEEDBACK", {"players_to_rate": ["a", "b"]})
+        assert redis_client.get_user_state("+15550000001") == {
+            "state": "WAITING_FEEDBACK", "players_to_rate": ["a", "b"]
+        }
+        redis_client.clear_user_state("+15550000001")
+        assert redis_client.get_user_state("+15550000001") == {}
@@ -5,6 +5,7 @@ from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
 from typing import List
 from dotenv import load_dotenv
+from sms_segments import to_gsm7, record_outbound_sms
 
 load_dotenv()
 
@@ -102,17 +103,24 @@ def store_in_outbox(to_number: str, body: str) -> bool:
     """Store SMS in outbox for simulator display."""
     try:
         from database import supabase
-        supabase.table("sms_outbox").insert({
+        from outbox_events import outbox_broker
+        res = supabase.table("sms_outbox").insert({
             "to_number": to_number,
             "body": body
         }).execute()
         print(f"[SIMULATOR] Stored SMS to {to_number}: {body[:50]}...")
+        # Wake up simulator long-polls waiting on this recipient (in any instance)
+        if res.data:
+            outbox_broker.publish(res.data[0])
         return True
     except Exception as e:
         print(f"[SIMULATOR] Error storing SMS: {e}")
         return False
 
 
+BULK_SMS_MAX_WORKERS = 10
+
+
 def get_twilio_client():
     if not account_sid or not auth_token:
         print("Warning: TWILIO_ACCOUNT_SID or TWILIO_AUTH_TOKEN not set")
@@ -149,40 +157,81 @@ def send_sms(to_number: str, body: str, reply_from: str = None, club_id: str = N
     # Normalize to_number (ensure consistent format for simulator matching)
     to_number = normalize_phone_number(to_number)
 
+    club_config = _load_club_sms_config(club_id)
+    if club_config is None:
+        return False
+
     # Priority: explicit reply_from > context variable > club-specific lookup > default from env
-    send_from = reply_from or get_reply_from()
-    
-    # 1. Fetch settings and phone number from DB (MANDATORY)
-    current_test_mode = False # Default to Live if club exists but key missing
-    current_whitelist = set()
-    club_phone = None
-    
+    send_from = reply_from or get_reply_from() or club_config["phone_number"] or default_from_number
+    return _deliver_sms(to_number, body, send_from, club_id, club_config)
+
+
+def send_sms_bulk(to_numbers: List[str], body: str, club_id: str, reply_from: str = None) -> dict:
+    """
+    Send the same SMS to many recipients of one club.
+    Club settings are fetched once and Twilio requests run concurrently, so the
+    time taken does not grow with the recipient count (up to BULK_SMS_MAX_WORKERS).
+    Returns {normalized number: sent?}.
+    """
+    to_numbers = list(dict.fromkeys(n for n in (normalize_phone_number(n) for n in to_numbers) if n))
+    if not to_numbers:
+        return {}
+
+    club_config = _load_club_sms_config(club_id)
+    if club_config is None:
+        return {n: False for n in to_numbers}
+
+    send_from = reply_from or get_reply_from() or club_config["phone_number"] or default_from_number
+
+    # Dry run captures into this context's response list: keep it on the calling thread
+    if get_dry_run():
+        return {n: _deliver_sms(n, body, send_from, club_id, club_config) for n in to_numbers}
+
+    from concurrent.futures import ThreadPoolExecutor
+    from contextvars import copy_context
+    with ThreadPoolExecutor(max_workers=min(BULK_SMS_MAX_WORKERS, len(to_numbers))) as pool:
+        futures = {
+            n: pool.submit(copy_context().run, _deliver_sms, n, body, send_from, club_id, club_config)
+            for n in to_numbers
+        }
+        return {n: f.result() for n, f in futures.items()}
+
+
+def _load_club_sms_config(club_id: str):
+    """Per-club SMS settings (test mode, whitelist, GSM-7, phone number), or None if unavailable."""
     try:
         from database import supabase
         res = supabase.table("clubs").select("settings, phone_number").eq("club_id", club_id).maybe_single().execute()
-        if res.data:
-            club_phone = res.data.get("phone_number")
-            settings = res.data.get("settings")
-            if settings:
-                # Per-club settings from DB (no .env fallback)
-                current_test_mode = settings.get("sms_test_mode", False)
-                if "sms_whitelist" in settings and settings["sms_whitelist"]:
-                    raw_wl = settings["sms_whitelist"]
-                    current_whitelist = set(num.strip() for num in raw_wl.split(",") if num.strip())
-        else:
+        if not res.data:
             print(f"[SMS ERROR] club_id {club_id} not found in database. Cannot fetch settings.")
-            return False
+            return None
     except Exception as e:
         print(f"[SMS ERROR] Failed to fetch per-club data for {club_id}: {e}")
-        return False
+        return None
 
-    # Use club_phone if we don't have a sender yet
-    if not send_from and club_phone:
-        send_from = club_phone
-        
-    # Final fallback to global default for the 'From' number only
-    if not send_from:
-        send_from = default_from_number
+    # Per-club settings from DB (no .env fallback); default to Live if club exists but key missing
+    settings = res.data.get("settings") or {}
+    whitelist = set()
+    if settings.get("sms_whitelist"):
+        whitelist = set(num.strip() for num in settings["sms_whitelist"].split(",") if num.strip())
+    return {
+        "phone_number": res.data.get("phone_number"),
+        "test_mode": settings.get("sms_test_mode", False),
+        "gsm7_only": settings.get("sms_gsm7_only", False),
+        "whitelist": whitelist,
+    }
+
+
+def _deliver_sms(to_number: str, body: str, send_from: str, club_id: str, club_config: dict) -> bool:
+    """Route one SMS to dry run, the simulator outbox or Twilio according to the club settings."""
+    current_test_mode = club_config["test_mode"]
+    current_whitelist = club_config["whitelist"]
+
+    # GSM-7-only clubs: strip emoji/smart punctuation so messages use 160-char segments
+    original_body = body
+    if club_config["gsm7_only"]:
+        body = to_gsm7(body)
+    record_outbound_sms(body, original_body)
 
     # Debug: log every SMS attempt
     print(f"[SMS DEBUG] send_sms to={to_number}, from={send_from}, club_id={club_id}, body='{body[:50]}...'")
@@ -4,6 +4,41 @@ import { revalidatePath } from 'next/cache'
 import { redirect } from 'next/navigation'
 import { createClient } from '@/utils/supabase/server'
 
+async function getBaseUrl() {
+    // Server-side fetch needs the absolute URL (see groups/actions.ts)
+    if (process.env.NODE_ENV === 'development') {
+        return 'http://localhost:8001'
+    }
+
+    const apiUrl = process.env.NEXT_PUBLIC_API_URL
+    if (apiUrl) return apiUrl
+
+    throw new Error('CRITICAL CONFIG ERROR: NEXT_PUBLIC_API_URL is not defined. Server-side fetch will fail.');
+}
+
+// The dashboard writes players and club_members straight to Supabase; tell the
+// backend so the club leaderboards pick the change up. Best effort: a failure
+// only delays the change until the next leaderboard rebuild.
+async function refreshPlayerRankings(playerId: string) {
+    try {
+        const supabase = await createClient()
+        const { data: { session } } = await supabase.auth.getSession()
+        const token = session?.access_token
+
+        const baseUrl = await getBaseUrl()
+        const res = await fetch(`${baseUrl}/api/players/${playerId}/rankings/refresh`, {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${token}`,
+                ...(process.env.VERCEL_AUTOMATION_BYPASS_SECRET ? { 'x-vercel-protection-bypass': process.env.VERCEL_AUTOMATION_BYPASS_SECRET } : {})
+            }
+        })
+        if (!res.ok) console.error('Error refreshing player rankings:', res.status)
+    } catch (error) {
+        console.error('Error refreshing player rankings:', error)
+    }
+}
+
 export async function logout() {
     const supabase = await createClient()
     await supabase.auth.signOut()
@@ -59,6 +94,8 @@ export async function updatePlayer(playerId: string, data: {
         throw error
     }
 
+    await refreshPlayerRankings(playerId)
+
     revalidatePath('/dashboard')
 }
 
@@ -177,6 +214,8 @@ export async function createPlayer(data: {
         notes: existingPlayer ? 'Added to club via dashboard' : 'Manually created via dashboard'
     })
 
+    await refreshPlayerRankings(playerId)
+
     revalidatePath('/dashboard')
 }
 
@@ -193,6 +232,8 @@ export async function togglePlayerStatus(playerId: string, newStatus: boolean) {
         throw error
     }
 
+    await refreshPlayerRankings(playerId)
+
     revalidatePath('/dashboard')
 }
 
@@ -273,6 +314,8 @@ export async function removePlayerFromClub(playerId: string, clubId: string) {
         throw membershipError
     }
 
+    await refreshPlayerRankings(playerId)
+
     revalidatePath('/dashboard')
 }
 
@@ -332,5 +375,7 @@ export async function verifyPlayer(playerId: string, data: {
         notes: data.notes || 'Pro verification'
     })
 
+    await refreshPlayerRankings(playerId)
+
     revalidatePath('/dashboard')
 }
@@ -113,17 +113,27 @@ export default function MatchJigPage() {
         return filtered;
     }, [allPlayers, currentClubId]);
 
-    // Poll for outbox messages (intercepted SMS)
+    // Long-poll for outbox messages (intercepted SMS): the backend holds the
+    // request open until a message is stored, so there is no fixed-interval polling
     useEffect(() => {
         const activePlayerPhones = selectedPlayers.filter(p => p !== null).map(p => p!.phone_number)
         if (activePlayerPhones.length === 0) return
 
+        let timeoutId: NodeJS.Timeout
+        let cancelled = false
+        const controller = new AbortController()
+
         const pollOutbox = async () => {
+            if (cancelled) return
+            // Back off only when there are unread messages for players not on this screen
+            let nextDelay = 2000
+
             try {
-                const response = await authFetch('/api/sms-outbox')
+                const response = await authFetch('/api/sms-outbox?wait=25', { signal: controller.signal })
                 if (response.ok) {
                     const data = await response.json()
                     const messages: OutboxMessage[] = data.messages || []
+                    let hasUnmatched = false
 
                     for (const msg of messages) {
                         const player = selectedPlayers.find(p => p?.phone_number === msg.to_number)
@@ -146,17 +156,26 @@ export default function MatchJigPage() {
 
                             // Mark as read so it doesn't pop up again
                             await authFetch(`/api/sms-outbox/${msg.id}/read`, { method: 'POST' })
+                        } else {
+                            hasUnmatched = true
                         }
                     }
+
+                    if (!hasUnmatched) nextDelay = 100
                 }
             } catch (error) {
+                if (cancelled) return
                 console.error('Error polling outbox:', error)
             }
+            if (!cancelled) timeoutId = setTimeout(pollOutbox, nextDelay)
         }
 
-        const interval = setInterval(pollOutbox, 2000)
         pollOutbox()
-        return () => clearInterval(interval)
+        return () => {
+            cancelled = true
+            controller.abort()
+            if (timeoutId) clearTimeout(timeoutId)
+        }
     }, [selectedPlayers])
 
     const handleSelectPlayer = (index: number, playerId: string) => {
@@ -227,13 +227,17 @@ export default function SMSSimulatorPage() {
 
         let isPolling = false
         let timeoutId: NodeJS.Timeout
+        let cancelled = false
 
         const pollOutbox = async () => {
-            if (isPolling) return
+            if (isPolling || cancelled) return
             isPolling = true
+            // Long-poll: the backend holds the request open until a message is stored.
+            // Back off only when there are unread messages we can't consume on this screen.
+            let nextDelay = 2000
 
             try {
-                const response = await authFetch('/api/sms-outbox')
+                const response = await authFetch('/api/sms-outbox?wait=25')
                 if (response.ok) {
                     const data = await response.json()
                     const messages: OutboxMessage[] = data.messages || []
@@ -243,6 +247,7 @@ export default function SMSSimulatorPage() {
                     }
 
                     const currentSelected = selectedPlayersRef.current
+                    let hasUnmatched = false
 
                     for (const msg of messages) {
                         const normalizedTarget = normalizePhone(msg.to_number)
@@ -276,8 +281,11 @@ export default function SMSSimulatorPage() {
                         } else {
                             // Don't mark as read if no match on current screen
                             addDebugLog(`Ignored: ${normalizedTarget} (not on screen)`)
+                            hasUnmatched = true
                         }
                     }
+
+                    if (!hasUnmatched) nextDelay = 100
                 } else if (response.status === 401) {
                     addDebugLog(`Auth: Expired`)
                 }
@@ -285,12 +293,13 @@ export default function SMSSimulatorPage() {
                 addDebugLog(`Net: ${error instanceof Error ? error.message : 'Error'}`)
             } finally {
                 isPolling = false
-                timeoutId = setTimeout(pollOutbox, 2000)
+                if (!cancelled) timeoutId = setTimeout(pollOutbox, nextDelay)
             }
         }
 
         timeoutId = setTimeout(pollOutbox, 500)
         return () => {
+            cancelled = true
             if (timeoutId) clearTimeout(timeoutId)
         }
     }, [testMode, selectedPlayers.length === 0])